@@ -68,36 +68,47 @@ async def api_delete(name, label):
 # --------------------------------------------
 # Polling to ensure K8s resources are fully cleaned up
 # --------------------------------------------
-def wait_cleanup(label, timeout=30):
+def wait_cleanup(name, timeout=30):
     end = time.time() + timeout
     while time.time() < end:
         out = subprocess.run([
-            "kubectl", "get", "svc,ing",
-            "-n", NAMESPACE,
-            "-l", f"workflows.argoproj.io/workflow={label}"
+            "kubectl", "get", f"svc/viz-svc-{name[:50]}", f"ing/viz-ing-{name[:50]}",
+            "-n", NAMESPACE, "--ignore-not-found"
         ], capture_output=True, text=True).stdout
         # Exit if no resources are found
-        if not out.strip() or "No resources found" in out:
+        if not out.strip():
             return True
         time.sleep(1)
     return False
 
+# --------------------------------------------
+# Expose mode the API runs with (K8S_EXPOSE_MODE), reported by /metrics
+# --------------------------------------------
+async def expose_mode():
+    async with httpx.AsyncClient(base_url=API, timeout=10.0) as client:
+        try:
+            return (await client.get("/metrics")).json()["k8s"]["expose_mode"]
+        except Exception:
+            return "unknown"
+
 # --------------------------------------------
 # Cold/Warm startup test for a given scenario
 # --------------------------------------------
-async def run_scenario(name, cfg, N=5, delete_before=False):
-    print(f"\n-- Scenario: {name} | delete_before={delete_before} --")
+async def run_scenario(name, cfg, N=5, cold=False):
+    print(f"\n-- Scenario: {name} | {'cold' if cold else 'warm'} --")
     lbl = cfg.get("label")
-    # Only delete if label is specified
-    if delete_before and lbl:
-        code = await api_delete(cfg["payload"].get("name", ""), lbl)
-        print(f" DELETE /visualizations -> HTTP {code}")
-        if not wait_cleanup(lbl):
-            print(" WARN: K8s resources not fully cleaned up after timeout")
+    workflow = cfg["payload"].get("name", "")
 
     # Execute N POST requests and collect latency and errors
     lats, errs = [], 0
     for i in range(N):
+        # Cold: the Service and Ingress are deleted before every request, so each one creates them
+        if cold and lbl:
+            code = await api_delete(workflow, lbl)
+            if code >= 400:
+                print(f" DELETE /visualizations -> HTTP {code}")
+            if not wait_cleanup(workflow):
+                print(" WARN: K8s resources not fully cleaned up after timeout")
         d, status = await single_request(cfg["endpoint"], cfg["payload"])
         lats.append(d)
         if status >= 400:
@@ -107,18 +118,20 @@ async def run_scenario(name, cfg, N=5, delete_before=False):
 
     lats.sort()
     avg = sum(lats) / N
-    p95 = lats[int(N * 0.95)]
-    print(f" Avg {avg:.1f} ms | P95 {p95:.1f} ms | errs {errs}/{N}")
+    p50 = lats[N // 2]
+    p95 = lats[min(int(N * 0.95), N - 1)]
+    print(f" Avg {avg:.1f} ms | P50 {p50:.1f} ms | P95 {p95:.1f} ms | errs {errs}/{N}")
 
 # --------------------------------------------
 # Main routine: run cold and warm tests for each scenario
 # --------------------------------------------
 async def main():
+    print(f"API expose mode: {await expose_mode()}")
     for name, cfg in SCENARIOS.items():
         # Cold start
-        await run_scenario(name, cfg, N=5, delete_before=True)
+        await run_scenario(name, cfg, N=5, cold=True)
         # Warm start
-        await run_scenario(name, cfg, N=5, delete_before=False)
+        await run_scenario(name, cfg, N=5, cold=False)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+import os, gzip, json, time, random, asyncio, httpx
+from statistics import mean, median
+
+# --------------------------------------------
+# Configuration
+# --------------------------------------------
+API = os.getenv("API_URL", "http://localhost:8000")
+REPEAT = int(os.getenv("REPEAT", "5"))  # Requests per scenario
+SIZES = [int(n) for n in os.getenv("POINTS", "10000,100000,1000000").split(",")]  # Points per series
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+
+# --------------------------------------------
+# Build a scientific payload with N points
+# --------------------------------------------
+def build_payload(n):
+    t = [round(i * 0.01, 2) for i in range(n)]
+    v = [round(20 + 5 * random.random(), 4) for _ in range(n)]
+    return {
+        "title": f"Ingest {n}",
+        "chart_type": "line",
+        "data": {"x": t, "y": v},
+        "layout": {}, "options": {}, "metadata": {}
+    }
+
+# --------------------------------------------
+# POST one body and measure end-to-end latency (including client-side compression)
+# --------------------------------------------
+async def post(client, payload, compress):
+    t0 = time.time()
+    body = json.dumps(payload).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if compress:
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    r = await client.post("/visualizations/scientific", content=body, headers=headers)
+    return (time.time() - t0) * 1000, len(body), r.status_code
+
+# --------------------------------------------
+# Compare plain vs gzip ingest for each payload size
+# --------------------------------------------
+async def main():
+    async with httpx.AsyncClient(base_url=API, timeout=120.0) as client:
+        for n in SIZES:
+            payload = build_payload(n)
+            print(f"\n== {n} points ==")
+            results = {}
+            for label, compress in (("plain", False), ("gzip", True)):
+                lats, errs, wire = [], 0, 0
+                for _ in range(REPEAT):
+                    dt, wire, status = await post(client, payload, compress)
+                    lats.append(dt)
+                    if status >= 400:
+                        errs += 1
+                results[label] = median(lats)
+                print(f" {label:<5} | body {wire / 1024:.0f} KiB | Avg {mean(lats):.1f} ms | "
+                      f"P50 {median(lats):.1f} ms | errs {errs}/{REPEAT}")
+            saved = results["plain"] - results["gzip"]
+            print(f" gzip saves {saved:.1f} ms per request ({saved / results['plain'] * 100:.0f}% of P50)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
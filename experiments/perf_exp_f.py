@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+import os, io, json, time, asyncio, httpx
+import numpy as np
+from statistics import mean, median
+
+# --------------------------------------------
+# Configuration
+# --------------------------------------------
+API = os.getenv("API_URL", "http://localhost:8000")
+REPEAT = int(os.getenv("REPEAT", "5"))  # Requests per scenario
+SIZES = [int(n) for n in os.getenv("POINTS", "10000,100000,1000000").split(",")]  # Points per series
+
+# --------------------------------------------
+# Build the same series for both ingest paths
+# --------------------------------------------
+def build_series(n):
+    rng = np.random.default_rng(n)
+    return np.arange(n, dtype=np.float64) * 0.01, 20 + np.cumsum(rng.normal(size=n))
+
+def to_npy(arr):
+    buf = io.BytesIO()
+    np.save(buf, arr)
+    return buf.getvalue()
+
+# --------------------------------------------
+# JSON path: pydantic validates every element of data.x / data.y
+# --------------------------------------------
+async def post_json(client, x, y):
+    t0 = time.time()
+    payload = {
+        "title": f"Ingest {len(x)}", "chart_type": "line",
+        "data": {"x": x.tolist(), "y": y.tolist()},
+        "layout": {}, "options": {}
+    }
+    r = await client.post("/visualizations/streamlit", json=payload)
+    return (time.time() - t0) * 1000, r.status_code
+
+# --------------------------------------------
+# Columnar path: only the envelope goes through pydantic, columns are .npy parts
+# --------------------------------------------
+async def post_columnar(client, x, y):
+    t0 = time.time()
+    envelope = {"title": f"Ingest {len(x)}", "chart_type": "line", "layout": {}, "options": {}}
+    files = [("columns", ("x.npy", to_npy(x))), ("columns", ("y.npy", to_npy(y)))]
+    r = await client.post("/visualizations/streamlit/columnar", data={"envelope": json.dumps(envelope)}, files=files)
+    return (time.time() - t0) * 1000, r.status_code
+
+# --------------------------------------------
+# Compare both ingest paths for each payload size
+# --------------------------------------------
+async def main():
+    async with httpx.AsyncClient(base_url=API, timeout=300.0) as client:
+        for n in SIZES:
+            x, y = build_series(n)
+            print(f"\n== {n} points ==")
+            results = {}
+            for label, post in (("json", post_json), ("columnar", post_columnar)):
+                lats, errs = [], 0
+                for _ in range(REPEAT):
+                    dt, status = await post(client, x, y)
+                    lats.append(dt)
+                    if status >= 400:
+                        errs += 1
+                results[label] = median(lats)
+                print(f" {label:<8} | Avg {mean(lats):.1f} ms | P50 {median(lats):.1f} ms | "
+                      f"Min {min(lats):.1f} ms | errs {errs}/{REPEAT}")
+            print(f" columnar is {results['json'] / results['columnar']:.1f}x faster at P50")
+
+if __name__ == "__main__":
+    asyncio.run(main())
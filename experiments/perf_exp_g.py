@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+import os, sys, json, time, asyncio, tempfile, threading
+from statistics import mean, quantiles
+from aiohttp import web
+
+# --------------------------------------------
+# Configuration
+# --------------------------------------------
+LATENCY_MS = float(os.getenv("LATENCY_MS", "50"))  # Simulated API server latency per request
+CONCURRENCY = int(os.getenv("CONCURRENCY", "64"))  # Expose calls in flight
+TOTAL = int(os.getenv("TOTAL", "512"))  # Expose calls per design
+PROBE_INTERVAL_MS = float(os.getenv("PROBE_INTERVAL_MS", "10"))  # Unrelated to_thread work during the run
+NAMESPACE = "default"
+
+# --------------------------------------------
+# In-process fake Kubernetes API server (own thread and event loop), so both
+# designs are measured against the same latency without a cluster
+# --------------------------------------------
+OBJECTS = {"services": {}, "ingresses": {}}
+
+async def handle(request):
+    await asyncio.sleep(LATENCY_MS / 1000)
+    kind, name = request.match_info["kind"], request.match_info.get("name")
+    store = OBJECTS[kind]
+    if request.method == "POST":
+        body = await request.json()
+        if body["metadata"]["name"] in store:
+            return web.json_response({"kind": "Status", "code": 409, "reason": "AlreadyExists"}, status=409)
+        store[body["metadata"]["name"]] = body
+        return web.json_response(body, status=201)
+    if request.method == "PATCH":
+        # Server-side apply: create or update
+        body = await request.json()
+        created = name not in store
+        store[name] = body
+        return web.json_response(body, status=201 if created else 200)
+    if request.method == "DELETE":
+        store.pop(name, None)
+        return web.json_response({"kind": "Status", "status": "Success"})
+    if name is None:
+        if request.query.get("watch", "").lower() == "true":
+            # Nothing changes behind the benchmark's back: hold the watch open until it times out
+            response = web.StreamResponse()
+            await response.prepare(request)
+            await asyncio.sleep(float(request.query.get("timeoutSeconds", "1")))
+            return response
+        return web.json_response({"kind": "List", "metadata": {"resourceVersion": "1"},
+                                  "items": list(store.values())})
+    if name not in store:
+        return web.json_response({"kind": "Status", "code": 404, "reason": "NotFound"}, status=404)
+    return web.json_response(store[name])
+
+def start_fake_api_server():
+    app = web.Application()
+    for prefix in ("/api/v1", "/apis/networking.k8s.io/v1"):
+        app.router.add_route("*", prefix + "/namespaces/{ns}/{kind}", handle)
+        app.router.add_route("*", prefix + "/namespaces/{ns}/{kind}/{name}", handle)
+    ready = {}
+    started = threading.Event()
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        loop.run_until_complete(site.start())
+        ready["port"] = site._server.sockets[0].getsockname()[1]
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    started.wait()
+    return ready["port"]
+
+def write_kubeconfig(port):
+    path = os.path.join(tempfile.mkdtemp(), "config")
+    with open(path, "w") as f:
+        json.dump({
+            "apiVersion": "v1", "kind": "Config", "current-context": "bench",
+            "clusters": [{"name": "bench", "cluster": {"server": f"http://127.0.0.1:{port}"}}],
+            "contexts": [{"name": "bench", "context": {"cluster": "bench", "user": "bench"}}],
+            "users": [{"name": "bench", "user": {"token": "bench"}}]
+        }, f)
+    return path
+
+# --------------------------------------------
+# Previous design: blocking client calls offloaded with asyncio.to_thread
+# (same calls as an expose: 2 existence GETs, then Service and Ingress creates)
+# --------------------------------------------
+class ThreadOffloadExposer:
+    def __init__(self, kubeconfig):
+        from kubernetes import client, config
+        config.load_kube_config(config_file=kubeconfig)
+        self.client = client
+        self.core_v1 = client.CoreV1Api()
+        self.networking_v1 = client.NetworkingV1Api()
+
+    async def _exists(self, read_func, name):
+        try:
+            await asyncio.to_thread(read_func, name=name, namespace=NAMESPACE)
+            return True
+        except self.client.ApiException as e:
+            if e.status != 404:
+                raise
+            return False
+
+    async def expose(self, name):
+        service = {"metadata": {"name": f"viz-svc-{name}"}, "spec": {"ports": [{"port": 80}]}}
+        ingress = {"metadata": {"name": f"viz-ing-{name}"}, "spec": {}}
+        if not await self._exists(self.core_v1.read_namespaced_service, f"viz-svc-{name}"):
+            await asyncio.to_thread(self.core_v1.create_namespaced_service, namespace=NAMESPACE, body=service)
+        if not await self._exists(self.networking_v1.read_namespaced_ingress, f"viz-ing-{name}"):
+            await asyncio.to_thread(self.networking_v1.create_namespaced_ingress, namespace=NAMESPACE, body=ingress)
+
+    async def close(self):
+        pass
+
+# --------------------------------------------
+# Current design: K8sResourceManager on the pooled asyncio client
+# --------------------------------------------
+class AsyncExposer:
+    def __init__(self, informers, mode):
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "visualization-api"))
+        os.environ["K8S_INFORMERS_ENABLED"] = "true" if informers else "false"
+        os.environ["K8S_EXPOSE_MODE"] = mode
+        os.environ.setdefault("INGRESS_DOMAIN", "bench.example.org")
+        from app.services.k8s_service import K8sResourceManager
+        self.manager = K8sResourceManager()
+
+    async def expose(self, name):
+        if self.manager.api_client is None:
+            await self.manager.start()
+            while self.manager.informers_enabled and not self.manager.service_informer.synced:
+                await asyncio.sleep(0.01)
+        await self.manager.create_resources(name, "bench", "", False, 8080)
+
+    async def close(self):
+        await self.manager.close()
+
+# --------------------------------------------
+# Benchmark runner for one design
+# --------------------------------------------
+async def probe(latencies, stop):
+    # Latency of unrelated work that needs a default executor thread (e.g. storage reads)
+    while not stop.is_set():
+        t0 = time.time()
+        await asyncio.to_thread(lambda: None)
+        latencies.append((time.time() - t0) * 1000)
+        await asyncio.sleep(PROBE_INTERVAL_MS / 1000)
+
+async def run_pass(exposer, names):
+    queue = asyncio.Queue()
+    for name in names:
+        queue.put_nowait(name)
+    results = []
+
+    async def worker():
+        while not queue.empty():
+            name = queue.get_nowait()
+            t0 = time.time()
+            try:
+                await exposer.expose(name)
+                results.append((time.time() - t0) * 1000)
+            except Exception as e:
+                print(f"· Expose failed: {e}")
+
+    probe_latencies, stop = [], asyncio.Event()
+    probe_task = asyncio.create_task(probe(probe_latencies, stop))
+    t_start = time.time()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    total_time = time.time() - t_start
+    stop.set()
+    await probe_task
+    return results, probe_latencies, total_time
+
+async def run_benchmark(label, exposer):
+    for store in OBJECTS.values():
+        store.clear()
+    await exposer.expose("warmup")
+    names = [f"{label}-{i}" for i in range(TOTAL)]
+    print(f"\n== {label}: {TOTAL} exposes, {CONCURRENCY} concurrent, {LATENCY_MS:.0f} ms API latency ==")
+    # Cold: the objects do not exist yet; warm: exposing the same names again (retries)
+    for phase in ("cold", "warm"):
+        results, probe_latencies, total_time = await run_pass(exposer, names)
+        print(f"· [{phase}] Total time: {total_time:.1f}s | Exposes/s: {len(results) / total_time:.1f}")
+        if len(results) > 1:
+            q = quantiles(results, n=100)
+            print(f"· [{phase}] Expose latency (ms): Avg {mean(results):.1f} | P50 {q[49]:.1f} | P99 {q[98]:.1f}")
+        if len(probe_latencies) > 1:
+            q = quantiles(probe_latencies, n=100)
+            print(f"· [{phase}] Unrelated to_thread latency (ms): P50 {q[49]:.1f} | P99 {q[98]:.1f}")
+    await exposer.close()
+
+# --------------------------------------------
+# Main runner
+# --------------------------------------------
+async def main():
+    port = start_fake_api_server()
+    kubeconfig = write_kubeconfig(port)
+    os.environ["KUBECONFIG"] = kubeconfig
+    print(f"Default executor threads: {min(32, (os.cpu_count() or 1) + 4)}")
+    await run_benchmark("thread-offload", ThreadOffloadExposer(kubeconfig))
+    await run_benchmark("asyncio-client", AsyncExposer(informers=False, mode="check"))
+    await run_benchmark("asyncio-client+informers", AsyncExposer(informers=True, mode="check"))
+    for mode in ("optimistic", "apply"):
+        await run_benchmark(f"asyncio-client+informers {mode}", AsyncExposer(informers=True, mode=mode))
+
+if __name__ == "__main__":
+    asyncio.run(main())
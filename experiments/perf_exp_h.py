@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+import os, sys, json, time, asyncio, tempfile, threading
+from statistics import quantiles
+from aiohttp import web
+
+# --------------------------------------------
+# Configuration
+# --------------------------------------------
+LATENCY_MS = float(os.getenv("LATENCY_MS", "20"))  # Simulated API server latency per request
+TOTAL = int(os.getenv("TOTAL", "300"))  # Visualizations exposed, then deleted
+CONCURRENCY = int(os.getenv("CONCURRENCY", "32"))  # Calls in flight per replica
+REPLICAS = int(os.getenv("REPLICAS", "2"))  # API replicas editing the same shared Ingresses
+NAMESPACE = "default"
+
+# --------------------------------------------
+# In-process fake Kubernetes API server (own thread and event loop) with
+# resourceVersions, merge patches and delete preconditions, counting the
+# Ingress changes (each one is an nginx-ingress config reload)
+# --------------------------------------------
+OBJECTS = {"services": {}, "ingresses": {}}
+STATS = {"ingress_changes": 0, "conflicts": 0, "max_ingresses": 0}
+VERSION = [0]
+
+def next_version():
+    VERSION[0] += 1
+    return str(VERSION[0])
+
+def merge(target, patch):
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge(target[key], value)
+        else:
+            target[key] = value
+
+def status(code, reason):
+    return web.json_response({"kind": "Status", "code": code, "reason": reason}, status=code)
+
+async def handle(request):
+    await asyncio.sleep(LATENCY_MS / 1000)
+    kind, name = request.match_info["kind"], request.match_info.get("name")
+    store = OBJECTS[kind]
+    changed = request.method in ("POST", "PATCH", "DELETE")
+    if request.method == "POST":
+        body = await request.json()
+        if body["metadata"]["name"] in store:
+            return status(409, "AlreadyExists")
+        body["metadata"]["resourceVersion"] = next_version()
+        store[body["metadata"]["name"]] = body
+        response = web.json_response(body, status=201)
+    elif request.method == "PATCH":
+        body = await request.json()
+        if name not in store:
+            return status(404, "NotFound")
+        expected = body.get("metadata", {}).get("resourceVersion")
+        if expected is not None and expected != store[name]["metadata"]["resourceVersion"]:
+            STATS["conflicts"] += 1
+            return status(409, "Conflict")
+        merge(store[name], body)
+        store[name]["metadata"]["resourceVersion"] = next_version()
+        response = web.json_response(store[name])
+    elif request.method == "DELETE":
+        if name not in store:
+            return status(404, "NotFound")
+        body = await request.json() if request.can_read_body else {}
+        expected = ((body or {}).get("preconditions") or {}).get("resourceVersion")
+        if expected is not None and expected != store[name]["metadata"]["resourceVersion"]:
+            STATS["conflicts"] += 1
+            return status(409, "Conflict")
+        store.pop(name)
+        response = web.json_response({"kind": "Status", "status": "Success"})
+    elif name is None:
+        if request.query.get("watch", "").lower() == "true":
+            # No events: each replica's cache only holds its own writes, so other replicas' edits surface as 409s
+            response = web.StreamResponse()
+            await response.prepare(request)
+            await asyncio.sleep(float(request.query.get("timeoutSeconds", "1")))
+            return response
+        return web.json_response({"kind": "List", "metadata": {"resourceVersion": next_version()},
+                                  "items": list(store.values())})
+    elif name not in store:
+        return status(404, "NotFound")
+    else:
+        return web.json_response(store[name])
+    if changed and kind == "ingresses":
+        STATS["ingress_changes"] += 1
+        STATS["max_ingresses"] = max(STATS["max_ingresses"], len(store))
+    return response
+
+def start_fake_api_server():
+    app = web.Application()
+    for prefix in ("/api/v1", "/apis/networking.k8s.io/v1"):
+        app.router.add_route("*", prefix + "/namespaces/{ns}/{kind}", handle)
+        app.router.add_route("*", prefix + "/namespaces/{ns}/{kind}/{name}", handle)
+    ready = {}
+    started = threading.Event()
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        loop.run_until_complete(site.start())
+        ready["port"] = site._server.sockets[0].getsockname()[1]
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    started.wait()
+    return ready["port"]
+
+def write_kubeconfig(port):
+    path = os.path.join(tempfile.mkdtemp(), "config")
+    with open(path, "w") as f:
+        json.dump({
+            "apiVersion": "v1", "kind": "Config", "current-context": "bench",
+            "clusters": [{"name": "bench", "cluster": {"server": f"http://127.0.0.1:{port}"}}],
+            "contexts": [{"name": "bench", "context": {"cluster": "bench", "user": "bench"}}],
+            "users": [{"name": "bench", "user": {"token": "bench"}}]
+        }, f)
+    return path
+
+# --------------------------------------------
+# Benchmark runner for one ingress mode: every replica is a K8sResourceManager
+# --------------------------------------------
+async def start_replicas(ingress_mode):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "visualization-api"))
+    os.environ["K8S_INGRESS_MODE"] = ingress_mode
+    os.environ.setdefault("INGRESS_DOMAIN", "bench.example.org")
+    from app.services.k8s_service import K8sResourceManager
+    replicas = [K8sResourceManager() for _ in range(REPLICAS)]
+    for manager in replicas:
+        await manager.start()
+        while manager.informers_enabled and not manager.ingress_informer.synced:
+            await asyncio.sleep(0.01)
+    return replicas
+
+async def run_phase(replicas, names, call):
+    latencies, failures = [], 0
+    queues = [asyncio.Queue() for _ in replicas]
+    for i, name in enumerate(names):
+        queues[i % len(replicas)].put_nowait(name)
+
+    async def worker(manager, queue):
+        nonlocal failures
+        while not queue.empty():
+            name = queue.get_nowait()
+            t0 = time.time()
+            try:
+                await call(manager, name)
+                latencies.append((time.time() - t0) * 1000)
+            except Exception as e:
+                failures += 1
+                print(f"· Call failed: {e}")
+
+    await asyncio.gather(*(worker(manager, queue) for manager, queue in zip(replicas, queues)
+                           for _ in range(CONCURRENCY)))
+    return latencies, failures
+
+async def run_benchmark(ingress_mode):
+    for store in OBJECTS.values():
+        store.clear()
+    STATS.update(ingress_changes=0, conflicts=0, max_ingresses=0)
+    replicas = await start_replicas(ingress_mode)
+    names = [f"viz-{i}" for i in range(TOTAL)]
+    print(f"\n== {ingress_mode}: {TOTAL} visualizations, {REPLICAS} replicas x {CONCURRENCY} concurrent, "
+          f"{LATENCY_MS:.0f} ms API latency ==")
+    phases = (
+        ("expose", lambda m, n: m.create_resources(n, "bench", "", False, 8888, "jupyter")),
+        ("delete", lambda m, n: m.delete_resources(n, "bench"))
+    )
+    for phase, call in phases:
+        changes = STATS["ingress_changes"]
+        latencies, failures = await run_phase(replicas, names, call)
+        q = quantiles(latencies, n=100)
+        print(f"· [{phase}] Latency (ms): P50 {q[49]:.1f} | P99 {q[98]:.1f} | Failures: {failures} | "
+              f"Ingress changes (nginx reloads): {STATS['ingress_changes'] - changes}")
+    routed = sum(len(i["spec"]["rules"][0]["http"]["paths"]) for i in OBJECTS["ingresses"].values())
+    print(f"· Peak Ingress objects: {STATS['max_ingresses']} | Conflicts (retried): {STATS['conflicts']} | "
+          f"Left behind: {len(OBJECTS['ingresses'])} Ingresses, {routed} paths, {len(OBJECTS['services'])} Services")
+    for manager in replicas:
+        await manager.close()
+
+# --------------------------------------------
+# Main runner
+# --------------------------------------------
+async def main():
+    port = start_fake_api_server()
+    os.environ["KUBECONFIG"] = write_kubeconfig(port)
+    for ingress_mode in ("dedicated", "shared"):
+        await run_benchmark(ingress_mode)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -8,6 +8,7 @@ Supports types: scientific, dashboard, basic.
 import os
 import sys
 import json
+import gzip
 import argparse
 import requests
 from datetime import datetime
@@ -23,7 +24,18 @@ def load_results(input_file):
     with open(input_file, 'r') as f:
         return json.load(f)
 
-def create_visualization(data, viz_type):
+def encode_request(request_data, compress):
+    """Serialize the request body, gzip-compressing it if requested."""
+    body = json.dumps(request_data).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if compress == "gzip":
+        compressed = gzip.compress(body)
+        print(f"Compressed request body: {len(body)} -> {len(compressed)} bytes")
+        body = compressed
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+def create_visualization(data, viz_type, compress="none"):
     """Create a visualization using the Visualization API."""
     print(f"Creating visualization of type {viz_type}...")
 
@@ -37,14 +49,18 @@ def create_visualization(data, viz_type):
     else:
         endpoint = "/visualizations/streamlit"
         request_data = prepare_basic_visualization(data)
+    # A retry after a lost response gets back the visualization the first attempt stored
+    request_data["dedupe"] = True
+
+    body, headers = encode_request(request_data, compress)
 
     # Retry logic for API call
     for attempt in range(MAX_RETRIES):
         try:
             response = requests.post(
                 f"{API_URL}{endpoint}",
-                json=request_data,
-                headers={"Content-Type": "application/json"}
+                data=body,
+                headers=headers
             )
 
             if response.status_code == 200:
@@ -285,12 +301,15 @@ def main():
     parser.add_argument("--type", default="scientific",
                       choices=["basic", "scientific", "dashboard"],
                       help="Visualization type")
+    parser.add_argument("--compress", default=os.environ.get("REQUEST_COMPRESSION", "none"),
+                      choices=["none", "gzip"],
+                      help="Compress the request body sent to the API")
 
     args = parser.parse_args()
 
     try:
         data = load_results(args.input)
-        result = create_visualization(data, args.type)
+        result = create_visualization(data, args.type, args.compress)
         save_result(args.output, result)
         print("Visualization creation completed successfully")
         return 0
@@ -5,6 +5,8 @@ import plotly.graph_objects as go
 import requests
 import os
 import json
+import threading
+from collections import OrderedDict
 
 # Set Streamlit page config
 st.set_page_config(page_title="Data Visualization", layout="wide")
@@ -15,21 +17,128 @@ viz_id = query_params.get('id', [None])[0]
 
 # API endpoint configuration
 API_BASE_URL = os.environ.get("API_BASE_URL", "http://visualization-api")
+# Series longer than this are downsampled by the API before rendering (0 disables)
+MAX_POINTS = int(os.environ.get("MAX_POINTS", "5000"))
+# Ask the API for per-category statistics instead of the raw samples of box/violin charts
+SUMMARIZE_DISTRIBUTIONS = os.environ.get("SUMMARIZE_DISTRIBUTIONS", "true").lower() == "true"
+# Render the Plotly figures the API builds and caches instead of building them in every session
+SERVER_FIGURES = os.environ.get("SERVER_FIGURES", "true").lower() == "true"
 
-def load_visualization_data(viz_id):
-    """Load visualization data from the backend API by ID."""
+# Rows per page of the "Show raw data" table (0 fetches the stored data whole)
+RAW_DATA_PAGE_ROWS = int(os.environ.get("RAW_DATA_PAGE_ROWS", "1000"))
+
+# Total size of the documents kept in the payload store; the least recently used ones are dropped above it
+PAYLOAD_CACHE_MAX_BYTES = int(os.environ.get("PAYLOAD_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Documents with a larger response body are never kept
+PAYLOAD_CACHE_MAX_ITEM_BYTES = int(os.environ.get("PAYLOAD_CACHE_MAX_ITEM_BYTES", str(32 * 1024 * 1024)))
+
+class _PayloadStore:
+    """
+    Process-wide {viz_id or (viz_id, "aggregates"|"figure"|"raw", ...): (etag, data)} LRU
+    shared across reruns and sessions, bounded by the total size of the response bodies
+    the documents were parsed from. Sessions run in their own threads, hence the lock.
+    """
+    def __init__(self, max_bytes, max_item_bytes):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.bytes_used = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            self._entries.move_to_end(key)
+            return item[0]
+
+    def put(self, key, entry, size):
+        if size > self.max_item_bytes or size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes_used -= previous[1]
+            self._entries[key] = (entry, size)
+            self.bytes_used += size
+            while self.bytes_used > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes_used -= evicted
+
+@st.cache_resource
+def _payload_store():
+    return _PayloadStore(PAYLOAD_CACHE_MAX_BYTES, PAYLOAD_CACHE_MAX_ITEM_BYTES)
+
+def _get_json(url, key, params=None):
+    """GET a JSON document, revalidating the copy in the payload store with If-None-Match."""
+    store = _payload_store()
+    cached = store.get(key)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    response = requests.get(url, headers=headers, params=params or {})
+    if response.status_code == 304 and cached:
+        return cached[1], response
+    if response.status_code == 200:
+        data = response.json()
+        # Large bodies may be redirected to the object store; keep the API's ETag, not the store's
+        etag = (response.history[0] if response.history else response).headers.get("ETag")
+        if etag:
+            store.put(key, (etag, data), len(response.content))
+        return data, response
+    return None, response
+
+def load_visualization_data(viz_id, raw=False, offset=0):
+    """
+    Load visualization data from the backend API by ID: downsampled and summarized
+    for charting, or with ``raw`` as stored, one page of RAW_DATA_PAGE_ROWS rows
+    from ``offset``.
+    """
     try:
         st.info(f"Loading data from API: {API_BASE_URL}/api/visualization/data/{viz_id}")
-        response = requests.get(f"{API_BASE_URL}/api/visualization/data/{viz_id}")
-        if response.status_code == 200:
-            return response.json()
-        else:
+        params = {"max_points": MAX_POINTS} if MAX_POINTS and not raw else {}
+        if SUMMARIZE_DISTRIBUTIONS and not raw:
+            # Ignored by the API for other chart types
+            params["summarize"] = "true"
+        if raw and RAW_DATA_PAGE_ROWS:
+            params.update(offset=offset, limit=RAW_DATA_PAGE_ROWS)
+        key = (viz_id, "raw", offset) if raw else viz_id
+        data, response = _get_json(f"{API_BASE_URL}/api/visualization/data/{viz_id}", key, params)
+        if data is None:
             st.error(f"Failed to load data: {response.text}")
-            return None
+        return data
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
         return None
 
+def load_aggregates(viz_id):
+    """
+    Load the aggregates the API precomputed at ingest (column summaries, histograms,
+    correlation matrix), or None if unavailable; charts then compute them locally.
+    """
+    try:
+        data, _ = _get_json(f"{API_BASE_URL}/api/visualization/data/{viz_id}/aggregates", (viz_id, "aggregates"))
+        return data
+    except Exception:
+        return None
+
+def load_figure(viz_id):
+    """
+    Load the Plotly figure JSON the API built for this visualization, or None if
+    unavailable or if some chart has no server-built figure (it is then rendered
+    from the data here).
+    """
+    try:
+        params = {"max_points": MAX_POINTS} if MAX_POINTS else {}
+        document, _ = _get_json(f"{API_BASE_URL}/api/visualization/data/{viz_id}/figure", (viz_id, "figure"), params)
+    except Exception:
+        return None
+    if not document:
+        return None
+    if "dashboard" in document:
+        charts = document["dashboard"]["charts"]
+        return document if charts and all(chart["figure"] for chart in charts) else None
+    return document if document.get("figure") else None
+
 def create_chart(chart_type, data, layout):
     """
     Create common charts: line, bar, scatter, area.
@@ -110,11 +219,79 @@ def create_chart(chart_type, data, layout):
         st.json(data)
         return None
 
-def create_scientific_chart(chart_type, data, layout):
+def apply_axis_titles(fig, data, layout):
+    """Apply layout settings: axis titles from the layout, else the data's x_label/y_label."""
+    if layout:
+        if "xaxis_title" in layout:
+            fig.update_xaxes(title_text=layout["xaxis_title"])
+        elif "x_label" in data:
+            fig.update_xaxes(title_text=data["x_label"])
+        if "yaxis_title" in layout:
+            fig.update_yaxes(title_text=layout["yaxis_title"])
+        elif "y_label" in data:
+            fig.update_yaxes(title_text=data["y_label"])
+    return fig
+
+def create_distribution_chart(chart_type, distributions, layout):
+    """
+    Create a boxplot or violin chart from per-group statistics precomputed by the API:
+    Plotly's precomputed box traces (q1/median/q3/fences) plus the outlier subset, and
+    for violins the density estimated on a fixed grid, mirrored around each group.
+    """
+    groups = [g for g in distributions["groups"] if g["count"]]
+    names = [str(g["name"]) for g in groups]
+    stats = {key: [g[key] for g in groups] for key in ("q1", "median", "q3", "lowerfence", "upperfence", "mean", "sd")}
+    fig = go.Figure()
+    if chart_type == "boxplot":
+        fig.add_trace(go.Box(x=names, boxpoints=False, name=distributions["y"], **stats))
+        fig.add_trace(go.Scatter(
+            x=[name for name, g in zip(names, groups) for _ in g["outliers"]],
+            y=[v for g in groups for v in g["outliers"]],
+            mode="markers", name="outliers", showlegend=False
+        ))
+    else:
+        for i, (name, g) in enumerate(zip(names, groups)):
+            kde = g.get("kde")
+            if not kde:
+                continue
+            peak = max(kde["density"]) or 1.0
+            half = [0.4 * d / peak for d in kde["density"]]
+            fig.add_trace(go.Scatter(
+                x=[i - w for w in half] + [i + w for w in reversed(half)],
+                y=kde["grid"] + kde["grid"][::-1],
+                fill="toself", mode="lines", name=name
+            ))
+        fig.add_trace(go.Box(x=list(range(len(groups))), width=0.1, boxpoints=False, showlegend=False,
+                             name=distributions["y"], **stats))
+        fig.update_xaxes(tickvals=list(range(len(names))), ticktext=names)
+    fig.update_layout(title=layout.get("title", ""))
+    fig.update_xaxes(title_text=distributions["x"])
+    fig.update_yaxes(title_text=distributions["y"])
+    return fig
+
+def create_scientific_chart(chart_type, data, layout, aggregates=None):
     """
     Create scientific charts: boxplot, violin, correlation.
+    Statistics precomputed by the API are used as-is: box/violin distributions
+    returned in place of the samples (``data["distributions"]``) or found in
+    ``aggregates``, and the correlation matrix.
     """
     try:
+        distributions = data.get("distributions") or (aggregates or {}).get("distributions")
+        if chart_type in ["boxplot", "violin"] and distributions:
+            fig = create_distribution_chart(chart_type, distributions, layout)
+            return apply_axis_titles(fig, data, layout)
+
+        correlation = (aggregates or {}).get("correlation")
+        if chart_type == "correlation" and correlation:
+            corr = pd.DataFrame(correlation["matrix"], index=correlation["columns"],
+                                columns=correlation["columns"], dtype=float)
+            fig = px.imshow(corr,
+                            title=layout.get("title", "Correlation Matrix"),
+                            color_continuous_scale='RdBu_r',
+                            zmin=-1, zmax=1)
+            return apply_axis_titles(fig, data, layout)
+
         # Accepts both list-of-dicts and {x,y} data
         if "data" in data and isinstance(data["data"], list):
             df = pd.DataFrame(data["data"])
@@ -155,27 +332,17 @@ def create_scientific_chart(chart_type, data, layout):
             st.warning(f"Unsupported scientific chart type: {chart_type}")
             return None
 
-        # Apply layout settings
-        if layout:
-            if "xaxis_title" in layout:
-                fig.update_xaxes(title_text=layout["xaxis_title"])
-            elif "x_label" in data:
-                fig.update_xaxes(title_text=data["x_label"])
-            if "yaxis_title" in layout:
-                fig.update_yaxes(title_text=layout["yaxis_title"])
-            elif "y_label" in data:
-                fig.update_yaxes(title_text=data["y_label"])
-
-        return fig
+        return apply_axis_titles(fig, data, layout)
     except Exception as e:
         st.error(f"Error creating scientific chart: {str(e)}")
         st.exception(e)
         return None
 
-def render_dashboard(dashboard_data):
+def render_dashboard(dashboard_data, aggregates=None):
     """
     Render a dashboard with multiple charts.
-    Charts are defined in dashboard_data["charts"].
+    Charts are defined in dashboard_data["charts"]; ``aggregates["charts"]`` holds
+    the API's precomputed aggregates of each.
     """
     st.subheader("Dashboard")
 
@@ -188,6 +355,7 @@ def render_dashboard(dashboard_data):
 
     rows = layout.get("rows", 2)
     cols = layout.get("cols", 2)
+    chart_aggregates = (aggregates or {}).get("charts", [])
 
     for r in range(rows):
         columns = st.columns(cols)
@@ -209,7 +377,10 @@ def render_dashboard(dashboard_data):
                         else:
                             st.error(f"Failed to create {chart_type} chart")
                     elif chart_type in ["boxplot", "violin", "correlation"]:
-                        fig = create_scientific_chart(chart_type, chart_data, chart_layout)
+                        fig = create_scientific_chart(
+                            chart_type, chart_data, chart_layout,
+                            chart_aggregates[chart_index] if chart_index < len(chart_aggregates) else None
+                        )
                         if fig:
                             st.plotly_chart(fig, use_container_width=True)
                         else:
@@ -217,50 +388,118 @@ def render_dashboard(dashboard_data):
                     else:
                         st.warning(f"Unsupported chart type: {chart_type}")
 
+def render_dashboard_figures(dashboard):
+    """Render a dashboard from the API-built figure of each chart."""
+    st.subheader("Dashboard")
+    charts = dashboard["charts"]
+    rows, cols = dashboard["rows"], dashboard["cols"]
+    for r in range(rows):
+        columns = st.columns(cols)
+        for c in range(cols):
+            chart_index = r * cols + c
+            if chart_index < len(charts):
+                with columns[c]:
+                    st.subheader(charts[chart_index]["title"])
+                    st.plotly_chart(charts[chart_index]["figure"], use_container_width=True)
+
+def show_summary(aggregates):
+    """Column summaries computed by the API over the full (not downsampled) data."""
+    if aggregates and aggregates.get("columns"):
+        with st.expander("Summary Statistics"):
+            st.dataframe(pd.DataFrame({
+                name: {k: summary[k] for k in ("count", "min", "max", "mean", "std")}
+                for name, summary in aggregates["columns"].items()
+            }).T)
+
+def show_raw_data(data):
+    """Show raw data for transparency."""
+    if 'data' in data and isinstance(data['data'], list):
+        st.dataframe(pd.DataFrame(data['data']))
+    elif 'x' in data and 'y' in data:
+        df = pd.DataFrame({
+            "x": data['x'],
+            "y": data['y']
+        })
+        st.dataframe(df)
+    else:
+        st.json(data)
+
+def show_raw_data_pages(viz_id):
+    """
+    Show the stored data a page at a time. The API reports the row count in
+    ``query.total`` for series and list-of-dict rows; other data comes back whole.
+    """
+    page = int(st.session_state.get("raw_data_page", 1))
+    viz_data = load_visualization_data(viz_id, raw=True, offset=(page - 1) * RAW_DATA_PAGE_ROWS)
+    if not viz_data:
+        return
+    query = viz_data.get("query")
+    if query and query["total"] > RAW_DATA_PAGE_ROWS:
+        pages = -(-query["total"] // RAW_DATA_PAGE_ROWS)
+        st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key="raw_data_page")
+        first = query["offset"] + 1
+        st.caption(f"Rows {first}-{first + query['returned'] - 1} of {query['total']}")
+    show_raw_data(viz_data.get('data', {}))
+
 # Main app logic
 if viz_id:
-    # Load visualization data from API
-    viz_data = load_visualization_data(viz_id)
-
-    if viz_data:
-        st.title(viz_data.get('title', 'Data Visualization'))
+    figure_doc = load_figure(viz_id) if SERVER_FIGURES else None
 
-        chart_type = viz_data.get('chart_type')
-        data = viz_data.get('data', {})
-        layout = viz_data.get('layout', {})
-        options = viz_data.get('options', {})
+    if figure_doc:
+        # Render the cached figures as they are; the data is only fetched on request
+        st.title(figure_doc.get('title') or 'Data Visualization')
 
-        # Show metadata if available
-        if "metadata" in viz_data and viz_data["metadata"]:
+        if figure_doc.get("metadata"):
             with st.expander("Visualization Metadata"):
-                st.json(viz_data["metadata"])
-
-        # Render based on chart type
-        if chart_type == "dashboard":
-            render_dashboard(data)
-        elif chart_type in ["boxplot", "violin", "correlation"]:
-            fig = create_scientific_chart(chart_type, data, layout)
-            if fig:
-                st.plotly_chart(fig, use_container_width=True)
+                st.json(figure_doc["metadata"])
+
+        if "dashboard" in figure_doc:
+            render_dashboard_figures(figure_doc["dashboard"])
         else:
-            fig = create_chart(chart_type, data, layout)
-            if fig:
-                st.plotly_chart(fig, use_container_width=True)
-
-        # Show raw data for transparency
-        with st.expander("Show Raw Data"):
-            if 'data' in data and isinstance(data['data'], list):
-                st.dataframe(pd.DataFrame(data['data']))
-            elif 'x' in data and 'y' in data:
-                df = pd.DataFrame({
-                    "x": data['x'],
-                    "y": data['y']
-                })
-                st.dataframe(df)
-            else:
-                st.json(data)
+            st.plotly_chart(figure_doc["figure"], use_container_width=True)
+
+        show_summary(load_aggregates(viz_id))
+
+        if st.checkbox("Show raw data"):
+            # The stored data, not the downsampled points or summaries the figure was built from
+            show_raw_data_pages(viz_id)
     else:
-        st.error(f"Failed to load visualization data for ID {viz_id}")
+        # Load visualization data from API
+        viz_data = load_visualization_data(viz_id)
+
+        if viz_data:
+            st.title(viz_data.get('title', 'Data Visualization'))
+
+            chart_type = viz_data.get('chart_type')
+            data = viz_data.get('data', {})
+            layout = viz_data.get('layout', {})
+            options = viz_data.get('options', {})
+            aggregates = load_aggregates(viz_id)
+
+            # Show metadata if available
+            if "metadata" in viz_data and viz_data["metadata"]:
+                with st.expander("Visualization Metadata"):
+                    st.json(viz_data["metadata"])
+
+            # Render based on chart type
+            if chart_type == "dashboard":
+                render_dashboard(data, aggregates)
+            elif chart_type in ["boxplot", "violin", "correlation"]:
+                fig = create_scientific_chart(chart_type, data, layout, aggregates)
+                if fig:
+                    st.plotly_chart(fig, use_container_width=True)
+            else:
+                fig = create_chart(chart_type, data, layout)
+                if fig:
+                    st.plotly_chart(fig, use_container_width=True)
+
+            show_summary(aggregates)
+
+            # The chart data may be downsampled or summarized, so the stored data is fetched on request
+            if st.checkbox("Show raw data"):
+                show_raw_data_pages(viz_id)
+        else:
+            st.error(f"Failed to load visualization data for ID {viz_id}")
 else:
     st.title("Data Visualization Demo")
     st.info("Please create a visualization using the API and access it via the returned URL.")
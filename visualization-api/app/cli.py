@@ -0,0 +1,55 @@
+"""
+Maintenance commands, run inside the API container (from /code):
+
+    python -m app.cli rebuild-catalog
+    python -m app.cli migrate-layout [--max-moves-per-second N]
+    python -m app.cli sync-store
+"""
+import sys
+import time
+import logging
+import argparse
+
+from .services.streamlit_service import streamlit_service
+
+logger = logging.getLogger(__name__)
+
+def rebuild_catalog(args: argparse.Namespace) -> int:
+    """Rebuild the visualization catalog from the visualizations in STREAMLIT_DATA_DIR."""
+    started = time.time()
+    result = streamlit_service.rebuild_catalog()
+    print(f"Catalog {streamlit_service.catalog.path}: {result['upserted']} visualizations indexed, "
+          f"{result['removed']} stale entries removed in {time.time() - started:.1f}s")
+    return 0
+
+def migrate_layout(args: argparse.Namespace) -> int:
+    """Move visualization directories into the STREAMLIT_SHARD_DEPTH layout while the API keeps serving."""
+    started = time.time()
+    result = streamlit_service.migrate_layout(args.max_moves_per_second)
+    print(f"Layout migration to shard depth {result['shard_depth']}: {result['moved']} moved, "
+          f"{result['skipped']} skipped in {time.time() - started:.1f}s")
+    return 1 if result["skipped"] else 0
+
+def sync_store(args: argparse.Namespace) -> int:
+    """Upload visualizations in STREAMLIT_DATA_DIR that the configured object store does not hold yet."""
+    started = time.time()
+    result = streamlit_service.sync_object_store()
+    print(f"Object store sync ({streamlit_service.object_store.name}): {result['uploaded']} uploaded, "
+          f"{result['present']} already present, {result['skipped']} skipped in {time.time() - started:.1f}s")
+    return 1 if result["skipped"] else 0
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Visualization API maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild-catalog", help=rebuild_catalog.__doc__).set_defaults(func=rebuild_catalog)
+    migrate = commands.add_parser("migrate-layout", help=migrate_layout.__doc__)
+    migrate.add_argument("--max-moves-per-second", type=float, default=0,
+                         help="Pace directory moves to limit load on the volume (0 = unlimited)")
+    migrate.set_defaults(func=migrate_layout)
+    commands.add_parser("sync-store", help=sync_store.__doc__).set_defaults(func=sync_store)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
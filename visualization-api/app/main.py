@@ -1,24 +1,56 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Query
+from typing import List, Optional
+from pydantic import ValidationError
 import logging
 from .services.k8s_service import K8sResourceManager
-from .services.streamlit_service import streamlit_service
+from .services.streamlit_service import streamlit_service, StoredPayload
+from .services.storage_writer import storage_writer
+from .services.visualization_cache import visualization_cache
+from .services.data_query import DataQuery
+from .services.upload_service import upload_service, UploadTooLargeError
+from .services.retention import retention_sweeper
+from .services import column_validation
+from .services import figures
+from .middleware.request_decompression import RequestDecompressionMiddleware
 
 from .models.k8s_models import VisualizationRequest, VisualizationResponse
 from .models.visualization_models import StreamlitVisualizationRequest, StreamlitVisualizationResponse
 from .models.visualization_models import ScientificVisualizationRequest, DashboardVisualizationRequest
+from .models.visualization_models import UploadSessionRequest, UploadSessionResponse
+from .models.visualization_models import ColumnarVisualizationEnvelope
+from .models.visualization_models import BatchVisualizationRequest, BatchVisualizationResponse
+from .models.visualization_models import VisualizationListResponse
 
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
 import json
 import asyncio
 
 from datetime import datetime
 
 app = FastAPI()
+app.add_middleware(RequestDecompressionMiddleware)
 logging.basicConfig(level=logging.INFO) 
 logger = logging.getLogger(__name__)
 
 k8s_manager = K8sResourceManager()
 
+@app.on_event("startup")
+async def start_retention():
+    """Load the access index and start the background retention sweeper."""
+    await retention_sweeper.start()
+
+@app.on_event("startup")
+async def start_k8s_manager():
+    """Connect to the Kubernetes API server and start watching the visualization Services and Ingresses."""
+    await k8s_manager.start()
+
+@app.on_event("shutdown")
+async def flush_storage():
+    """Persist the access index, flush pending storage writes and close the Kubernetes client before the worker exits."""
+    await retention_sweeper.stop()
+    await storage_writer.close()
+    await k8s_manager.close()
+
 @app.post("/visualizations/expose", response_model=VisualizationResponse)
 async def create_visualization(request: VisualizationRequest):
     """
@@ -54,11 +86,65 @@ async def delete_visualization(name: str, label: str):
         logger.error(f"Internal Server Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/visualizations", response_model=VisualizationListResponse)
+async def list_visualizations(
+    chart_type: Optional[str] = Query(None, description="Only visualizations of this chart type"),
+    title_prefix: Optional[str] = Query(None, description="Only titles starting with this text"),
+    created_after: Optional[datetime] = Query(None, description="Only visualizations created at or after this time"),
+    created_before: Optional[datetime] = Query(None, description="Only visualizations created before this time"),
+    metadata: Optional[List[str]] = Query(None, description="key (key present) or key:value (equal), repeatable"),
+    limit: int = Query(50, ge=1, le=1000, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+):
+    """
+    List stored visualizations, newest first, from the catalog (no payload is read).
+    Filters combine with AND; pages are keyset-paginated through next_cursor.
+    """
+    filters = []
+    for item in metadata or []:
+        key, sep, value = item.partition(":")
+        filters.append((key, value if sep else None))
+    try:
+        items, next_cursor = await streamlit_service.list_visualizations(
+            chart_type=chart_type,
+            title_prefix=title_prefix,
+            created_after=_catalog_time(created_after),
+            created_before=_catalog_time(created_before),
+            metadata=filters,
+            limit=limit,
+            cursor=cursor
+        )
+        return VisualizationListResponse(items=items, next_cursor=next_cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error listing visualizations: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _catalog_time(value: Optional[datetime]) -> Optional[str]:
+    """created_at is stored as a naive local ISO timestamp; convert aware times to match."""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.isoformat()
+
 @app.get("/healthz")
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+@app.get("/metrics")
+async def metrics():
+    """Internal performance counters (storage writer stage timings, cache hit rates, etc.)."""
+    return {
+        "storage_writer": storage_writer.snapshot(),
+        "visualization_cache": visualization_cache.snapshot(),
+        "retention": retention_sweeper.snapshot(),
+        "object_store": streamlit_service.object_store.snapshot() if streamlit_service.object_store else None,
+        "k8s": k8s_manager.snapshot()
+    }
+
 @app.post("/visualizations/streamlit", response_model=StreamlitVisualizationResponse)
 async def create_streamlit_visualization(request: StreamlitVisualizationRequest):
     """
@@ -73,27 +159,341 @@ async def create_streamlit_visualization(request: StreamlitVisualizationRequest)
             chart_type=request.chart_type,
             data=request.data,
             layout=request.layout,
-            options=request.options
+            options=request.options,
+            dedupe=request.dedupe
         )
         return StreamlitVisualizationResponse(**result)
     except Exception as e:
         logger.error(f"Error creating Streamlit visualization: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/visualizations/streamlit/columnar", response_model=StreamlitVisualizationResponse)
+async def create_columnar_visualization(
+    envelope: str = Form(..., description="JSON object: title, chart_type and optional data, layout, "
+                                          "options, metadata, dtypes and dedupe"),
+    columns: List[UploadFile] = File(..., description="One part per numeric data column, as a .npy file or raw "
+                                                      "little-endian values; the filename (minus .npy/.bin) names it")
+):
+    """
+    Fast-path ingest for large numeric series. Only the envelope is validated by
+    pydantic; the columns are checked with vectorized NumPy operations (dtype, shape,
+    equal lengths, finite values) and stored as .npy files without ever becoming
+    Python lists.
+    """
+    try:
+        request = ColumnarVisualizationEnvelope.model_validate_json(envelope)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=json.loads(e.json()))
+    try:
+        decoded = {}
+        for upload in columns:
+            name = upload.filename or ""
+            for extension in (".npy", ".bin"):
+                if name.endswith(extension):
+                    name = name[:-len(extension)]
+            if not name or name in decoded or name in (request.data or {}):
+                raise ValueError(f"Column parts need distinct filenames not used in data: {upload.filename!r}")
+            raw = await upload.read()
+            decoded[name] = column_validation.decode_column(name, raw, (request.dtypes or {}).get(name))
+        arrays = await asyncio.to_thread(column_validation.validate_columns, decoded)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        logger.info(f"Received request to create columnar visualization: {request.title}")
+        result = await streamlit_service.create_columnar_visualization(
+            title=request.title,
+            chart_type=request.chart_type,
+            columns=arrays,
+            data=request.data,
+            layout=request.layout,
+            options=request.options,
+            metadata=request.metadata,
+            dedupe=request.dedupe
+        )
+        return StreamlitVisualizationResponse(**result)
+    except Exception as e:
+        logger.error(f"Error creating columnar visualization: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# data.json never changes once written, so clients and proxies may cache it indefinitely
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Presigned URLs expire, so redirects to them must be revalidated (the ETag still allows 304s)
+REDIRECT_CACHE_CONTROL = "no-cache"
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against a strong ETag (RFC 9110 13.1.2)."""
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+def _payload_response(payload: StoredPayload, request: Request) -> Response:
+    """
+    Send a stored JSON body as-is: from memory, or streamed from disk with its
+    length (if known), or as a redirect to the object store.
+    """
+    # Each content coding is a separate representation and needs its own strong ETag
+    etag = f'"{payload.etag}-{payload.encoding}"' if payload.encoding else f'"{payload.etag}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    if payload.redirect_url is not None:
+        headers["Cache-Control"] = REDIRECT_CACHE_CONTROL
+        return RedirectResponse(payload.redirect_url, status_code=307, headers=headers)
+    if payload.encoding:
+        headers["Content-Encoding"] = payload.encoding
+    if payload.body is not None:
+        return Response(content=payload.body, media_type="application/json", headers=headers)
+    if payload.stream is not None:
+        if payload.size is not None:
+            headers["Content-Length"] = str(payload.size)
+        return StreamingResponse(payload.stream, media_type="application/json", headers=headers)
+    return FileResponse(payload.path, media_type="application/json", headers=headers)
+
 @app.get("/api/visualization/data/{viz_id}")
-async def get_streamlit_visualization_data(viz_id: str):
+async def get_streamlit_visualization_data(
+    viz_id: str,
+    request: Request,
+    max_points: Optional[int] = Query(None, ge=3, description="Downsample x/y series to at most this many points"),
+    offset: int = Query(0, ge=0, description="Skip this many rows/points"),
+    limit: Optional[int] = Query(None, ge=0, description="Return at most this many rows/points"),
+    x_min: Optional[float] = Query(None, description="Only points with x >= x_min (x must be sorted)"),
+    x_max: Optional[float] = Query(None, description="Only points with x <= x_max (x must be sorted)"),
+    summarize: bool = Query(False, description="Replace box/violin samples with per-group statistics")
+):
     """
     Get Streamlit visualization data for use by the Streamlit application.
+    Responses carry a strong ETag and honour If-None-Match with 304 Not Modified.
+    With STORAGE_PRESIGNED_REDIRECT, large unqueried bodies are answered with a
+    307 redirect to a presigned object store URL instead of being proxied.
+    x_min/x_max window a sorted x series (or list-of-dict rows by their x) and
+    offset/limit page through the result; a "query" object reports the totals.
+    With max_points, line/area series are reduced with LTTB and bar series with
+    min/max bucketing; other chart types are returned unchanged. With summarize,
+    boxplot/violin samples are replaced by quartiles, fences, outliers and a KDE
+    per group (data.distributions); the other parameters are then ignored.
     """
+    query = DataQuery(x_min=x_min, x_max=x_max, offset=offset, limit=limit, max_points=max_points,
+                      summarize=summarize)
     try:
-        visualization_data = await streamlit_service.get_visualization_data(viz_id)
-        return visualization_data
+        if not query.is_identity:
+            payload = await streamlit_service.query_visualization_data(viz_id, query)
+            if payload is not None:
+                return _payload_response(payload, request)
+        payload = await streamlit_service.open_visualization_data(
+            viz_id, accept_encoding=request.headers.get("accept-encoding"), allow_redirect=True
+        )
+        return _payload_response(payload, request)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Visualization data not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error retrieving visualization data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/visualization/data/{viz_id}/aggregates")
+async def get_streamlit_visualization_aggregates(viz_id: str, request: Request):
+    """
+    Get aggregates precomputed from the visualization's data: count, min/max/mean/std
+    and a histogram per numeric column, and their correlation matrix (pairwise
+    complete, as pandas computes it). Dashboards have one entry per chart in "charts".
+    """
+    try:
+        payload = await streamlit_service.open_aggregates(viz_id)
+        return _payload_response(payload, request)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Visualization data not found")
+    except Exception as e:
+        logger.error(f"Error retrieving visualization aggregates: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/visualization/data/{viz_id}/figure")
+async def get_streamlit_visualization_figure(
+    viz_id: str,
+    request: Request,
+    max_points: Optional[int] = Query(None, ge=3, le=figures.MAX_POINTS,
+                                      description="Downsample x/y series to at most this many points")
+):
+    """
+    Get the visualization as Plotly figure JSON, ready for st.plotly_chart: built
+    once from the (downsampled, summarized) data and its aggregates, then cached.
+    "figure" is null for charts that must be rendered from the data; dashboards
+    have one figure per chart in "dashboard.charts".
+    """
+    try:
+        payload = await streamlit_service.open_figure(viz_id, max_points=max_points)
+        return _payload_response(payload, request)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Visualization data not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error retrieving visualization figure: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/visualization/data/{viz_id}/columns/{name}")
+async def get_streamlit_visualization_column(viz_id: str, name: str):
+    """
+    Get one numeric column of a visualization's data as a NumPy .npy file.
+    Only available for payloads stored in columnar form.
+    """
+    try:
+        url = await streamlit_service.presigned_column_url(viz_id, name)
+        if url is not None:
+            return RedirectResponse(url, status_code=307, headers={"Cache-Control": REDIRECT_CACHE_CONTROL})
+        columns = await streamlit_service.open_columns(viz_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Visualization data not found")
+    except Exception as e:
+        logger.error(f"Error retrieving visualization column: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if columns is None or name not in columns:
+        raise HTTPException(status_code=404, detail=f"Column {name} not stored in columnar form")
+    return FileResponse(
+        columns[name].filename,
+        media_type="application/octet-stream",
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    )
+
+@app.delete("/visualizations/streamlit/{viz_id}")
+async def delete_streamlit_visualization(viz_id: str):
+    """
+    Delete a stored Streamlit, scientific or dashboard visualization.
+    The shared payload is only removed once no other visualization references it.
+    """
+    try:
+        await streamlit_service.delete_visualization(viz_id)
+        return {"detail": "Visualization deleted successfully"}
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Visualization data not found")
+    except Exception as e:
+        logger.error(f"Error deleting visualization: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+BATCH_ITEM_MODELS = {
+    "streamlit": StreamlitVisualizationRequest,
+    "scientific": ScientificVisualizationRequest,
+    "dashboard": DashboardVisualizationRequest
+}
+
+@app.post("/visualizations/batch", response_model=BatchVisualizationResponse)
+async def create_visualizations_batch(request: BatchVisualizationRequest):
+    """
+    Create many streamlit, scientific and dashboard visualizations in one request.
+    Every valid item is written in a single storage transaction; each item gets
+    its own id or error, so one bad item does not fail the others.
+    """
+    results = [None] * len(request.items)
+    specs, indices = [], []
+    for index, item in enumerate(request.items):
+        model = BATCH_ITEM_MODELS.get(item.get("type"))
+        if model is None:
+            results[index] = {"index": index, "status": "error",
+                              "error_message": f"Unsupported visualization type: {item.get('type')}"}
+            continue
+        try:
+            spec = model.model_validate({k: v for k, v in item.items() if k != "type"})
+        except ValidationError as e:
+            results[index] = {"index": index, "status": "error", "error_message": str(e)}
+            continue
+        specs.append(dict(spec.model_dump(), type=item["type"]))
+        indices.append(index)
+
+    try:
+        logger.info(f"Received request to create {len(request.items)} visualizations in a batch")
+        created = await streamlit_service.create_visualizations_batch(specs)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error creating visualization batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    for index, result in zip(indices, created):
+        results[index] = dict(result, index=index)
+    failed = sum(1 for result in results if result["status"] != "ready")
+    return BatchVisualizationResponse(created=len(results) - failed, failed=failed, results=results)
+
+@app.post("/visualizations/uploads", response_model=UploadSessionResponse)
+async def create_upload_session(request: UploadSessionRequest):
+    """
+    Open a chunked upload session for a dataset too large for a single request.
+    Append NDJSON or CSV chunks to it, then finalize it into a visualization.
+    """
+    try:
+        return await upload_service.create_session(
+            title=request.title,
+            chart_type=request.chart_type,
+            format=request.format,
+            layout=request.layout,
+            options=request.options,
+            metadata=request.metadata,
+            dedupe=request.dedupe
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error opening upload session: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/visualizations/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload_session(upload_id: str):
+    """Get an upload session, including the number of bytes received so far."""
+    try:
+        return await upload_service.get_session(upload_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+
+@app.post("/visualizations/uploads/{upload_id}/chunks", response_model=UploadSessionResponse)
+async def append_upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: Optional[int] = Query(None, ge=0, description="Bytes received before this chunk (for safe retries)")
+):
+    """
+    Append the raw request body (a piece of the NDJSON or CSV stream) to an upload.
+    The body is streamed to disk as it arrives; chunks need not end on a row boundary.
+    """
+    try:
+        return await upload_service.append_chunk(upload_id, request.stream(), offset=offset)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error appending upload chunk: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/visualizations/uploads/{upload_id}/finalize", response_model=StreamlitVisualizationResponse)
+async def finalize_upload(upload_id: str):
+    """Store the uploaded rows as a visualization (columns of ``data``) and close the session."""
+    try:
+        return await upload_service.finalize(upload_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error finalizing upload: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/visualizations/uploads/{upload_id}")
+async def abort_upload(upload_id: str):
+    """Discard an upload session and the data received for it."""
+    try:
+        await upload_service.abort(upload_id)
+        return {"detail": "Upload session deleted successfully"}
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+
 @app.post("/visualizations/scientific", response_model=StreamlitVisualizationResponse)
 async def create_scientific_visualization(request: ScientificVisualizationRequest):
     """
@@ -108,7 +508,8 @@ async def create_scientific_visualization(request: ScientificVisualizationReques
             data=request.data,
             layout=request.layout,
             options=request.options,
-            metadata=request.metadata
+            metadata=request.metadata,
+            dedupe=request.dedupe
         )
         return StreamlitVisualizationResponse(**result)
     except Exception as e:
@@ -127,7 +528,8 @@ async def create_dashboard_visualization(request: DashboardVisualizationRequest)
             title=request.title,
             data=request.data,
             options=request.options,
-            metadata=request.metadata
+            metadata=request.metadata,
+            dedupe=request.dedupe
         )
         return StreamlitVisualizationResponse(**result)
     except Exception as e:
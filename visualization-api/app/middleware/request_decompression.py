@@ -0,0 +1,241 @@
+import os
+import json
+import zlib
+import logging
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on output produced per decompression step, so a single small
+# compressed chunk can never expand into an unbounded allocation
+INFLATE_STEP_BYTES = 1024 * 1024
+
+class _Limit:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total = 0
+
+    def add(self, n: int) -> None:
+        self.total += n
+        if self.total > self.max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Decompressed request body exceeds {self.max_bytes} bytes"
+            )
+
+class _ZlibInflater:
+    def __init__(self, wbits: int):
+        self._d = zlib.decompressobj(wbits=wbits)
+
+    def feed(self, data: bytes, limit: _Limit) -> List[bytes]:
+        out = []
+        while data:
+            chunk = self._d.decompress(data, INFLATE_STEP_BYTES)
+            limit.add(len(chunk))
+            out.append(chunk)
+            data = self._d.unconsumed_tail
+        return out
+
+    def finish(self, limit: _Limit) -> List[bytes]:
+        tail = self._d.flush()
+        limit.add(len(tail))
+        if not self._d.eof:
+            raise HTTPException(status_code=400, detail="Truncated compressed request body")
+        return [tail]
+
+class _Sink:
+    """Write target for zstandard's stream_writer; enforces the limit as output is produced."""
+
+    def __init__(self, limit: _Limit):
+        self.limit = limit
+        self.chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.limit.add(len(data))
+        self.chunks.append(bytes(data))
+        return len(data)
+
+ZSTD_MAGIC = 0xFD2FB528
+ZSTD_SKIPPABLE_MAGIC = 0x184D2A50  # low 4 bits are free
+
+class _ZstdFrames:
+    """
+    Follows the frame and block headers of a zstd stream (RFC 8878) to tell whether
+    it ended on a frame boundary; zstandard's stream_writer does not report that.
+    Only the headers are read: block contents are skipped over.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self._at_boundary = True
+        self._buffer = bytearray()
+        self._walker = self._walk()
+        self._skip, self._want = next(self._walker)
+
+    @property
+    def complete(self) -> bool:
+        return self.frames > 0 and self._at_boundary and not self._skip and not self._buffer
+
+    def feed(self, data: bytes) -> None:
+        pos = 0
+        while pos < len(data):
+            if self._skip:
+                n = min(self._skip, len(data) - pos)
+                self._skip -= n
+                pos += n
+                continue
+            n = min(self._want - len(self._buffer), len(data) - pos)
+            self._buffer += data[pos:pos + n]
+            pos += n
+            if len(self._buffer) == self._want:
+                field = bytes(self._buffer)
+                self._buffer.clear()
+                self._skip, self._want = self._walker.send(field)
+
+    def _walk(self):
+        """Yields (bytes to skip, bytes to read next) and receives the bytes read."""
+        skip = 0
+        while True:
+            self._at_boundary = True
+            magic = int.from_bytes((yield skip, 4), "little")
+            self._at_boundary = False
+            if magic & 0xFFFFFFF0 == ZSTD_SKIPPABLE_MAGIC:
+                skip = int.from_bytes((yield 0, 4), "little")
+                continue
+            if magic != ZSTD_MAGIC:
+                raise ValueError("Unknown zstd frame magic number")
+            descriptor = (yield 0, 1)[0]
+            single_segment = descriptor >> 5 & 1
+            # Window descriptor, dictionary id and frame content size
+            skip = (1 - single_segment) + (0, 1, 2, 4)[descriptor & 3] + (single_segment, 2, 4, 8)[descriptor >> 6]
+            last = False
+            while not last:
+                header = int.from_bytes((yield skip, 3), "little")
+                last, block_type, size = header & 1, header >> 1 & 3, header >> 3
+                skip = 1 if block_type == 1 else size  # RLE blocks hold a single byte
+            # Content checksum
+            skip += 4 * (descriptor >> 2 & 1)
+            self.frames += 1
+
+class _ZstdInflater:
+    def __init__(self, limit: _Limit):
+        self._sink = _Sink(limit)
+        self._writer = zstandard.ZstdDecompressor().stream_writer(
+            self._sink, write_size=INFLATE_STEP_BYTES
+        )
+        self._frames = _ZstdFrames()
+
+    def feed(self, data: bytes, limit: _Limit) -> List[bytes]:
+        self._frames.feed(data)
+        self._writer.write(data)
+        self._writer.flush()
+        out, self._sink.chunks = self._sink.chunks, []
+        return out
+
+    def finish(self, limit: _Limit) -> List[bytes]:
+        if not self._frames.complete:
+            raise HTTPException(status_code=400, detail="Truncated compressed request body")
+        return []
+
+class RequestDecompressionMiddleware:
+    """
+    ASGI middleware that transparently inflates gzip, deflate or zstd request bodies.
+
+    The body is decompressed incrementally as the application reads it, so memory
+    use is bounded by what the endpoint itself keeps. Decompressed output is capped
+    at ``max_decompressed_bytes`` (zip-bomb guard): exceeding it fails the request
+    with 413, and unknown codings are rejected with 415.
+    """
+
+    def __init__(self, app, max_decompressed_bytes: Optional[int] = None):
+        self.app = app
+        if max_decompressed_bytes is None:
+            max_decompressed_bytes = int(os.environ.get("REQUEST_MAX_DECOMPRESSED_BYTES", str(128 * 1024 * 1024)))
+        self.max_decompressed_bytes = max_decompressed_bytes
+
+    def _inflater(self, coding: str, limit: _Limit):
+        if coding in ("gzip", "x-gzip"):
+            return _ZlibInflater(wbits=31)
+        if coding == "deflate":
+            return _ZlibInflater(wbits=15)
+        if coding == "zstd" and zstandard is not None:
+            return _ZstdInflater(limit)
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        coding = None
+        headers = []
+        for key, value in scope["headers"]:
+            if key == b"content-encoding":
+                coding = value.decode("latin-1").strip().lower()
+            elif key != b"content-length":
+                headers.append((key, value))
+        if coding is None or coding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        limit = _Limit(self.max_decompressed_bytes)
+        inflater = self._inflater(coding, limit)
+        if inflater is None:
+            await self._reject(send, 415, f"Unsupported Content-Encoding: {coding}")
+            return
+
+        finished = False
+
+        async def inflating_receive():
+            nonlocal finished
+            if finished:
+                return await receive()
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+            try:
+                chunks = inflater.feed(message.get("body", b""), limit)
+                more_body = message.get("more_body", False)
+                if not more_body:
+                    chunks += inflater.finish(limit)
+                    finished = True
+            except zlib.error as e:
+                raise HTTPException(status_code=400, detail=f"Invalid {coding} request body: {e}")
+            except HTTPException:
+                raise
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Invalid {coding} request body: {e}")
+            return {"type": "http.request", "body": b"".join(chunks), "more_body": more_body}
+
+        response_started = False
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(dict(scope, headers=headers), inflating_receive, tracking_send)
+        except HTTPException as e:
+            if response_started:
+                raise
+            logger.error(f"Rejected compressed request body: {e.detail}")
+            await self._reject(send, e.status_code, e.detail)
+
+    @staticmethod
+    async def _reject(send, status_code: int, detail: str) -> None:
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
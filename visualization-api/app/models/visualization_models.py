@@ -22,6 +22,7 @@ class StreamlitVisualizationRequest(BaseModel):
     data: Dict[str, Any]
     layout: Optional[Dict[str, Any]] = None
     options: Optional[Dict[str, Any]] = None
+    dedupe: bool = False  # return the existing visualization if identical content is already stored
 
 class StreamlitVisualizationResponse(BaseModel):
     visualization_id: str
@@ -30,6 +31,17 @@ class StreamlitVisualizationResponse(BaseModel):
     message: str
     error_message: Optional[str] = None
 
+class ColumnarVisualizationEnvelope(BaseModel):
+    """Everything but the numeric columns of a POST /visualizations/streamlit/columnar request."""
+    title: str
+    chart_type: str
+    data: Optional[Dict[str, Any]] = None  # small non-column fields (labels, ...) merged into data
+    layout: Optional[Dict[str, Any]] = None
+    options: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = None
+    dtypes: Optional[Dict[str, str]] = None  # dtype of each raw (non-.npy) column part
+    dedupe: bool = False
+
 class ScientificVisualizationRequest(BaseModel):
     title: str
     chart_type: str  # "boxplot", "violin", "heatmap", "correlation"
@@ -37,10 +49,55 @@ class ScientificVisualizationRequest(BaseModel):
     layout: Optional[Dict[str, Any]] = None
     options: Optional[Dict[str, Any]] = None
     metadata: Optional[Dict[str, Any]] = None
+    dedupe: bool = False
 
 class DashboardVisualizationRequest(BaseModel):
     title: str
     data: Dict[str, Any]
     options: Optional[Dict[str, Any]] = None
     metadata: Optional[Dict[str, Any]] = None
-    
\ No newline at end of file
+    dedupe: bool = False
+    
+
+class UploadSessionRequest(BaseModel):
+    title: str
+    chart_type: str
+    format: str = "ndjson"  # "ndjson" (one JSON object per row) or "csv" (header row first)
+    layout: Optional[Dict[str, Any]] = None
+    options: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = None
+    dedupe: bool = False
+
+class UploadSessionResponse(BaseModel):
+    upload_id: str
+    status: str
+    format: str
+    received_bytes: int
+
+class BatchVisualizationRequest(BaseModel):
+    # Each item: {"type": "streamlit" | "scientific" | "dashboard", ...fields of that create request}
+    items: List[Dict[str, Any]]
+
+class BatchVisualizationResult(BaseModel):
+    index: int
+    visualization_id: Optional[str] = None
+    status: str
+    visualization_url: Optional[str] = None
+    message: Optional[str] = None
+    error_message: Optional[str] = None
+
+class BatchVisualizationResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BatchVisualizationResult]
+
+class VisualizationSummary(BaseModel):
+    id: str
+    title: Optional[str] = None
+    chart_type: Optional[str] = None
+    created_at: str
+    metadata: Optional[Dict[str, Any]] = None
+
+class VisualizationListResponse(BaseModel):
+    items: List[VisualizationSummary]
+    next_cursor: Optional[str] = None  # pass as ?cursor= to get the next page; None on the last page
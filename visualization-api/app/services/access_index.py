@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Per-visualization files outside its blob: <viz_id>/meta.json and the blob's refs/<viz_id> marker
+VIZ_FILES = 2
+
+class AccessIndex:
+    """
+    Last-access times and on-disk sizes of stored visualizations.
+
+    Entries are kept in an OrderedDict in least-recently-used order, so recording
+    an access is O(1) and never touches the disk, and the oldest entries are found
+    without walking the storage tree. Sizes are tracked per content-addressed blob,
+    so a blob shared by several visualizations is only counted (and freed) once.
+    The index is persisted as a JSON file by the retention sweeper.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # viz_id -> [last_access, created, blob key]
+        self._entries: "OrderedDict[str, List[Any]]" = OrderedDict()
+        # blob key -> [bytes, files, referencing visualizations]
+        self._blobs: Dict[str, List[int]] = {}
+        self.bytes_used = 0
+        self.files_used = 0
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, viz_id: str) -> bool:
+        return viz_id in self._entries
+
+    def record(self, viz_id: str, blob: str, blob_bytes: Optional[int] = None, blob_files: Optional[int] = None,
+               now: Optional[float] = None) -> None:
+        """Add a stored visualization; ``blob_bytes``/``blob_files`` are required for a blob new to the index."""
+        now = time.time() if now is None else now
+        if viz_id in self._entries:
+            self._entries.move_to_end(viz_id)
+            self._entries[viz_id][0] = now
+            return
+        stats = self._blobs.get(blob)
+        if stats is None:
+            stats = self._blobs[blob] = [blob_bytes or 0, blob_files or 0, 0]
+            self.bytes_used += stats[0]
+            self.files_used += stats[1]
+        stats[2] += 1
+        self.files_used += VIZ_FILES
+        self._entries[viz_id] = [now, now, blob]
+        self.dirty = True
+
+    def grow_blob(self, blob: str, blob_bytes: int, blob_files: int = 1) -> None:
+        """Count files added to an indexed blob after it was stored (e.g. a cached figure)."""
+        stats = self._blobs.get(blob)
+        if stats is None:
+            return
+        stats[0] += blob_bytes
+        stats[1] += blob_files
+        self.bytes_used += blob_bytes
+        self.files_used += blob_files
+        self.dirty = True
+
+    def last_access(self, viz_id: str) -> Optional[float]:
+        entry = self._entries.get(viz_id)
+        return entry[0] if entry is not None else None
+
+    def has_blob(self, blob: str) -> bool:
+        return blob in self._blobs
+
+    def touch(self, viz_id: str) -> None:
+        entry = self._entries.get(viz_id)
+        if entry is not None:
+            entry[0] = time.time()
+            self._entries.move_to_end(viz_id)
+            self.dirty = True
+
+    def forget(self, viz_id: str) -> None:
+        entry = self._entries.pop(viz_id, None)
+        if entry is None:
+            return
+        self.files_used -= VIZ_FILES
+        stats = self._blobs.get(entry[2])
+        if stats is not None:
+            stats[2] -= 1
+            if stats[2] <= 0:
+                del self._blobs[entry[2]]
+                self.bytes_used -= stats[0]
+                self.files_used -= stats[1]
+        self.dirty = True
+
+    def oldest(self) -> Iterator[Tuple[str, float]]:
+        """(viz_id, last_access) from least to most recently used, over a snapshot of the index."""
+        return iter([(viz_id, entry[0]) for viz_id, entry in self._entries.items()])
+
+    def expired(self, cutoff: float) -> List[str]:
+        """Visualizations last accessed before ``cutoff``; stops at the first newer entry."""
+        victims = []
+        for viz_id, entry in self._entries.items():
+            if entry[0] >= cutoff:
+                break
+            victims.append(viz_id)
+        return victims
+
+    def accessed_since(self, since: float) -> List[str]:
+        """Visualizations last accessed at or after ``since``, most recent first; stops at the first older entry."""
+        viz_ids = []
+        for viz_id, entry in reversed(self._entries.items()):
+            if entry[0] < since:
+                break
+            viz_ids.append(viz_id)
+        return viz_ids
+
+    def dump(self) -> Dict[str, Any]:
+        """Serializable copy of the index (taken on the event loop, written elsewhere)."""
+        self.dirty = False
+        return {
+            "version": 1,
+            "entries": [[viz_id] + entry for viz_id, entry in self._entries.items()],
+            "blobs": {blob: stats[:2] for blob, stats in self._blobs.items()}
+        }
+
+    def load(self, state: Dict[str, Any]) -> None:
+        self._entries.clear()
+        self._blobs.clear()
+        self.bytes_used = self.files_used = 0
+        blobs = state.get("blobs", {})
+        for viz_id, last_access, created, blob in sorted(state.get("entries", []), key=lambda e: e[1]):
+            stats = blobs.get(blob, [0, 0])
+            self.record(viz_id, blob, stats[0], stats[1], now=last_access)
+            self._entries[viz_id][1] = created
+        self.dirty = False
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        """Read the persisted index (blocking); None if there is none or it is unreadable."""
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.error(f"Ignoring unreadable access index {self.path}: {e}")
+            return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "visualizations": len(self._entries),
+            "blobs": len(self._blobs),
+            "bytes_used": self.bytes_used,
+            "files_used": self.files_used
+        }
+
+def scan_blob(blob_dir: str) -> Tuple[int, int]:
+    """(bytes, files) of a stored blob directory, excluding its refs/ markers."""
+    total = files = 0
+    for root, dirs, names in os.walk(blob_dir):
+        if root == blob_dir and "refs" in dirs:
+            dirs.remove("refs")
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+                files += 1
+            except FileNotFoundError:
+                pass
+    return total, files
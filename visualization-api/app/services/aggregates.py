@@ -0,0 +1,284 @@
+import os
+import math
+import json
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+# Stored next to a blob's payload files
+AGGREGATES_FILE = "aggregates.json"
+
+# Bump when the computed fields change: stored aggregates of an older version are recomputed
+AGGREGATES_VERSION = 2
+
+# Rows converted to float64 at a time, so memory-mapped columns are never loaded whole
+CHUNK_ROWS = int(os.environ.get("AGGREGATE_CHUNK_ROWS", "65536"))
+
+# Bins of each per-column histogram
+HISTOGRAM_BINS = int(os.environ.get("AGGREGATE_HISTOGRAM_BINS", "20"))
+
+# Payloads with more numeric columns than this get no correlation matrix (it grows quadratically)
+MAX_CORRELATION_COLUMNS = int(os.environ.get("AGGREGATE_MAX_CORRELATION_COLUMNS", "50"))
+
+# Chart types whose samples can be replaced by per-group statistics
+DISTRIBUTION_CHART_TYPES = ("boxplot", "violin")
+
+# Outliers kept per group (evenly spaced over the sorted outliers, always including both extremes)
+MAX_OUTLIERS = int(os.environ.get("AGGREGATE_MAX_OUTLIERS", "200"))
+
+# Points of the fixed grid each group's density estimate is evaluated on
+KDE_GRID_POINTS = int(os.environ.get("AGGREGATE_KDE_POINTS", "64"))
+
+# Samples are binned this finely before the kernel is applied, so the KDE costs O(n) not O(n * grid)
+KDE_BINS = 512
+
+def as_numeric(values: Any) -> Optional[np.ndarray]:
+    """
+    A 1-d numeric array of ``values`` (None becomes NaN), or None if they are not all
+    numbers. Integer and float arrays, possibly memory-mapped, are returned as they
+    are; lists become float64.
+    """
+    if isinstance(values, np.ndarray):
+        arr = values
+    elif isinstance(values, list) and values:
+        try:
+            arr = np.asarray(values)
+        except ValueError:  # ragged nested lists
+            return None
+    else:
+        return None
+    if arr.ndim != 1 or arr.shape[0] == 0:
+        return None
+    if arr.dtype.kind in "iuf":
+        return arr if isinstance(values, np.ndarray) else arr.astype(np.float64, copy=False)
+    if arr.dtype != object:
+        # Strings, and booleans (not numeric for charts, as in pandas)
+        return None
+    if any(type(v) is bool for v in values):
+        return None
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+
+def numeric_columns(data: Any) -> Dict[str, np.ndarray]:
+    """
+    Numeric columns of a chart's ``data``, read the way the Streamlit app tabulates it:
+    the keys of list-of-dict ``data["data"]`` rows (missing values become NaN), or
+    the ``x``/``y`` series.
+    """
+    if not isinstance(data, Mapping):
+        return {}
+    rows = data.get("data")
+    if isinstance(rows, list):
+        if not all(isinstance(row, Mapping) for row in rows):
+            return {}
+        names = list(dict.fromkeys(key for row in rows for key in row))
+        candidates = {name: [row.get(name) for row in rows] for name in names}
+    elif "x" in data and "y" in data:
+        candidates = {"x": data["x"], "y": data["y"]}
+    else:
+        return {}
+    columns = {}
+    for name, values in candidates.items():
+        arr = as_numeric(values)
+        if arr is not None:
+            columns[str(name)] = arr
+    return columns
+
+def _number(value: float) -> Optional[float]:
+    # NaN and infinities are not valid JSON
+    return float(value) if np.isfinite(value) else None
+
+def _chunks(arr: np.ndarray) -> Iterator[np.ndarray]:
+    """``arr`` as float64, CHUNK_ROWS rows at a time."""
+    for start in range(0, arr.shape[0], CHUNK_ROWS):
+        yield np.asarray(arr[start:start + CHUNK_ROWS], dtype=np.float64)
+
+def column_summary(arr: np.ndarray, bins: int = HISTOGRAM_BINS) -> Dict[str, Any]:
+    """
+    count/min/max/mean/std (sample, ddof=1) and a histogram of the finite values of
+    ``arr``, in two passes over fixed-size chunks: count, sum and range first, then
+    the squared deviations from the mean and the histogram counts.
+    """
+    count, total, lo, hi = 0, 0.0, math.inf, -math.inf
+    for chunk in _chunks(arr):
+        finite = chunk[np.isfinite(chunk)]
+        if finite.shape[0]:
+            count += int(finite.shape[0])
+            total += float(finite.sum())
+            lo, hi = min(lo, float(finite.min())), max(hi, float(finite.max()))
+    if count == 0:
+        return {"count": 0, "min": None, "max": None, "mean": None, "std": None, "histogram": None}
+    mean = total / count
+    squares, counts, edges = 0.0, np.zeros(bins, dtype=np.int64), None
+    for chunk in _chunks(arr):
+        finite = chunk[np.isfinite(chunk)]
+        squares += float(np.square(finite - mean).sum())
+        chunk_counts, edges = np.histogram(finite, bins=bins, range=(lo, hi))
+        counts += chunk_counts
+    return {
+        "count": count,
+        "min": _number(lo),
+        "max": _number(hi),
+        "mean": _number(mean),
+        "std": _number(math.sqrt(squares / (count - 1))) if count > 1 else None,
+        "histogram": {"edges": [float(e) for e in edges], "counts": counts.tolist()}
+    }
+
+def correlation_matrix(columns: List[np.ndarray]) -> np.ndarray:
+    """
+    Pearson correlations between equal-length columns over pairwise complete
+    observations (rows where both values are finite), like pandas' DataFrame.corr().
+    Sums, sums of squares and cross-products are accumulated with a few matrix
+    products per chunk of rows, so memory stays bounded for memory-mapped columns.
+    """
+    k, length = len(columns), columns[0].shape[0]
+    if length < 2:
+        return np.full((k, k), np.nan)
+    # Center on each column's mean first so the sums below do not lose precision to large offsets
+    sums, present = np.zeros(k), np.zeros(k)
+    for i, column in enumerate(columns):
+        for chunk in _chunks(column):
+            valid = np.isfinite(chunk)
+            sums[i] += chunk[valid].sum()
+            present[i] += valid.sum()
+    means = np.divide(sums, present, out=np.zeros(k), where=present > 0)
+
+    n, sx, sxx, sxy = (np.zeros((k, k)) for _ in range(4))
+    for start in range(0, length, CHUNK_ROWS):
+        x = np.stack([column[start:start + CHUNK_ROWS] for column in columns]).astype(np.float64)
+        valid = np.isfinite(x)
+        x = np.where(valid, x - means[:, None], 0.0)
+        w = valid.astype(np.float64)
+        n += w @ w.T            # n[i, j]: rows where columns i and j are both present
+        sx += x @ w.T           # sum of column i over those rows
+        sxx += (x * x) @ w.T    # sum of squares of column i over those rows
+        sxy += x @ x.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sx.T / n
+        var = sxx - sx * sx / n
+        corr = cov / np.sqrt(var * var.T)
+    corr[n < 2] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+def sample_groups(data: Any) -> Optional[Tuple[List[Tuple[Any, np.ndarray]], str]]:
+    """
+    The samples of a box/violin chart as ([(group name, values)], x axis label),
+    grouped the way the Streamlit app plots them: rows by ``category`` (values from
+    ``value``, in order of first appearance), or else one group per numeric column.
+    """
+    rows = data.get("data") if isinstance(data, Mapping) else None
+    if isinstance(rows, list) and rows and all(isinstance(row, Mapping) and "category" in row and "value" in row
+                                               for row in rows):
+        values = as_numeric([row["value"] for row in rows])
+        if values is None:
+            return None
+        codes: Dict[Any, int] = {}
+        try:
+            inverse = np.fromiter((codes.setdefault(row["category"], len(codes)) for row in rows),
+                                  dtype=np.int64, count=len(rows))
+        except TypeError:  # unhashable categories
+            return None
+        count = len(codes)
+        keep = np.isfinite(values)
+        if None in codes:
+            keep &= inverse != codes.pop(None)
+        values, inverse = values[keep], inverse[keep]
+        order = np.lexsort((values, inverse))
+        values, inverse = values[order], inverse[order]
+        bounds = np.searchsorted(inverse, np.arange(count + 1))
+        groups = [(name, values[bounds[code]:bounds[code + 1]]) for name, code in codes.items()]
+        return groups, "category"
+    columns = numeric_columns(data)
+    if not columns:
+        return None
+    return [(name, np.sort(arr[np.isfinite(arr)].astype(np.float64, copy=False)))
+            for name, arr in columns.items()], "variable"
+
+def _quantile_sorted(values: np.ndarray, q: float) -> float:
+    # Linear interpolation, as numpy's and Plotly's default quartile method, without sorting again
+    pos = q * (values.shape[0] - 1)
+    lo = int(math.floor(pos))
+    hi = min(lo + 1, values.shape[0] - 1)
+    return float(values[lo] + (values[hi] - values[lo]) * (pos - lo))
+
+def kde(values: np.ndarray, bandwidth: float, points: int = KDE_GRID_POINTS) -> Dict[str, List[float]]:
+    """Gaussian kernel density of sorted ``values`` on ``points`` evenly spaced from min - 2h to max + 2h."""
+    grid = np.linspace(values[0] - 2 * bandwidth, values[-1] + 2 * bandwidth, points)
+    counts, edges = np.histogram(values, bins=KDE_BINS, range=(grid[0], grid[-1]))
+    centers = (edges[:-1] + edges[1:]) / 2
+    kernel = np.exp(-0.5 * ((grid[:, None] - centers[None, :]) / bandwidth) ** 2)
+    density = kernel @ counts / (values.shape[0] * bandwidth * math.sqrt(2 * math.pi))
+    return {"grid": grid.tolist(), "density": density.tolist()}
+
+def distribution(name: Any, values: np.ndarray) -> Dict[str, Any]:
+    """
+    Box plot statistics of sorted finite ``values`` in Plotly's precomputed form
+    (q1/median/q3, fences at the furthest samples within 1.5 IQR, mean, sd), a
+    subset of the outliers beyond the fences and a KDE for violins.
+    """
+    n = int(values.shape[0])
+    stats: Dict[str, Any] = {"name": name, "count": n}
+    if n == 0:
+        return stats
+    q1, median, q3 = (_quantile_sorted(values, q) for q in (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+    lo = int(np.searchsorted(values, q1 - 1.5 * iqr, side="left"))
+    hi = int(np.searchsorted(values, q3 + 1.5 * iqr, side="right"))
+    outliers = np.concatenate([values[:lo], values[hi:]])
+    if outliers.shape[0] > MAX_OUTLIERS:
+        outliers = outliers[np.unique(np.linspace(0, outliers.shape[0] - 1, MAX_OUTLIERS).round().astype(np.int64))]
+    sd = float(values.std(ddof=1)) if n > 1 else 0.0
+    stats.update(
+        min=float(values[0]), max=float(values[-1]), q1=q1, median=median, q3=q3,
+        lowerfence=float(values[lo]), upperfence=float(values[hi - 1]),
+        mean=float(values.mean()), sd=sd,
+        outliers=outliers.tolist(), outliers_total=lo + n - hi
+    )
+    # Silverman's rule of thumb, as Plotly's violin traces use
+    spread = min(sd, iqr / 1.349) if iqr > 0 else sd
+    bandwidth = 1.059 * spread * n ** -0.2
+    stats["kde"] = kde(values, bandwidth) if bandwidth > 0 else None
+    return stats
+
+def distributions(data: Any) -> Optional[Dict[str, Any]]:
+    """Per-group distribution statistics of a box/violin chart's ``data``; O(groups) in size."""
+    grouped = sample_groups(data)
+    if grouped is None:
+        return None
+    groups, x_label = grouped
+    return {"x": x_label, "y": "value", "groups": [distribution(name, values) for name, values in groups]}
+
+def compute(data: Any, chart_type: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Aggregates of one chart's ``data``: per-column summaries, for 2+ columns a
+    correlation matrix, and for box/violin charts the per-group distributions.
+    """
+    columns = numeric_columns(data)
+    result: Dict[str, Any] = {"columns": {name: column_summary(arr) for name, arr in columns.items()}}
+    names = list(columns)
+    if 2 <= len(names) <= MAX_CORRELATION_COLUMNS and len({columns[name].shape[0] for name in names}) == 1:
+        corr = correlation_matrix([columns[name] for name in names])
+        result["correlation"] = {
+            "columns": names,
+            "matrix": [[_number(v) for v in row] for row in corr]
+        }
+    if chart_type in DISTRIBUTION_CHART_TYPES:
+        result["distributions"] = distributions(data)
+    return result
+
+def compute_document(visualization_data: Mapping[str, Any]) -> Dict[str, Any]:
+    """Aggregates of a visualization payload; dashboards get one entry per chart."""
+    data = visualization_data.get("data")
+    document: Dict[str, Any] = {"version": AGGREGATES_VERSION}
+    if visualization_data.get("chart_type") == "dashboard" and isinstance(data, Mapping):
+        charts = data.get("charts")
+        document["charts"] = [compute(chart.get("data"), chart.get("type")) if isinstance(chart, Mapping)
+                              else compute(None) for chart in (charts if isinstance(charts, list) else [])]
+    else:
+        document.update(compute(data, visualization_data.get("chart_type")))
+    return document
+
+def encode(document: Dict[str, Any]) -> bytes:
+    return json.dumps(document, separators=(",", ":")).encode("utf-8")
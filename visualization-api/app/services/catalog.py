@@ -0,0 +1,230 @@
+import os
+import json
+import base64
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS visualizations (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    chart_type TEXT,
+    created_at TEXT NOT NULL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS visualizations_created ON visualizations (created_at, id);
+CREATE INDEX IF NOT EXISTS visualizations_chart_type ON visualizations (chart_type, created_at, id);
+CREATE INDEX IF NOT EXISTS visualizations_title ON visualizations (title);
+CREATE TABLE IF NOT EXISTS visualization_metadata (
+    key TEXT NOT NULL,
+    value TEXT,
+    viz_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS visualization_metadata_key ON visualization_metadata (key, value, viz_id);
+CREATE INDEX IF NOT EXISTS visualization_metadata_viz ON visualization_metadata (viz_id);
+"""
+
+# Rows upserted per transaction while rebuilding
+REBUILD_BATCH = 1000
+
+def summarize(visualization_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The catalog fields of a stored visualization document."""
+    return {
+        "title": visualization_data.get("title"),
+        "chart_type": visualization_data.get("chart_type"),
+        "created_at": visualization_data.get("created_at"),
+        "metadata": visualization_data.get("metadata")
+    }
+
+def metadata_value(value: Any) -> Optional[str]:
+    """Text form of a metadata value used for equality filters; None for lists and objects."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return None
+    return json.dumps(value)
+
+def encode_cursor(created_at: str, viz_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_at, viz_id]).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, viz_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return str(created_at), str(viz_id)
+
+class Catalog:
+    """
+    Embedded SQLite index of visualization titles, chart types, creation times and
+    metadata, so listing and searching never opens stored payloads.
+
+    The database runs in WAL mode: readers do not block the writer and vice versa.
+    Each thread gets its own connection. All calls are blocking and are meant to
+    run off the event loop. The catalog is derived data: it can always be rebuilt
+    from the visualizations on disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(SCHEMA)
+                    self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    def _write(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        conn = self._connection()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return result
+
+    @staticmethod
+    def _upsert(conn: sqlite3.Connection, entries: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        count = 0
+        for viz_id, summary in entries:
+            metadata = summary.get("metadata")
+            conn.execute(
+                "INSERT OR REPLACE INTO visualizations (id, title, chart_type, created_at, metadata) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (viz_id, summary.get("title"), summary.get("chart_type"), summary.get("created_at") or "",
+                 json.dumps(metadata) if metadata is not None else None)
+            )
+            conn.execute("DELETE FROM visualization_metadata WHERE viz_id = ?", (viz_id,))
+            if isinstance(metadata, dict):
+                conn.executemany(
+                    "INSERT INTO visualization_metadata (key, value, viz_id) VALUES (?, ?, ?)",
+                    [(str(key), metadata_value(value), viz_id) for key, value in metadata.items()]
+                )
+            count += 1
+        return count
+
+    def add(self, entries: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Insert or replace (viz_id, summary) entries in one transaction."""
+        if entries:
+            self._write(lambda conn: self._upsert(conn, entries))
+
+    def remove(self, viz_ids: List[str]) -> None:
+        def delete(conn: sqlite3.Connection) -> None:
+            conn.executemany("DELETE FROM visualizations WHERE id = ?", [(v,) for v in viz_ids])
+            conn.executemany("DELETE FROM visualization_metadata WHERE viz_id = ?", [(v,) for v in viz_ids])
+        if viz_ids:
+            self._write(delete)
+
+    def ids(self) -> List[str]:
+        return [row[0] for row in self._connection().execute("SELECT id FROM visualizations")]
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM visualizations").fetchone()[0]
+
+    def search(
+        self,
+        chart_type: Optional[str] = None,
+        title_prefix: Optional[str] = None,
+        created_after: Optional[str] = None,
+        created_before: Optional[str] = None,
+        metadata: Optional[List[Tuple[str, Optional[str]]]] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Visualizations matching every given filter, newest first, and the cursor of
+        the next page (None on the last page). ``metadata`` holds (key, value) pairs;
+        a None value only requires the key to be present. Pages are keyset-paginated
+        on (created_at, id), so deep pages cost the same as the first one.
+        """
+        clauses, params = [], []
+        if chart_type is not None:
+            clauses.append("chart_type = ?")
+            params.append(chart_type)
+        if title_prefix:
+            clauses.append("title >= ? AND title < ?")
+            params += [title_prefix, title_prefix + "\U0010ffff"]
+        if created_after is not None:
+            clauses.append("created_at >= ?")
+            params.append(created_after)
+        if created_before is not None:
+            clauses.append("created_at < ?")
+            params.append(created_before)
+        for key, value in metadata or []:
+            if value is None:
+                clauses.append("id IN (SELECT viz_id FROM visualization_metadata WHERE key = ?)")
+                params.append(key)
+            else:
+                clauses.append("id IN (SELECT viz_id FROM visualization_metadata WHERE key = ? AND value = ?)")
+                params += [key, value]
+        if cursor is not None:
+            clauses.append("(created_at, id) < (?, ?)")
+            params += list(decode_cursor(cursor))
+
+        sql = "SELECT id, title, chart_type, created_at, metadata FROM visualizations"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        rows = self._connection().execute(sql, params + [limit + 1]).fetchall()
+
+        items = [{
+            "id": row["id"],
+            "title": row["title"],
+            "chart_type": row["chart_type"],
+            "created_at": row["created_at"],
+            "metadata": json.loads(row["metadata"]) if row["metadata"] is not None else None
+        } for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(items[-1]["created_at"], items[-1]["id"])
+        return items, next_cursor
+
+    def rebuild(self, entries: Iterable[Tuple[str, Dict[str, Any]]], exists: Callable[[str], bool]) -> Dict[str, int]:
+        """
+        Resynchronize the catalog with the visualizations on disk while the API keeps
+        serving: ``entries`` are upserted in batches, then rows whose visualization
+        no longer ``exists`` are dropped. Rows added concurrently are kept.
+        """
+        seen = set()
+        batch: List[Tuple[str, Dict[str, Any]]] = []
+        upserted = 0
+        for viz_id, summary in entries:
+            seen.add(viz_id)
+            batch.append((viz_id, summary))
+            if len(batch) >= REBUILD_BATCH:
+                self.add(batch)
+                upserted += len(batch)
+                batch = []
+        self.add(batch)
+        upserted += len(batch)
+
+        stale = [viz_id for viz_id in self.ids() if viz_id not in seen]
+        stale = [viz_id for viz_id in stale if not exists(viz_id)]
+        self.remove(stale)
+        return {"upserted": upserted, "removed": len(stale)}
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,88 @@
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+NPY_MAGIC = b"\x93NUMPY"
+
+# Raw (headerless) columns may be sent in these dtypes; always read little-endian
+RAW_DTYPES = ("int8", "int16", "int32", "int64", "uint8", "uint16", "uint32", "uint64",
+              "float16", "float32", "float64")
+
+def decode_column(name: str, raw: bytes, dtype: Optional[str] = None) -> np.ndarray:
+    """
+    Interpret the bytes of one column without building Python objects: a .npy file
+    (detected by its magic) or raw little-endian values of ``dtype``. The array is a
+    view of ``raw`` where possible.
+    """
+    if raw[:len(NPY_MAGIC)] == NPY_MAGIC:
+        reader = _Reader(raw)
+        try:
+            version = np.lib.format.read_magic(reader)
+            if version == (1, 0):
+                shape, fortran_order, arr_dtype = np.lib.format.read_array_header_1_0(reader)
+            elif version == (2, 0):
+                shape, fortran_order, arr_dtype = np.lib.format.read_array_header_2_0(reader)
+            else:
+                raise ValueError(f"unsupported format version {version}")
+        except ValueError as e:
+            raise ValueError(f"Column {name}: invalid .npy header: {e}")
+        if arr_dtype.hasobject:
+            raise ValueError(f"Column {name}: object arrays are not accepted")
+        count = int(np.prod(shape, dtype=np.int64))
+        if reader.pos + count * arr_dtype.itemsize != len(raw):
+            raise ValueError(f"Column {name}: .npy data does not match its header shape {shape}")
+        arr = np.frombuffer(raw, dtype=arr_dtype, count=count, offset=reader.pos)
+        return arr.reshape(shape, order="F" if fortran_order else "C")
+
+    if dtype is None:
+        raise ValueError(f"Column {name}: raw bytes need a dtype (one of {', '.join(RAW_DTYPES)})")
+    if dtype not in RAW_DTYPES:
+        raise ValueError(f"Column {name}: unsupported dtype {dtype} (expected one of {', '.join(RAW_DTYPES)})")
+    arr_dtype = np.dtype(dtype).newbyteorder("<")
+    if len(raw) % arr_dtype.itemsize:
+        raise ValueError(f"Column {name}: {len(raw)} bytes is not a whole number of {dtype} values")
+    return np.frombuffer(raw, dtype=arr_dtype)
+
+def validate_columns(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Check decoded columns with vectorized operations and normalize them to the
+    int64/float64 columns stored by columnar.py: 1-D, numeric, equal length and,
+    for floats, finite (JSON has no NaN or Infinity).
+    """
+    validated = {}
+    lengths: List[int] = []
+    for name, arr in columns.items():
+        if arr.ndim != 1:
+            raise ValueError(f"Column {name}: expected a 1-D array, got shape {arr.shape}")
+        kind = arr.dtype.kind
+        if kind in "iu":
+            if kind == "u" and arr.dtype.itemsize == 8 and arr.size and arr.max() > np.iinfo(np.int64).max:
+                raise ValueError(f"Column {name}: values exceed the int64 range")
+            arr = arr.astype(np.int64, copy=False)
+        elif kind == "f":
+            arr = arr.astype(np.float64, copy=False)
+            if not np.isfinite(arr).all():
+                raise ValueError(f"Column {name}: NaN and infinite values are not allowed")
+        else:
+            raise ValueError(f"Column {name}: dtype {arr.dtype} is not an integer or float type")
+        validated[name] = arr
+        lengths.append(arr.shape[0])
+    if len(set(lengths)) > 1:
+        detail = ", ".join(f"{name}={n}" for name, n in zip(validated, lengths))
+        raise ValueError(f"Columns must all have the same length ({detail})")
+    return validated
+
+class _Reader:
+    """Minimal file-like view over bytes for numpy's .npy header parser."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def read(self, n: int) -> bytes:
+        chunk = self.data[self.pos:self.pos + n]
+        self.pos += len(chunk)
+        return chunk
@@ -0,0 +1,152 @@
+import io
+import os
+import json
+import uuid
+import shutil
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Elements per chunk when re-encoding a column as JSON text
+JSON_CHUNK_ELEMENTS = 65536
+
+@dataclass
+class ColumnarPayload:
+    """
+    A visualization payload split into numeric columns and a JSON template.
+
+    ``template`` holds the serialized payload cut at every column position, so
+    ``template[0] + col_0 + template[1] + ... + template[n]`` reproduces the
+    original JSON body byte for byte.
+    """
+    template: List[str]
+    names: List[str]
+    arrays: List[np.ndarray]
+
+    def manifest(self) -> Dict[str, Any]:
+        return {
+            "template": self.template,
+            "columns": [
+                {"name": name, "file": column_file(i), "dtype": str(arr.dtype), "length": int(arr.shape[0]),
+                 "sorted": bool(np.all(arr[1:] >= arr[:-1]))}
+                for i, (name, arr) in enumerate(zip(self.names, self.arrays))
+            ]
+        }
+
+def column_file(index: int) -> str:
+    return os.path.join("columns", f"col_{index}.npy")
+
+def _as_column(values: Any, min_length: int) -> Optional[np.ndarray]:
+    """Convert a homogeneous list of ints or floats to an array; anything else stays JSON."""
+    if not isinstance(values, list) or len(values) < min_length:
+        return None
+    # Mixed int/float lists would re-encode 1 as 1.0, so only exact homogeneous types qualify
+    first = type(values[0])
+    if first not in (int, float) or not all(type(v) is first for v in values):
+        return None
+    try:
+        return np.asarray(values, dtype=np.int64 if first is int else np.float64)
+    except OverflowError:
+        return None
+
+def extract_columns(visualization_data: Dict[str, Any], min_length: int) -> Optional[ColumnarPayload]:
+    """Split the numeric arrays of ``visualization_data["data"]`` out of the payload, if any qualify."""
+    data = visualization_data.get("data")
+    if not isinstance(data, dict):
+        return None
+
+    names, arrays = [], []
+    token = uuid.uuid4().hex
+    templated = {}
+    for key, values in data.items():
+        arr = _as_column(values, min_length)
+        if arr is None:
+            templated[key] = values
+            continue
+        templated[key] = placeholder(token, len(names))
+        names.append(key)
+        arrays.append(arr)
+    if not arrays:
+        return None
+
+    template = split_template(json.dumps(dict(visualization_data, data=templated)), token, range(len(arrays)))
+    return ColumnarPayload(template=template, names=names, arrays=arrays)
+
+def placeholder(token: str, index: int) -> str:
+    """String standing in for column ``index`` while the rest of the payload is serialized."""
+    return f"\u0000column:{token}:{index}"
+
+def split_template(text: str, token: str, order: Iterable[int]) -> List[str]:
+    """Cut serialized JSON at the placeholders of the columns in ``order`` (their order in ``text``)."""
+    template = []
+    for i in order:
+        head, text = text.split(json.dumps(placeholder(token, i)), 1)
+        template.append(head)
+    template.append(text)
+    return template
+
+def encode_npy(arr: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    np.save(buf, arr, allow_pickle=False)
+    return buf.getvalue()
+
+def write_npy(path: str, dtype: np.dtype, length: int, raw_path: str) -> None:
+    """Write a 1-D .npy file from a file of raw native-endian values, without loading them."""
+    with open(path, "wb") as out:
+        np.lib.format.write_array_header_1_0(out, {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                                                   "fortran_order": False, "shape": (length,)})
+        with open(raw_path, "rb") as raw:
+            shutil.copyfileobj(raw, out, 1024 * 1024)
+
+def hash_column(arr: np.ndarray, name: str, *digests) -> None:
+    """Feed a column's name, dtype, length and raw bytes to each hashlib digest."""
+    header = f"\u0000{name}:{arr.dtype.str}:{arr.shape[0]}\u0000".encode("utf-8")
+    data = memoryview(np.ascontiguousarray(arr)).cast("B")
+    for digest in digests:
+        digest.update(header)
+        digest.update(data)
+
+def load_columns(blob_dir: str, manifest: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Memory-map every column of a columnar blob; pages are only read when touched."""
+    return {
+        column["name"]: np.load(os.path.join(blob_dir, column["file"]), mmap_mode="r", allow_pickle=False)
+        for column in manifest["columns"]
+    }
+
+# Longest JSON text of one int64 or float64 element, with its ", " separator
+MAX_ELEMENT_CHARS = 26
+
+def max_json_size(manifest: Dict[str, Any]) -> int:
+    """Upper bound on the size of the JSON body rebuilt from a columnar blob."""
+    return sum(len(t.encode("utf-8")) for t in manifest["template"]) + sum(
+        2 + MAX_ELEMENT_CHARS * column["length"] for column in manifest["columns"])
+
+def skeleton(manifest: Dict[str, Any]) -> Dict[str, Any]:
+    """Parse the payload with every column replaced by an empty list (cheap: no column data)."""
+    return json.loads("[]".join(manifest["template"]))
+
+def iter_json(manifest: Dict[str, Any], columns: Dict[str, np.ndarray],
+              extra: Optional[Dict[str, Any]] = None) -> Iterator[bytes]:
+    """
+    Re-encode a columnar blob as JSON, one chunk at a time. With the original
+    columns this reproduces the stored body exactly; ``extra`` adds top-level keys.
+    """
+    template = manifest["template"]
+    for i, column in enumerate(manifest["columns"]):
+        yield template[i].encode("utf-8")
+        arr = columns[column["name"]]
+        yield b"["
+        for start in range(0, arr.shape[0], JSON_CHUNK_ELEMENTS):
+            if start:
+                yield b", "
+            yield json.dumps(arr[start:start + JSON_CHUNK_ELEMENTS].tolist())[1:-1].encode("utf-8")
+        yield b"]"
+    tail = template[-1]
+    if extra:
+        # The template always ends with the closing brace of the top-level object
+        tail = tail[:-1] + "".join(f", {json.dumps(k)}: {json.dumps(v)}" for k, v in extra.items()) + "}"
+    yield tail.encode("utf-8")
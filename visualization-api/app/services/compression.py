@@ -0,0 +1,129 @@
+import os
+import abc
+import gzip
+import zlib
+import logging
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_BYTES = 1024 * 1024
+
+class Codec(abc.ABC):
+    """A content coding (as named in Content-Encoding) used for stored payloads."""
+    name = ""
+    extension = ""
+
+    def __init__(self, level: Optional[int] = None):
+        self.level = level
+
+    @abc.abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        ...
+
+    @abc.abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        ...
+
+    @abc.abstractmethod
+    def iter_compress(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        ...
+
+    @abc.abstractmethod
+    def iter_decompress(self, f: BinaryIO) -> Iterator[bytes]:
+        ...
+
+class GzipCodec(Codec):
+    name = "gzip"
+    extension = ".gz"
+
+    def compress(self, data: bytes) -> bytes:
+        # mtime=0 keeps the output deterministic for identical payloads
+        return gzip.compress(data, compresslevel=self.level if self.level is not None else 6, mtime=0)
+
+    def decompress(self, data: bytes) -> bytes:
+        return gzip.decompress(data)
+
+    def iter_compress(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        compressor = zlib.compressobj(self.level if self.level is not None else 6, wbits=31)
+        for chunk in chunks:
+            out = compressor.compress(chunk)
+            if out:
+                yield out
+        yield compressor.flush()
+
+    def iter_decompress(self, f: BinaryIO) -> Iterator[bytes]:
+        decompressor = zlib.decompressobj(wbits=31)
+        for chunk in iter(lambda: f.read(READ_CHUNK_BYTES), b""):
+            out = decompressor.decompress(chunk)
+            if out:
+                yield out
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+
+class ZstdCodec(Codec):
+    name = "zstd"
+    extension = ".zst"
+
+    def compress(self, data: bytes) -> bytes:
+        return zstandard.ZstdCompressor(level=self.level if self.level is not None else 3).compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        # Streamed frames (iter_compress) carry no content size, which one-shot decompress() requires
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+    def iter_compress(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        compressor = zstandard.ZstdCompressor(level=self.level if self.level is not None else 3).compressobj()
+        for chunk in chunks:
+            out = compressor.compress(chunk)
+            if out:
+                yield out
+        yield compressor.flush()
+
+    def iter_decompress(self, f: BinaryIO) -> Iterator[bytes]:
+        yield from zstandard.ZstdDecompressor().read_to_iter(f, read_size=READ_CHUNK_BYTES)
+
+CODECS: Dict[str, type] = {"gzip": GzipCodec, "zstd": ZstdCodec}
+
+def get_codec(name: Optional[str], level: Optional[int] = None) -> Optional[Codec]:
+    """Return the codec for a Content-Encoding name, or None for identity."""
+    if not name or name == "none":
+        return None
+    if name not in CODECS:
+        raise ValueError(f"Unsupported compression: {name} (expected one of none, {', '.join(CODECS)})")
+    if name == "zstd" and zstandard is None:
+        raise ValueError("zstd compression requires the 'zstandard' package")
+    return CODECS[name](level)
+
+def accepts_encoding(accept_encoding: Optional[str], name: str) -> bool:
+    """Whether an Accept-Encoding header allows the given content coding (q=0 means refused)."""
+    if not accept_encoding:
+        return False
+    wildcard = False
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding == name:
+            return q > 0
+        if coding == "*":
+            wildcard = q > 0
+    return wildcard
+
+def default_codec() -> Optional[Codec]:
+    """Codec configured for newly stored payloads (STREAMLIT_COMPRESSION / STREAMLIT_COMPRESSION_LEVEL)."""
+    level = os.environ.get("STREAMLIT_COMPRESSION_LEVEL")
+    return get_codec(os.environ.get("STREAMLIT_COMPRESSION", "gzip"), int(level) if level else None)
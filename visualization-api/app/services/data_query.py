@@ -0,0 +1,95 @@
+import bisect
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .aggregates import AGGREGATES_VERSION
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class DataQuery:
+    """Read-time transformation of a visualization's data (window, page, downsample, summarize)."""
+    x_min: Optional[float] = None
+    x_max: Optional[float] = None
+    offset: int = 0
+    limit: Optional[int] = None
+    max_points: Optional[int] = None
+    summarize: bool = False  # replace box/violin samples with per-group statistics
+
+    @property
+    def is_identity(self) -> bool:
+        return (self.x_min is None and self.x_max is None and self.offset == 0
+                and self.limit is None and self.max_points is None and not self.summarize)
+
+    @property
+    def has_window(self) -> bool:
+        return self.x_min is not None or self.x_max is not None
+
+    @property
+    def has_range(self) -> bool:
+        return self.has_window or self.offset != 0 or self.limit is not None
+
+    def cache_key(self) -> Tuple:
+        return ("query", self.x_min, self.x_max, self.offset, self.limit, self.max_points, self.summarize)
+
+    def etag_suffix(self) -> str:
+        parts = []
+        if self.has_window:
+            parts.append(f"x{self.x_min}:{self.x_max}")
+        if self.offset or self.limit is not None:
+            parts.append(f"o{self.offset}l{self.limit}")
+        if self.max_points is not None:
+            parts.append(f"p{self.max_points}")
+        if self.summarize:
+            # The statistics come from the aggregates, so their version is part of the representation
+            parts.append(f"s{AGGREGATES_VERSION}")
+        return "-".join(parts)
+
+def is_sorted(values: Sequence) -> bool:
+    """True if ``values`` is in ascending order (a precondition for windowing by x)."""
+    try:
+        arr = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return False
+    return bool(arr.shape[0] < 2 or np.all(arr[1:] >= arr[:-1]))
+
+def window_bounds(x: Sequence, x_min: Optional[float], x_max: Optional[float],
+                  key: Optional[Callable[[Any], Any]] = None) -> Tuple[int, int]:
+    """
+    [start, end) positions of the points with x_min <= x <= x_max, found by
+    binary search. ``x`` must be sorted ascending; for memory-mapped arrays only
+    the pages visited by the search are read.
+    """
+    n = len(x)
+    try:
+        if isinstance(x, np.ndarray):
+            start = int(np.searchsorted(x, x_min, side="left")) if x_min is not None else 0
+            end = int(np.searchsorted(x, x_max, side="right")) if x_max is not None else n
+        else:
+            start = bisect.bisect_left(x, x_min, key=key) if x_min is not None else 0
+            end = bisect.bisect_right(x, x_max, key=key) if x_max is not None else n
+    except TypeError:
+        raise ValueError("x_min/x_max require numeric x values")
+    return start, max(start, end)
+
+def page_bounds(start: int, end: int, offset: int, limit: Optional[int]) -> Tuple[int, int]:
+    """Apply offset/limit within an already windowed [start, end) range."""
+    start = min(end, start + offset)
+    if limit is not None:
+        end = min(end, start + limit)
+    return start, end
+
+def query_info(query: DataQuery, total: int, matched: int, returned: int) -> Dict[str, Any]:
+    """The ``query`` object returned alongside transformed data, so clients can page."""
+    return {
+        "total": total,
+        "matched": matched,
+        "offset": query.offset,
+        "limit": query.limit,
+        "returned": returned,
+        "x_min": query.x_min,
+        "x_max": query.x_max
+    }
@@ -0,0 +1,92 @@
+import logging
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Chart types and the shape-preserving reduction used for them
+DOWNSAMPLE_METHODS = {
+    "line": "lttb",
+    "area": "lttb",
+    "bar": "minmax"
+}
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of ``n_out`` points that preserve the
+    visual shape of the series. The first and last points are always kept; each
+    bucket in between contributes the point forming the largest triangle with the
+    previously selected point and the average of the next bucket.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = x.astype(np.float64, copy=False)
+    y = y.astype(np.float64, copy=False)
+    # n_out - 2 buckets over the interior points [1, n - 1)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    # Averages of every bucket, with the last point standing in after the final bucket
+    sums_x = np.add.reduceat(x[1:n - 1], starts - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], starts - 1)
+    counts = (ends - starts).astype(np.float64)
+    avg_x = np.append(sums_x / counts, x[n - 1])
+    avg_y = np.append(sums_y / counts, y[n - 1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = starts[i], ends[i]
+        bx, by = x[start:end], y[start:end]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((x[a] - avg_x[i + 1]) * (by - y[a]) - (x[a] - bx) * (avg_y[i + 1] - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def minmax(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Min/max bucketing: indices of the minimum and maximum of each of ``n_out // 2``
+    buckets, in original order. Keeps every peak and trough, which suits bar charts.
+    """
+    n = len(y)
+    n_buckets = n_out // 2
+    if n_out >= n or n_buckets < 1:
+        return np.arange(n)
+
+    # Buckets are contiguous, so per-bucket extremes come from reduceat over their start offsets
+    starts = np.searchsorted((np.arange(n) * n_buckets) // n, np.arange(n_buckets))
+    counts = np.diff(np.append(starts, n))
+    bucket = np.repeat(np.arange(n_buckets), counts)
+    picked = []
+    for reduce in (np.minimum, np.maximum):
+        hits = np.flatnonzero(y == np.repeat(reduce.reduceat(y, starts), counts))
+        # First hit per bucket (ties keep the earliest point)
+        _, first = np.unique(bucket[hits], return_index=True)
+        picked.append(hits[first])
+    return np.unique(np.concatenate(picked))
+
+def select_indices(chart_type: str, x, y, max_points: int) -> Optional[np.ndarray]:
+    """
+    Indices to keep when reducing an ``x``/``y`` series to ``max_points``,
+    or None if the chart type or data does not call for downsampling.
+    """
+    method = DOWNSAMPLE_METHODS.get(chart_type)
+    if method is None or len(y) <= max_points or len(x) != len(y):
+        return None
+    try:
+        y_arr = np.asarray(y, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    if method == "minmax":
+        return minmax(y_arr, max_points)
+    try:
+        x_arr = np.asarray(x, dtype=np.float64)
+    except (TypeError, ValueError):
+        # Categorical or date x values: bucket by position instead
+        x_arr = np.arange(len(y), dtype=np.float64)
+    return lttb(x_arr, y_arr, max_points)
@@ -0,0 +1,191 @@
+import json
+from typing import Any, Dict, List, Mapping, Optional
+
+# Bump when the built figures change, so cached figures (in memory, on disk and in clients) are rebuilt
+FIGURE_VERSION = 2
+
+# Figure files are kept in this directory of the blob they were built from
+FIGURES_DIR = "figures"
+
+# Largest max_points a figure can be requested with; each value is a separately built and cached figure
+MAX_POINTS = 50000
+
+BASIC_CHART_TYPES = ("line", "bar", "scatter", "area")
+SCIENTIFIC_CHART_TYPES = ("boxplot", "violin", "correlation")
+
+# Plotly trace for each basic chart type, as plotly.express builds it
+_BASIC_TRACES = {
+    "line": {"type": "scatter", "mode": "lines"},
+    "bar": {"type": "bar"},
+    "scatter": {"type": "scatter", "mode": "markers"},
+    "area": {"type": "scatter", "mode": "lines", "stackgroup": "1"}
+}
+
+def figure_file(max_points: Optional[int]) -> str:
+    return f"v{FIGURE_VERSION}-p{max_points or 0}.json"
+
+def _layout(title: str, x_title: Optional[str], y_title: Optional[str]) -> Dict[str, Any]:
+    return {
+        "title": {"text": title},
+        "xaxis": {"title": {"text": x_title}},
+        "yaxis": {"title": {"text": y_title}},
+        "legend": {"tracegroupgap": 0}
+    }
+
+def _apply_axis_titles(figure: Dict[str, Any], data: Mapping[str, Any], layout: Mapping[str, Any]) -> None:
+    """Axis titles from the layout, else the data's x_label/y_label (only when a layout is given)."""
+    if not layout:
+        return
+    x_title = layout.get("xaxis_title", data.get("x_label"))
+    y_title = layout.get("yaxis_title", data.get("y_label"))
+    if x_title is not None:
+        figure["layout"]["xaxis"]["title"]["text"] = x_title
+    if y_title is not None:
+        figure["layout"]["yaxis"]["title"]["text"] = y_title
+
+def basic_figure(chart_type: str, data: Mapping[str, Any], layout: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Figure of a line/bar/scatter/area chart from ``x``/``y`` series or list-of-dict
+    rows with x and y; rows with feature/species/mean become a grouped bar chart.
+    None if the data has another shape.
+    """
+    title = layout.get("title", "")
+    rows = data.get("data")
+    if isinstance(rows, list):
+        if not rows or not all(isinstance(row, Mapping) for row in rows):
+            return None
+        keys = set().union(*rows)
+        if {"feature", "species", "mean"} <= keys:
+            traces: Dict[Any, Dict[str, Any]] = {}
+            for row in rows:
+                species = row.get("species")
+                trace = traces.setdefault(species, {
+                    "type": "bar", "name": str(species), "legendgroup": str(species), "offsetgroup": str(species),
+                    "showlegend": True, "x": [], "y": []
+                })
+                trace["x"].append(row.get("feature"))
+                trace["y"].append(row.get("mean"))
+            figure = {"data": list(traces.values()), "layout": _layout(title, "feature", "mean")}
+            figure["layout"].update(barmode="group", legend={"title": {"text": "species"}, "tracegroupgap": 0})
+            if layout:
+                for axis in ("xaxis", "yaxis"):
+                    if f"{axis}_title" in layout:
+                        figure["layout"][axis]["title"]["text"] = layout[f"{axis}_title"]
+            return figure
+        if not {"x", "y"} <= keys:
+            return None
+        x, y = [row.get("x") for row in rows], [row.get("y") for row in rows]
+    elif "x" in data and "y" in data:
+        x, y = data["x"], data["y"]
+    else:
+        return None
+    if chart_type not in _BASIC_TRACES or not x:
+        return None
+    figure = {"data": [dict(_BASIC_TRACES[chart_type], x=x, y=y, showlegend=False)],
+              "layout": _layout(title, "x", "y")}
+    _apply_axis_titles(figure, data, layout)
+    return figure
+
+def correlation_figure(correlation: Mapping[str, Any], layout: Mapping[str, Any]) -> Dict[str, Any]:
+    """Heatmap of a precomputed correlation matrix, styled like px.imshow(corr, color_continuous_scale="RdBu_r")."""
+    figure = {
+        "data": [{
+            "type": "heatmap", "z": correlation["matrix"], "x": correlation["columns"], "y": correlation["columns"],
+            "zmin": -1, "zmax": 1, "colorscale": "RdBu", "reversescale": True
+        }],
+        "layout": _layout(layout.get("title", "Correlation Matrix"), None, None)
+    }
+    figure["layout"]["xaxis"].update(constrain="domain")
+    figure["layout"]["yaxis"].update(autorange="reversed", scaleanchor="x", constrain="domain")
+    return figure
+
+def distribution_figure(chart_type: str, distributions: Mapping[str, Any], layout: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Box or violin chart of per-group statistics: a precomputed box trace
+    (q1/median/q3/fences) plus the outlier subset, and for violins the KDE
+    mirrored around each group's position.
+    """
+    groups = [g for g in distributions["groups"] if g["count"]]
+    names = [str(g["name"]) for g in groups]
+    stats = {key: [g[key] for g in groups] for key in ("q1", "median", "q3", "lowerfence", "upperfence", "mean", "sd")}
+    figure = {"data": [], "layout": _layout(layout.get("title", ""), distributions["x"], distributions["y"])}
+    if chart_type == "boxplot":
+        figure["data"].append(dict(stats, type="box", x=names, boxpoints=False, name=distributions["y"]))
+        figure["data"].append({
+            "type": "scatter", "mode": "markers", "name": "outliers", "showlegend": False,
+            "x": [name for name, g in zip(names, groups) for _ in g["outliers"]],
+            "y": [v for g in groups for v in g["outliers"]]
+        })
+    else:
+        for i, (name, g) in enumerate(zip(names, groups)):
+            kde = g.get("kde")
+            if not kde:
+                continue
+            peak = max(kde["density"]) or 1.0
+            half = [0.4 * d / peak for d in kde["density"]]
+            figure["data"].append({
+                "type": "scatter", "mode": "lines", "fill": "toself", "name": name,
+                "x": [i - w for w in half] + [i + w for w in reversed(half)],
+                "y": kde["grid"] + kde["grid"][::-1]
+            })
+        positions = list(range(len(groups)))
+        figure["data"].append(dict(stats, type="box", x=positions, width=0.1, boxpoints=False, showlegend=False,
+                                   name=distributions["y"]))
+        figure["layout"]["xaxis"].update(tickvals=positions, ticktext=names)
+    return figure
+
+def chart_figure(chart_type: Optional[str], data: Any, layout: Any,
+                 aggregates: Optional[Mapping[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Figure of one chart, or None if it cannot be built here (the Streamlit app then falls back)."""
+    if not isinstance(data, Mapping):
+        return None
+    layout = layout if isinstance(layout, Mapping) else {}
+    aggregates = aggregates or {}
+    if chart_type in BASIC_CHART_TYPES:
+        return basic_figure(chart_type, data, layout)
+    if chart_type == "correlation" and aggregates.get("correlation"):
+        figure = correlation_figure(aggregates["correlation"], layout)
+    elif chart_type in ("boxplot", "violin") and (data.get("distributions") or aggregates.get("distributions")):
+        figure = distribution_figure(chart_type, data.get("distributions") or aggregates["distributions"], layout)
+    else:
+        return None
+    _apply_axis_titles(figure, data, layout)
+    return figure
+
+def build(visualization_data: Mapping[str, Any], aggregates: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    """
+    The render-ready document of a visualization: its title, metadata and Plotly
+    figure JSON, or for dashboards the grid and one figure per chart. It has no
+    ``id``: it is cached with the payload blob, not per visualization.
+    """
+    chart_type = visualization_data.get("chart_type")
+    data = visualization_data.get("data")
+    document: Dict[str, Any] = {
+        "title": visualization_data.get("title"),
+        "chart_type": chart_type,
+        "metadata": visualization_data.get("metadata"),
+        "version": FIGURE_VERSION
+    }
+    for key in ("downsampling", "summarized"):
+        if key in visualization_data:
+            document[key] = visualization_data[key]
+    if chart_type == "dashboard":
+        data = data if isinstance(data, Mapping) else {}
+        grid = data.get("layout", {"rows": 2, "cols": 2})
+        chart_aggregates: List[Any] = (aggregates or {}).get("charts", [])
+        charts = []
+        for i, chart in enumerate(data.get("charts", [])):
+            chart = chart if isinstance(chart, Mapping) else {}
+            charts.append({
+                "title": chart.get("title", f"Chart {i + 1}"),
+                "type": chart.get("type", "line"),
+                "figure": chart_figure(chart.get("type", "line"), chart.get("data", {}), chart.get("layout", {}),
+                                       chart_aggregates[i] if i < len(chart_aggregates) else None)
+            })
+        document["dashboard"] = {"rows": grid.get("rows", 2), "cols": grid.get("cols", 2), "charts": charts}
+    else:
+        document["figure"] = chart_figure(chart_type, data, visualization_data.get("layout"), aggregates)
+    return document
+
+def encode(document: Dict[str, Any]) -> bytes:
+    return json.dumps(document, separators=(",", ":")).encode("utf-8")
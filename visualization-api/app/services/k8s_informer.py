@@ -0,0 +1,157 @@
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from kubernetes_asyncio import client, watch
+
+logger = logging.getLogger(__name__)
+
+HTTP_GONE = 410
+
+class ResourceInformer:
+    """
+    List-and-watch cache of the namespaced objects of one kind whose names start
+    with ``prefix`` (e.g. the ``viz-svc-*`` Services), so lookups are answered from
+    memory instead of a GET to the API server.
+
+    A background task lists the objects once, then watches from the list's
+    resourceVersion, applying ADDED/MODIFIED/DELETED events and following
+    BOOKMARKs. A watch that expires (410 Gone) or fails triggers a fresh list, and
+    the whole set is relisted every ``resync_seconds`` to repair any drift. Until
+    the first list succeeds, and while the watch is broken, ``synced`` is False and
+    callers should fall back to reading from the API server.
+    """
+
+    def __init__(self, kind: str, list_func: Callable[..., Any], namespace: str, prefix: str,
+                 resync_seconds: float = 300, watch_timeout_seconds: int = 240):
+        self.kind = kind
+        self.list_func = list_func
+        self.namespace = namespace
+        self.prefix = prefix
+        self.resync_seconds = resync_seconds
+        self.watch_timeout_seconds = watch_timeout_seconds
+        self.resource_version: Optional[str] = None
+        self._objects: Dict[str, Any] = {}
+        self._synced = False
+        self._task: Optional[asyncio.Task] = None
+        self._listed_at = 0.0
+        self.lists = 0
+        self.events = 0
+        self.expired = 0
+        self.errors = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def synced(self) -> bool:
+        return self._synced
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        self._synced = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get(self, name: str) -> Optional[Any]:
+        """The cached object, or None if it does not exist. Only meaningful while ``synced``."""
+        obj = self._objects.get(name)
+        if obj is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return obj
+
+    def record(self, obj: Any) -> None:
+        """Cache an object this process just created, before its watch event arrives."""
+        self._objects[obj.metadata.name] = obj
+
+    def forget(self, name: str) -> None:
+        """Drop an object this process just deleted, before its watch event arrives."""
+        self._objects.pop(name, None)
+
+    async def _run(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                if self.resource_version is None or time.monotonic() - self._listed_at >= self.resync_seconds:
+                    await self._list()
+                started = time.monotonic()
+                await self._watch_events()
+                backoff = 1.0
+                if time.monotonic() - started < 1.0:
+                    # A watch closed right away (e.g. by a proxy) must not turn into a request loop
+                    await asyncio.sleep(1.0)
+                continue
+            except client.ApiException as e:
+                if e.status == HTTP_GONE:
+                    # The resourceVersion is older than the API server keeps history for: relist
+                    self.expired += 1
+                    self.resource_version = None
+                    continue
+                self._failed(e)
+            except Exception as e:
+                self._failed(e)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def _failed(self, error: BaseException) -> None:
+        self.errors += 1
+        # Events may have been missed: serve from the API server until the next list succeeds
+        self._synced = False
+        self.resource_version = None
+        logger.warning(f"{self.kind} informer for namespace {self.namespace} failed, relisting: {error}")
+
+    async def _list(self) -> None:
+        result = await self.list_func(namespace=self.namespace, _request_timeout=self.watch_timeout_seconds)
+        self._objects = {item.metadata.name: item for item in result.items
+                         if item.metadata.name.startswith(self.prefix)}
+        self.resource_version = result.metadata.resource_version
+        self._listed_at = time.monotonic()
+        self.lists += 1
+        if not self._synced:
+            logger.info(f"{self.kind} informer synced: {len(self._objects)} objects in namespace {self.namespace}")
+        self._synced = True
+
+    async def _watch_events(self) -> None:
+        """Apply watch events until the server ends the watch or the resync interval passes."""
+        timeout = max(1, min(self.watch_timeout_seconds,
+                             int(self.resync_seconds - (time.monotonic() - self._listed_at)) + 1))
+        async with watch.Watch() as w:
+            async for event in w.stream(self.list_func, namespace=self.namespace,
+                                        resource_version=self.resource_version,
+                                        allow_watch_bookmarks=True, timeout_seconds=timeout,
+                                        _request_timeout=timeout + 30):
+                metadata = event["raw_object"].get("metadata", {})
+                self.resource_version = metadata.get("resourceVersion", self.resource_version)
+                if event["type"] == "BOOKMARK":
+                    continue
+                name = metadata.get("name", "")
+                if not name.startswith(self.prefix):
+                    continue
+                self.events += 1
+                if event["type"] == "DELETED":
+                    self._objects.pop(name, None)
+                else:
+                    self._objects[name] = event["object"]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "synced": self.synced,
+            "objects": len(self._objects),
+            "resource_version": self.resource_version,
+            "lists": self.lists,
+            "events": self.events,
+            "expired": self.expired,
+            "errors": self.errors,
+            "hits": self.hits,
+            "misses": self.misses
+        }
@@ -1,14 +1,31 @@
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 import os
+import zlib
 import logging
 import asyncio
-from kubernetes import client, config
-from kubernetes.config.config_exception import ConfigException
+from kubernetes_asyncio import client, config
+from kubernetes_asyncio.config.config_exception import ConfigException
+from .k8s_informer import ResourceInformer
+from .shared_ingress import SharedIngressPaths
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# check: look the objects up, then create the missing ones in sequence
+# optimistic: create both concurrently, a 409 Conflict meaning the object already exists
+# apply: server-side apply both concurrently, so existing objects converge to the current spec
+EXPOSE_MODES = ("check", "optimistic", "apply")
+
+# dedicated: one Ingress per visualization
+# shared: visualizations of a viz_type share a few Ingresses, adding and removing their paths
+INGRESS_MODES = ("dedicated", "shared")
+
+SHARED_INGRESS_PREFIX = "viz-ing-shared-"
+
+FIELD_MANAGER = "visualization-api"
+APPLY_CONTENT_TYPE = "application/apply-patch+yaml"
+
 @dataclass
 class K8sResourceNames:
     service_name: str
@@ -21,19 +38,100 @@ class K8sResourceNames:
     target_port: int
 
 class K8sResourceManager:
+    """
+    Services and Ingresses exposing workflow visualizations. Calls go through a
+    native asyncio client with one pooled keep-alive HTTP session, so slow API
+    server responses do not hold threads of the default executor.
+    """
     def __init__(self):
         # Set namespace and ingress domain from environment variables
         self.namespace = os.getenv('K8S_NAMESPACE', 'default')
         self.ingress_domain = os.getenv('INGRESS_DOMAIN')
         if not self.ingress_domain:
             raise ValueError("Environment variable INGRESS_DOMAIN is not set")
-        
-        try:
-            config.load_kube_config()
-        except ConfigException:
-            config.load_incluster_config()
-        self.core_v1 = client.CoreV1Api()
-        self.networking_v1 = client.NetworkingV1Api()
+        # Simultaneous connections to the API server; further calls wait for a free one
+        self.connection_limit = int(os.getenv('K8S_CONNECTION_LIMIT', '32'))
+        self.request_timeout = float(os.getenv('K8S_REQUEST_TIMEOUT_SECONDS', '30'))
+        self.expose_mode = os.getenv('K8S_EXPOSE_MODE', 'check')
+        if self.expose_mode not in EXPOSE_MODES:
+            raise ValueError(f"Unsupported K8S_EXPOSE_MODE: {self.expose_mode} (expected one of {', '.join(EXPOSE_MODES)})")
+        self.ingress_mode = os.getenv('K8S_INGRESS_MODE', 'dedicated')
+        if self.ingress_mode not in INGRESS_MODES:
+            raise ValueError(f"Unsupported K8S_INGRESS_MODE: {self.ingress_mode} (expected one of {', '.join(INGRESS_MODES)})")
+        # Shared Ingresses per viz_type; each visualization's path goes to the one its name hashes to
+        self.shared_ingress_shards = int(os.getenv('K8S_SHARED_INGRESS_SHARDS', '4'))
+        self.shared_ingress_batch_seconds = float(os.getenv('K8S_SHARED_INGRESS_BATCH_MS', '20')) / 1000
+        self.shared_ingress_types = {
+            f"{SHARED_INGRESS_PREFIX}{viz_type}-{shard}": viz_type
+            for viz_type in self.VIZ_TYPE_CONFIGS for shard in range(self.shared_ingress_shards)
+        }
+        # Watch-backed caches of the viz-svc-*/viz-ing-* objects, so existence checks need no API call
+        self.informers_enabled = os.getenv('K8S_INFORMERS_ENABLED', 'true').lower() == 'true'
+        self.resync_seconds = float(os.getenv('K8S_INFORMER_RESYNC_SECONDS', '300'))
+        self.watch_timeout_seconds = int(os.getenv('K8S_WATCH_TIMEOUT_SECONDS', '240'))
+        # The client session belongs to the event loop: created by connect()
+        self.api_client: Optional[client.ApiClient] = None
+        self.core_v1: Optional[client.CoreV1Api] = None
+        self.networking_v1: Optional[client.NetworkingV1Api] = None
+        self.service_informer: Optional[ResourceInformer] = None
+        self.ingress_informer: Optional[ResourceInformer] = None
+        self.shared_ingresses: Optional[SharedIngressPaths] = None
+        self._connect_lock = asyncio.Lock()
+        # In-flight create/delete operations, shared by concurrent identical calls
+        self._inflight: Dict[Tuple[str, ...], asyncio.Task] = {}
+        # Striped locks serializing creates and deletes of the same resource name
+        self._name_locks = [asyncio.Lock() for _ in range(64)]
+        self.api_reads = 0
+        self.rollbacks = 0
+        self.coalesced_creates = 0
+        self.coalesced_deletes = 0
+
+    async def connect(self) -> None:
+        """Load the kube config (or the in-cluster service account) and open the client session."""
+        if self.api_client is not None:
+            return
+        async with self._connect_lock:
+            if self.api_client is not None:
+                return
+            configuration = client.Configuration()
+            try:
+                await config.load_kube_config(client_configuration=configuration)
+            except ConfigException:
+                config.load_incluster_config(client_configuration=configuration)
+            configuration.connection_pool_maxsize = self.connection_limit
+            api_client = client.ApiClient(configuration)
+            self.core_v1 = client.CoreV1Api(api_client)
+            self.networking_v1 = client.NetworkingV1Api(api_client)
+            self.service_informer = ResourceInformer(
+                "Service", self.core_v1.list_namespaced_service, self.namespace, "viz-svc-",
+                self.resync_seconds, self.watch_timeout_seconds
+            )
+            self.ingress_informer = ResourceInformer(
+                "Ingress", self.networking_v1.list_namespaced_ingress, self.namespace, "viz-ing-",
+                self.resync_seconds, self.watch_timeout_seconds
+            )
+            self.shared_ingresses = SharedIngressPaths(
+                self.networking_v1, self.ingress_informer, self.namespace, self._create_shared_ingress_spec,
+                self.request_timeout, self.shared_ingress_batch_seconds, self.informers_enabled
+            )
+            self.api_client = api_client
+
+    async def start(self) -> None:
+        """Connect and start the informers; lookups go to the API server until they have synced."""
+        await self.connect()
+        if not self.informers_enabled:
+            return
+        for informer in (self.service_informer, self.ingress_informer):
+            informer.start()
+
+    async def close(self) -> None:
+        """Stop the informers and close the pooled connections."""
+        if self.api_client is None:
+            return
+        for informer in (self.service_informer, self.ingress_informer):
+            await informer.stop()
+        await self.api_client.close()
+        self.api_client = None
 
     def _generate_resource_names(self, name: str, label: str, base_url: str, needs_base_path: bool, target_port: int) -> K8sResourceNames:
         shorter_name = name[:50]
@@ -49,34 +147,31 @@ class K8sResourceManager:
         )
 
     async def _check_resources_exist(self, names: K8sResourceNames) -> Tuple[bool, bool]:
-        service_exists = False
-        ingress_exists = False
-
-        try:
-            await asyncio.to_thread(
-                self.core_v1.read_namespaced_service,
-                name=names.service_name, 
-                namespace=names.namespace
-            )
-            service_exists = True
+        await self.connect()
+        service_exists = await self._exists(
+            self.service_informer, self.core_v1.read_namespaced_service, names.service_name, names.namespace
+        )
+        if service_exists:
             logger.info(f"Service {names.service_name} already exists")
-        except client.ApiException as e:
-            if e.status != 404:
-                raise Exception(f"Kubernetes API error: {e}")
+        ingress_exists = await self._exists(
+            self.ingress_informer, self.networking_v1.read_namespaced_ingress, names.ingress_name, names.namespace
+        )
+        if ingress_exists:
+            logger.info(f"Ingress {names.ingress_name} already exists")
+        return service_exists, ingress_exists
 
+    async def _exists(self, informer: ResourceInformer, read_func, name: str, namespace: str) -> bool:
+        """Answer from the informer's cache when it is synced, else GET the object."""
+        if self.informers_enabled and informer.synced and namespace == informer.namespace:
+            return informer.get(name) is not None
+        self.api_reads += 1
         try:
-            await asyncio.to_thread(
-                self.networking_v1.read_namespaced_ingress,
-                name=names.ingress_name, 
-                namespace=names.namespace
-            )
-            ingress_exists = True
-            logger.info(f"Ingress {names.ingress_name} already exists")
+            await read_func(name=name, namespace=namespace, _request_timeout=self.request_timeout)
+            return True
         except client.ApiException as e:
             if e.status != 404:
                 raise Exception(f"Kubernetes API error: {e}")
-
-        return service_exists, ingress_exists
+            return False
 
     def detect_visualization_type(self, container_image: str, target_port: int) -> str:
         """Detect visualization type based on container image and target port."""
@@ -139,12 +234,28 @@ class K8sResourceManager:
         }
     }
 
-    def _create_ingress_spec(self, names: K8sResourceNames, viz_type: str = "generic-web") -> client.V1Ingress:
+    def _viz_type_annotations(self, viz_type: str, service_names: str) -> Dict[str, str]:
         viz_config = self.VIZ_TYPE_CONFIGS.get(viz_type, self.VIZ_TYPE_CONFIGS["generic-web"])
         annotations = viz_config.get("annotations", {}).copy()
         for key, value in annotations.items():
             if isinstance(value, str) and "#{service_name}#" in value:
-                annotations[key] = value.replace("#{service_name}#", names.service_name)
+                annotations[key] = value.replace("#{service_name}#", service_names)
+        return annotations
+
+    def _create_ingress_path(self, names: K8sResourceNames) -> client.V1HTTPIngressPath:
+        return client.V1HTTPIngressPath(
+            path=f"/{names.original_name}(/|$)(.*)",
+            path_type="Prefix",
+            backend=client.V1IngressBackend(
+                service=client.V1IngressServiceBackend(
+                    name=names.service_name,
+                    port=client.V1ServiceBackendPort(number=80)
+                )
+            )
+        )
+
+    def _create_ingress_spec(self, names: K8sResourceNames, viz_type: str = "generic-web") -> client.V1Ingress:
+        annotations = self._viz_type_annotations(viz_type, names.service_name)
         if viz_type == "jupyter":
             if names.needs_base_path:
                 annotations.update({
@@ -174,26 +285,100 @@ class K8sResourceManager:
                 ingress_class_name="nginx",
                 rules=[client.V1IngressRule(
                     host=self.ingress_domain,
-                    http=client.V1HTTPIngressRuleValue(
-                        paths=[client.V1HTTPIngressPath(
-                            path=f"/{names.original_name}(/|$)(.*)",
-                            path_type="Prefix",
-                            backend=client.V1IngressBackend(
-                                service=client.V1IngressServiceBackend(
-                                    name=names.service_name,
-                                    port=client.V1ServiceBackendPort(number=80)
-                                )
-                            )
-                        )]
-                    )
+                    http=client.V1HTTPIngressRuleValue(paths=[self._create_ingress_path(names)])
                 )]
             )
         )
 
+    def _shared_ingress_name(self, names: K8sResourceNames, viz_type: str) -> Optional[str]:
+        """
+        The shared Ingress routing this visualization, or None if it needs a
+        dedicated one: a base path rewrite differs per visualization, so only
+        visualizations rewritten to "/" can share their annotations.
+        """
+        if self.ingress_mode != "shared" or names.needs_base_path:
+            return None
+        viz_type = viz_type if viz_type in self.VIZ_TYPE_CONFIGS else "generic-web"
+        return f"{SHARED_INGRESS_PREFIX}{viz_type}-{self._shard(names.original_name)}"
+
+    def _shard(self, name: str) -> int:
+        return zlib.crc32(name.encode("utf-8")) % self.shared_ingress_shards
+
+    def _create_shared_ingress_spec(self, ingress_name: str, paths) -> client.V1Ingress:
+        service_names = ",".join(sorted({path.backend.service.name for path in paths}))
+        annotations = self._viz_type_annotations(self.shared_ingress_types[ingress_name], service_names)
+        annotations["nginx.ingress.kubernetes.io/rewrite-target"] = "/$2"
+        return client.V1Ingress(
+            metadata=client.V1ObjectMeta(name=ingress_name, annotations=annotations),
+            spec=client.V1IngressSpec(
+                ingress_class_name="nginx",
+                rules=[client.V1IngressRule(
+                    host=self.ingress_domain,
+                    http=client.V1HTTPIngressRuleValue(paths=list(paths))
+                )]
+            )
+        )
+
+    def _name_lock(self, name: str) -> asyncio.Lock:
+        # Resource names are derived from the first 50 characters of the workflow name
+        return self._name_locks[zlib.crc32(name[:50].encode("utf-8")) % len(self._name_locks)]
+
+    async def _single_flight(self, key: Tuple[str, ...], name: str, func, *args):
+        """
+        Run ``func(*args)`` under the lock of ``name``, or, if an identical call
+        (same ``key``) is already running, wait for that one and share its result.
+        The operation is shielded, so a caller that goes away does not cancel it
+        for the others. Registering a create retires the in-flight deletes of
+        ``name`` and vice versa: a call arriving after the opposite one queues
+        behind it on the name lock instead of joining an operation it would undo.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            if key[0] == "create":
+                self.coalesced_creates += 1
+            else:
+                self.coalesced_deletes += 1
+            logger.info(f"Joining in-flight {key[0]} of {name}")
+            return await asyncio.shield(task)
+        for other in [k for k in self._inflight if k[0] != key[0] and k[1] == name]:
+            del self._inflight[other]
+        task = asyncio.get_running_loop().create_task(self._locked(name, func, *args))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    async def _locked(self, name: str, func, *args):
+        async with self._name_lock(name):
+            return await func(*args)
+
+    def _finished(self, key: Tuple[str, ...], task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Retrieved here too, in case every caller was cancelled
+            task.exception()
+
     async def create_resources(self, name: str, label: str, base_url: str, 
                             needs_base_path: bool, target_port: int, 
                             viz_type: str = "generic-web") -> str:
+        """
+        Expose a workflow's visualization and return its URL. Concurrent calls for
+        the same (name, label, viz_type), e.g. retrying pods, share one operation.
+        """
+        return await self._single_flight(("create", name, label, viz_type), name, self._create_resources,
+                                         name, label, base_url, needs_base_path, target_port, viz_type)
+
+    async def _create_resources(self, name: str, label: str, base_url: str, needs_base_path: bool,
+                                target_port: int, viz_type: str) -> str:
         names = self._generate_resource_names(name, label, base_url, needs_base_path, target_port)
+        shared_ingress = self._shared_ingress_name(names, viz_type)
+        if shared_ingress is not None:
+            await self._ensure_shared_resources(names, shared_ingress)
+            return self._generate_url(names.original_name)
+        if self.expose_mode != "check":
+            await self._ensure_resources(names, viz_type)
+            return self._generate_url(names.original_name)
+
         service_exists, ingress_exists = await self._check_resources_exist(names)
 
         if service_exists and ingress_exists:
@@ -203,20 +388,22 @@ class K8sResourceManager:
         try:
             if not service_exists:
                 service_spec = self._create_service_spec(names)
-                await asyncio.to_thread(
-                    self.core_v1.create_namespaced_service,
-                    namespace=names.namespace, 
-                    body=service_spec
+                service = await self.core_v1.create_namespaced_service(
+                    namespace=names.namespace,
+                    body=service_spec,
+                    _request_timeout=self.request_timeout
                 )
+                self.service_informer.record(service)
                 logger.info(f"Service {names.service_name} created")
 
             if not ingress_exists:
                 ingress_spec = self._create_ingress_spec(names, viz_type)
-                await asyncio.to_thread(
-                    self.networking_v1.create_namespaced_ingress,
-                    namespace=names.namespace, 
-                    body=ingress_spec
+                ingress = await self.networking_v1.create_namespaced_ingress(
+                    namespace=names.namespace,
+                    body=ingress_spec,
+                    _request_timeout=self.request_timeout
                 )
+                self.ingress_informer.record(ingress)
                 logger.info(f"Ingress {names.ingress_name} created for {viz_type} visualization")                
 
         except client.ApiException as e:
@@ -225,7 +412,134 @@ class K8sResourceManager:
 
         return self._generate_url(names.original_name)
 
+    async def _ensure_resources(self, names: K8sResourceNames, viz_type: str) -> None:
+        """
+        Create (optimistic) or apply (apply) the Service and Ingress concurrently,
+        without reading them first. If one fails, the other is deleted again when
+        this call created it, so a failed expose leaves nothing behind.
+        """
+        await self.connect()
+        results = await asyncio.gather(
+            self._ensure("Service", self.service_informer, names.service_name, names.namespace,
+                         lambda: self._create_service_spec(names),
+                         self.core_v1.create_namespaced_service,
+                         self.core_v1.patch_namespaced_service_with_http_info),
+            self._ensure("Ingress", self.ingress_informer, names.ingress_name, names.namespace,
+                         lambda: self._create_ingress_spec(names, viz_type),
+                         self.networking_v1.create_namespaced_ingress,
+                         self.networking_v1.patch_namespaced_ingress_with_http_info),
+            return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if not errors:
+            return
+        if results[0] is True:
+            await self._rollback(self.service_informer, self.core_v1.delete_namespaced_service,
+                                 names.service_name, names.namespace)
+        if results[1] is True:
+            await self._rollback(self.ingress_informer, self.networking_v1.delete_namespaced_ingress,
+                                 names.ingress_name, names.namespace)
+        logger.error(f"Failed to create resources: {errors[0]}")
+        if isinstance(errors[0], client.ApiException):
+            raise Exception(f"Kubernetes API error: {errors[0]}")
+        raise errors[0]
+
+    async def _ensure_shared_resources(self, names: K8sResourceNames, ingress_name: str) -> None:
+        """
+        Create the Service (as in optimistic or apply mode) and add the
+        visualization's path to its shared Ingress, concurrently. If one fails,
+        whatever this call added is removed again.
+        """
+        await self.connect()
+        results = await asyncio.gather(
+            self._ensure("Service", self.service_informer, names.service_name, names.namespace,
+                         lambda: self._create_service_spec(names),
+                         self.core_v1.create_namespaced_service,
+                         self.core_v1.patch_namespaced_service_with_http_info),
+            self.shared_ingresses.add(ingress_name, self._create_ingress_path(names)),
+            return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if not errors:
+            return
+        if results[0] is True:
+            await self._rollback(self.service_informer, self.core_v1.delete_namespaced_service,
+                                 names.service_name, names.namespace)
+        if results[1] is True:
+            self.rollbacks += 1
+            try:
+                await self.shared_ingresses.remove(ingress_name, self._create_ingress_path(names).path)
+            except Exception as e:
+                logger.error(f"Failed to roll back the path of {names.original_name}: {e}")
+        logger.error(f"Failed to create resources: {errors[0]}")
+        if isinstance(errors[0], client.ApiException):
+            raise Exception(f"Kubernetes API error: {errors[0]}")
+        raise errors[0]
+
+    async def _remove_shared_paths(self, names: K8sResourceNames) -> None:
+        """Remove the visualization's path from the shared Ingresses it may be routed by."""
+        path = self._create_ingress_path(names).path
+        shard = self._shard(names.original_name)
+        candidates = [f"{SHARED_INGRESS_PREFIX}{viz_type}-{shard}" for viz_type in self.VIZ_TYPE_CONFIGS]
+        if self.informers_enabled and self.ingress_informer.synced:
+            cached = [name for name in candidates if self.shared_ingresses.cached_path(name, path) is not None]
+            # In shared mode, a path the cache has not seen yet may still be there
+            candidates = cached or (candidates if self.ingress_mode == "shared" else [])
+        elif self.ingress_mode != "shared":
+            return
+        await asyncio.gather(*(self.shared_ingresses.remove(name, path) for name in candidates))
+
+    async def _ensure(self, kind: str, informer: ResourceInformer, name: str, namespace: str,
+                      build_spec, create_func, apply_func) -> bool:
+        """Make sure one object exists; True if this call created it."""
+        if self.expose_mode == "optimistic" and self.informers_enabled and informer.synced \
+                and informer.get(name) is not None:
+            logger.info(f"{kind} {name} already exists")
+            return False
+        spec = build_spec()
+        # Server-side apply needs the full type information in the body
+        spec.api_version = "v1" if kind == "Service" else "networking.k8s.io/v1"
+        spec.kind = kind
+        if self.expose_mode == "apply":
+            obj, status, _ = await apply_func(
+                name=name,
+                namespace=namespace,
+                body=spec,
+                field_manager=FIELD_MANAGER,
+                force=True,
+                _content_type=APPLY_CONTENT_TYPE,
+                _request_timeout=self.request_timeout
+            )
+            informer.record(obj)
+            logger.info(f"{kind} {name} {'created' if status == 201 else 'applied'}")
+            return status == 201
+        try:
+            obj = await create_func(namespace=namespace, body=spec, _request_timeout=self.request_timeout)
+        except client.ApiException as e:
+            if e.status != 409:
+                raise
+            logger.info(f"{kind} {name} already exists")
+            return False
+        informer.record(obj)
+        logger.info(f"{kind} {name} created")
+        return True
+
+    async def _rollback(self, informer: ResourceInformer, delete_func, name: str, namespace: str) -> None:
+        self.rollbacks += 1
+        try:
+            await delete_func(name=name, namespace=namespace, _request_timeout=self.request_timeout)
+            logger.info(f"Rolled back {name}")
+        except client.ApiException as e:
+            if e.status != 404:
+                logger.error(f"Failed to roll back {name}: {e}")
+                return
+        informer.forget(name)
+
     async def delete_resources(self, name: str, label: str) -> None:
+        """Delete a workflow's visualization Service and Ingress, after any create of the same name."""
+        await self._single_flight(("delete", name, label), name, self._delete_resources, name, label)
+
+    async def _delete_resources(self, name: str, label: str) -> None:
         names = self._generate_resource_names(
             name, 
             label, 
@@ -233,28 +547,52 @@ class K8sResourceManager:
             needs_base_path=False,
             target_port=5173
         )
+        await self.connect()
 
         try:
-            await asyncio.to_thread(
-                self.networking_v1.delete_namespaced_ingress,
-                name=names.ingress_name, 
-                namespace=names.namespace
+            await self._remove_shared_paths(names)
+        except client.ApiException as e:
+            raise Exception(f"Failed to delete ingress path: {e}")
+
+        try:
+            await self.networking_v1.delete_namespaced_ingress(
+                name=names.ingress_name,
+                namespace=names.namespace,
+                _request_timeout=self.request_timeout
             )
             logger.info(f"Ingress {names.ingress_name} deleted")
         except client.ApiException as e:
             if e.status != 404:
                 raise Exception(f"Failed to delete ingress: {e}")
+        self.ingress_informer.forget(names.ingress_name)
 
         try:
-            await asyncio.to_thread(
-                self.core_v1.delete_namespaced_service,
-                name=names.service_name, 
-                namespace=names.namespace
+            await self.core_v1.delete_namespaced_service(
+                name=names.service_name,
+                namespace=names.namespace,
+                _request_timeout=self.request_timeout
             )
             logger.info(f"Service {names.service_name} deleted")
         except client.ApiException as e:
             if e.status != 404:
                 raise Exception(f"Failed to delete service: {e}")
+        self.service_informer.forget(names.service_name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "informers_enabled": self.informers_enabled,
+            "connection_limit": self.connection_limit,
+            "expose_mode": self.expose_mode,
+            "ingress_mode": self.ingress_mode,
+            "api_reads": self.api_reads,
+            "rollbacks": self.rollbacks,
+            "coalesced_creates": self.coalesced_creates,
+            "coalesced_deletes": self.coalesced_deletes,
+            "inflight": len(self._inflight),
+            "services": self.service_informer.snapshot() if self.service_informer else None,
+            "ingresses": self.ingress_informer.snapshot() if self.ingress_informer else None,
+            "shared_ingresses": self.shared_ingresses.snapshot() if self.shared_ingresses else None
+        }
 
     def _generate_url(self, name: str) -> str:
         return f"https://{self.ingress_domain}/{name}/"
\ No newline at end of file
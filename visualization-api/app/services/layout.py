@@ -0,0 +1,80 @@
+import os
+import json
+import uuid
+import logging
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Marker recording the shard depth every visualization directory is stored at
+LAYOUT_FILE = "layout.json"
+
+# Shard names come from the leading hex digits of a uuid (8 before the first dash)
+MAX_SHARD_DEPTH = 4
+
+def shard_parts(viz_id: str, depth: int) -> List[str]:
+    """Fan-out directories of a visualization: ``ab/cd`` for depth 2 and id ``abcd...``."""
+    key = viz_id.ljust(2 * depth, "_")
+    return [key[2 * i:2 * i + 2] for i in range(depth)]
+
+def is_shard_name(name: str) -> bool:
+    # Visualization ids are uuids, so a two-character directory is always a shard
+    return len(name) == 2
+
+def read_layout(data_dir: str) -> Optional[int]:
+    """The shard depth recorded in the data directory, or None for a store that predates sharding."""
+    try:
+        with open(os.path.join(data_dir, LAYOUT_FILE), "r") as f:
+            return int(json.load(f)["shard_depth"])
+    except FileNotFoundError:
+        return None
+    except (ValueError, KeyError, TypeError) as e:
+        logger.error(f"Ignoring unreadable {LAYOUT_FILE}: {e}")
+        return None
+
+def write_layout(data_dir: str, depth: int) -> None:
+    path = os.path.join(data_dir, LAYOUT_FILE)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"shard_depth": depth}, f)
+    os.replace(tmp_path, path)
+
+def has_directories(data_dir: str, reserved: Iterable[str]) -> bool:
+    """Whether the data directory holds anything but the reserved directories (stops at the first)."""
+    with os.scandir(data_dir) as entries:
+        return any(entry.is_dir() and entry.name not in reserved and not entry.name.startswith(".")
+                   for entry in entries)
+
+def iter_visualization_dirs(data_dir: str, reserved: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """
+    (viz_id, directory) of every stored visualization at any shard depth, so
+    stores part-way through a migration are listed completely (blocking).
+    """
+    reserved = set(reserved)
+    stack = [(data_dir, 0)]
+    while stack:
+        directory, level = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.name.startswith(".") or (level == 0 and entry.name in reserved):
+                continue
+            if not entry.is_dir():
+                continue
+            if is_shard_name(entry.name) and level < MAX_SHARD_DEPTH:
+                stack.append((entry.path, level + 1))
+            else:
+                yield entry.name, entry.path
+
+def prune_empty_shards(data_dir: str, directory: str) -> None:
+    """Remove ``directory`` and its parents up to ``data_dir`` while they are empty shard directories."""
+    data_dir = os.path.abspath(data_dir)
+    directory = os.path.abspath(directory)
+    while directory != data_dir and is_shard_name(os.path.basename(directory)):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
@@ -0,0 +1,322 @@
+import os
+import abc
+import uuid
+import shutil
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
+except ImportError:  # S3 support is optional
+    boto3 = None
+
+logger = logging.getLogger(__name__)
+
+STORAGE_BACKENDS = ("none", "local", "s3")
+
+def content_headers(key: str) -> Tuple[str, Optional[str]]:
+    """(Content-Type, Content-Encoding) an object is stored and served with, from its key."""
+    name = key.rsplit("/", 1)[-1]
+    if name.endswith(".json.gz"):
+        return "application/json", "gzip"
+    if name.endswith(".json.zst"):
+        return "application/json", "zstd"
+    if name.endswith(".json"):
+        return "application/json", None
+    return "application/octet-stream", None
+
+class ObjectStore(abc.ABC):
+    """
+    Shared store for visualization files, so any API replica can serve any
+    visualization. Keys are '/'-separated paths such as ``blobs/<kk>/<key>/data.json.gz``.
+    All calls are blocking and are meant to run off the event loop; a missing
+    object raises FileNotFoundError.
+    """
+    name = ""
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self.uploads = 0
+        self.bytes_uploaded = 0
+        self.multipart_uploads = 0
+        self.downloads = 0
+        self.bytes_downloaded = 0
+        self.deletes = 0
+        self.presigned_urls = 0
+
+    def _count(self, **counters: int) -> None:
+        with self._stats_lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    @abc.abstractmethod
+    def put_file(self, key: str, path: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    def put_bytes(self, key: str, data: bytes) -> None:
+        ...
+
+    @abc.abstractmethod
+    def get_file(self, key: str, path: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    def get_bytes(self, key: str) -> bytes:
+        ...
+
+    @abc.abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def list(self, prefix: str) -> List[str]:
+        """Keys under a directory-like prefix ending in '/'."""
+
+    @abc.abstractmethod
+    def list_modified(self, prefix: str) -> Dict[str, float]:
+        """Keys under a directory-like prefix ending in '/', with their last-modified times (epoch seconds)."""
+
+    @abc.abstractmethod
+    def delete(self, keys: Iterable[str]) -> None:
+        ...
+
+    def presigned_url(self, key: str) -> Optional[str]:
+        """A time-limited URL clients can GET the object from directly, or None if unsupported."""
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "backend": self.name,
+                "uploads": self.uploads,
+                "bytes_uploaded": self.bytes_uploaded,
+                "multipart_uploads": self.multipart_uploads,
+                "downloads": self.downloads,
+                "bytes_downloaded": self.bytes_downloaded,
+                "deletes": self.deletes,
+                "presigned_urls": self.presigned_urls
+            }
+
+class LocalObjectStore(ObjectStore):
+    """Objects as files under a directory, e.g. a ReadWriteMany volume shared by all replicas."""
+    name = "local"
+
+    def __init__(self, root: str):
+        super().__init__()
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        parts = key.split("/")
+        if any(part in ("", ".", "..") for part in parts):
+            raise ValueError(f"Invalid object key: {key}")
+        return os.path.join(self.root, *parts)
+
+    def put_file(self, key: str, path: str) -> None:
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, target)
+        self._count(uploads=1, bytes_uploaded=os.path.getsize(target))
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, target)
+        self._count(uploads=1, bytes_uploaded=len(data))
+
+    def get_file(self, key: str, path: str) -> None:
+        shutil.copyfile(self._path(key), path)
+        self._count(downloads=1, bytes_downloaded=os.path.getsize(path))
+
+    def get_bytes(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            data = f.read()
+        self._count(downloads=1, bytes_downloaded=len(data))
+        return data
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def list(self, prefix: str) -> List[str]:
+        return list(self.list_modified(prefix))
+
+    def list_modified(self, prefix: str) -> Dict[str, float]:
+        directory = self._path(prefix.rstrip("/"))
+        keys = {}
+        for root, _, names in os.walk(directory):
+            rel = os.path.relpath(root, self.root).replace(os.sep, "/")
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                try:
+                    keys[f"{rel}/{name}"] = os.path.getmtime(os.path.join(root, name))
+                except FileNotFoundError:
+                    # Deleted while listing
+                    continue
+        return keys
+
+    def delete(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            path = self._path(key)
+            try:
+                os.remove(path)
+                self._count(deletes=1)
+            except FileNotFoundError:
+                continue
+            # Directories only exist to hold keys, so drop the ones left empty
+            directory = os.path.dirname(path)
+            while directory != self.root:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+                directory = os.path.dirname(directory)
+
+class S3ObjectStore(ObjectStore):
+    """
+    Objects in an S3-compatible bucket (AWS S3, MinIO, ...). Files above the
+    multipart threshold are uploaded in parallel parts. Presigned URLs are signed
+    for ``public_endpoint_url`` when set, since the in-cluster endpoint the API
+    uses is usually not reachable by the clients following them.
+    """
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        public_endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        multipart_threshold: int = 8 * 1024 * 1024,
+        multipart_chunk_size: int = 8 * 1024 * 1024,
+        presign_expires_seconds: int = 900
+    ):
+        if boto3 is None:
+            raise ValueError("The s3 storage backend requires the 'boto3' package")
+        super().__init__()
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.multipart_threshold = multipart_threshold
+        self.presign_expires_seconds = presign_expires_seconds
+        # Path-style addressing works with MinIO and other endpoints without bucket DNS names
+        config = Config(signature_version="s3v4", s3={"addressing_style": "path"} if endpoint_url else {})
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region, config=config)
+        self.presign_client = self.client
+        if public_endpoint_url:
+            self.presign_client = boto3.client("s3", endpoint_url=public_endpoint_url, region_name=region,
+                                               config=config)
+        self.transfer = TransferConfig(multipart_threshold=multipart_threshold,
+                                       multipart_chunksize=multipart_chunk_size, max_concurrency=4)
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    def put_file(self, key: str, path: str) -> None:
+        content_type, content_encoding = content_headers(key)
+        extra = {"ContentType": content_type}
+        if content_encoding:
+            extra["ContentEncoding"] = content_encoding
+        size = os.path.getsize(path)
+        self.client.upload_file(path, self.bucket, self._key(key), ExtraArgs=extra, Config=self.transfer)
+        self._count(uploads=1, bytes_uploaded=size, multipart_uploads=int(size >= self.multipart_threshold))
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        content_type, content_encoding = content_headers(key)
+        extra = {"ContentType": content_type}
+        if content_encoding:
+            extra["ContentEncoding"] = content_encoding
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data, **extra)
+        self._count(uploads=1, bytes_uploaded=len(data))
+
+    def get_file(self, key: str, path: str) -> None:
+        try:
+            self.client.download_file(self.bucket, self._key(key), path, Config=self.transfer)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                raise FileNotFoundError(f"Object not found: {key}")
+            raise
+        self._count(downloads=1, bytes_downloaded=os.path.getsize(path))
+
+    def get_bytes(self, key: str) -> bytes:
+        try:
+            data = self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"].read()
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                raise FileNotFoundError(f"Object not found: {key}")
+            raise
+        self._count(downloads=1, bytes_downloaded=len(data))
+        return data
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return False
+            raise
+
+    def list(self, prefix: str) -> List[str]:
+        return list(self.list_modified(prefix))
+
+    def list_modified(self, prefix: str) -> Dict[str, float]:
+        keys = {}
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for item in page.get("Contents", []):
+                keys[item["Key"][len(self.prefix):]] = item["LastModified"].timestamp()
+        return keys
+
+    def delete(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        # DeleteObjects takes at most 1000 keys per request
+        for i in range(0, len(keys), 1000):
+            self.client.delete_objects(Bucket=self.bucket, Delete={
+                "Objects": [{"Key": self._key(key)} for key in keys[i:i + 1000]], "Quiet": True
+            })
+        self._count(deletes=len(keys))
+
+    def presigned_url(self, key: str) -> Optional[str]:
+        url = self.presign_client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": self._key(key)},
+            ExpiresIn=self.presign_expires_seconds
+        )
+        self._count(presigned_urls=1)
+        return url
+
+def default_object_store() -> Optional[ObjectStore]:
+    """Object store configured by STORAGE_BACKEND (none, local or s3); None keeps files on the local volume only."""
+    backend = os.environ.get("STORAGE_BACKEND", "none")
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unsupported storage backend: {backend} (expected one of {', '.join(STORAGE_BACKENDS)})")
+    if backend == "local":
+        root = os.environ.get("OBJECT_STORE_PATH")
+        if not root:
+            raise ValueError("STORAGE_BACKEND=local requires OBJECT_STORE_PATH")
+        return LocalObjectStore(root)
+    if backend == "s3":
+        bucket = os.environ.get("S3_BUCKET")
+        if not bucket:
+            raise ValueError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+        return S3ObjectStore(
+            bucket=bucket,
+            prefix=os.environ.get("S3_PREFIX", ""),
+            endpoint_url=os.environ.get("S3_ENDPOINT_URL") or None,
+            public_endpoint_url=os.environ.get("S3_PUBLIC_ENDPOINT_URL") or None,
+            region=os.environ.get("S3_REGION") or None,
+            multipart_threshold=int(os.environ.get("S3_MULTIPART_THRESHOLD_BYTES", str(8 * 1024 * 1024))),
+            multipart_chunk_size=int(os.environ.get("S3_MULTIPART_CHUNK_BYTES", str(8 * 1024 * 1024))),
+            presign_expires_seconds=int(os.environ.get("S3_PRESIGN_EXPIRES_SECONDS", "900"))
+        )
+    return None
@@ -0,0 +1,285 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from .access_index import scan_blob
+from .storage_writer import FileWrite, StageStats
+from .streamlit_service import StreamlitService, streamlit_service
+from .upload_service import UploadService, upload_service
+
+logger = logging.getLogger(__name__)
+
+class RetentionSweeper:
+    """
+    Background task bounding the disk used by STREAMLIT_DATA_DIR.
+
+    Every sweep deletes visualizations not accessed within the TTL, then evicts
+    the least recently used ones until the stored bytes fit the quota. Candidates
+    come from the service's access index, so a sweep never walks the storage tree;
+    the tree is only listed once at startup to pick up visualizations the persisted
+    index does not know about. Deletions are paced to a maximum rate so a large
+    backlog of expired data does not starve request handling of disk I/O.
+
+    With an object store configured, the quota and the TTL only evict local
+    copies (they are fetched again on the next read), since each replica's data
+    directory is then just a cache. Expiry of the store itself uses access times
+    shared through it: reads are stamped as ``access/<viz_id>`` objects, at most
+    once per tenth of the TTL, and every RETENTION_STORE_SWEEP_INTERVAL_SECONDS
+    the visualizations neither stored nor read by any replica within the TTL are
+    deleted from the store. The sweeper also refreshes the catalog from the store,
+    so GET /visualizations lists visualizations stored through other replicas.
+    """
+
+    def __init__(self, service: StreamlitService, uploads: UploadService):
+        self.service = service
+        self.uploads = uploads
+        self.index = service.access_index
+        # Delete visualizations not read for this long (0 disables)
+        self.ttl_seconds = float(os.environ.get("RETENTION_TTL_SECONDS", "0"))
+        # Evict least recently used visualizations above this many stored bytes (0 disables)
+        self.max_bytes = int(os.environ.get("RETENTION_MAX_BYTES", "0"))
+        self.interval_seconds = float(os.environ.get("RETENTION_SWEEP_INTERVAL_SECONDS", "60"))
+        # Upper bound on deletions per second across a sweep
+        self.max_evictions_per_second = float(os.environ.get("RETENTION_MAX_EVICTIONS_PER_SECOND", "20"))
+        # Abort upload sessions that received no data for this long (0 disables)
+        self.upload_ttl_seconds = float(os.environ.get("RETENTION_UPLOAD_TTL_SECONDS", "86400"))
+        self.store = service.object_store
+        # With an object store: how often the catalog picks up visualizations stored through
+        # other replicas, and how often visualizations expired everywhere are deleted from it
+        self.catalog_refresh_seconds = float(os.environ.get("CATALOG_STORE_REFRESH_SECONDS", "60"))
+        self.store_sweep_interval_seconds = float(os.environ.get("RETENTION_STORE_SWEEP_INTERVAL_SECONDS", "3600"))
+        # Reads of a visualization are stamped in the store at most this often
+        self.stamp_interval_seconds = self.ttl_seconds / 10
+        self._stamped: Dict[str, float] = {}
+        self._last_stamp_pass = 0.0
+        self._next_catalog_refresh = 0.0
+        self._next_store_sweep = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.sweep_stats = StageStats()
+        self.evicted_ttl = 0
+        self.evicted_quota = 0
+        self.evicted_store = 0
+        self.catalog_added = 0
+        self.catalog_removed = 0
+        self.files_evicted = 0
+        self.bytes_evicted = 0
+        self.uploads_expired = 0
+        self.errors = 0
+
+    async def start(self) -> None:
+        """Load and reconcile the access index, then start sweeping in the background."""
+        state = await self.service.writer.run(self._reconcile)
+        self.index.load(state)
+        self.index.dirty = True
+        snapshot = self.index.snapshot()
+        logger.info(f"Access index loaded: {snapshot['visualizations']} visualizations, "
+                    f"{snapshot['bytes_used']} bytes")
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop sweeping and persist the access index."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._persist()
+
+    def _reconcile(self) -> Dict[str, Any]:
+        """
+        Merge the persisted index with the visualizations actually on disk (blocking).
+        Entries whose visualization is gone are dropped; visualizations missing from
+        the index are added with their meta.json modification time as last access.
+        """
+        state = self.index.read() or {}
+        blobs: Dict[str, List[int]] = dict(state.get("blobs", {}))
+        known = {entry[0]: entry for entry in state.get("entries", [])}
+
+        entries, added = [], 0
+        for name, viz_dir in self.service._visualization_dirs():
+            if name in known:
+                entries.append(known[name])
+                continue
+            try:
+                blob = self.service._read_json(os.path.join(viz_dir, "meta.json")).get("blob")
+                stamp = os.path.getmtime(os.path.join(viz_dir, "meta.json"))
+            except (FileNotFoundError, ValueError):
+                blob, stamp = None, None
+            if blob is None:
+                # Stored before content-addressed blobs: the payload lives in the visualization directory
+                blob = f"legacy:{name}"
+                blob_dir = viz_dir
+            else:
+                blob_dir = self.service._blob_dir(blob)
+            if blob not in blobs:
+                blobs[blob] = list(scan_blob(blob_dir))
+            if stamp is None:
+                stamp = os.path.getmtime(viz_dir)
+            entries.append([name, stamp, stamp, blob])
+            added += 1
+
+        dropped = len(known) - (len(entries) - added)
+        if added or dropped:
+            logger.info(f"Access index reconciled: {added} added, {dropped} dropped")
+        referenced = {entry[3] for entry in entries}
+        return {
+            "version": 1,
+            "entries": entries,
+            "blobs": {blob: stats for blob, stats in blobs.items() if blob in referenced}
+        }
+
+    async def _run(self) -> None:
+        # The first sweep runs right away, so a new replica's catalog is filled from the object store
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Retention sweep failed: {str(e)}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def sweep(self) -> Dict[str, int]:
+        """
+        Run one sweep; returns the number of visualizations evicted by TTL and by
+        quota, and deleted from the object store as expired on every replica.
+        """
+        started = time.perf_counter()
+        evicted = {"ttl": 0, "quota": 0, "store": 0}
+        pace = 1.0 / self.max_evictions_per_second if self.max_evictions_per_second > 0 else 0.0
+
+        if self.ttl_seconds > 0:
+            cutoff = time.time() - self.ttl_seconds
+            for viz_id in self.index.expired(cutoff):
+                if await self._evict(viz_id, pace, cutoff):
+                    evicted["ttl"] += 1
+        if self.max_bytes > 0 and self.index.bytes_used > self.max_bytes:
+            for viz_id, last_access in self.index.oldest():
+                if self.index.bytes_used <= self.max_bytes:
+                    break
+                if await self._evict(viz_id, pace, last_access):
+                    evicted["quota"] += 1
+        if self.upload_ttl_seconds > 0:
+            self.uploads_expired += await self.uploads.expire_sessions(time.time() - self.upload_ttl_seconds)
+        if self.store is not None:
+            evicted["store"] = await self._sweep_store(pace)
+        if self.index.dirty:
+            await self._persist()
+
+        self.evicted_ttl += evicted["ttl"]
+        self.evicted_quota += evicted["quota"]
+        self.evicted_store += evicted["store"]
+        self.sweep_stats.record((time.perf_counter() - started) * 1000)
+        if evicted["ttl"] or evicted["quota"] or evicted["store"]:
+            logger.info(f"Retention sweep evicted {evicted['ttl']} expired and {evicted['quota']} "
+                        f"over-quota visualizations ({self.index.bytes_used} bytes in use), and deleted "
+                        f"{evicted['store']} expired visualizations from the object store")
+        return evicted
+
+    async def _sweep_store(self, pace: float) -> int:
+        """Stamp reads, refresh the catalog and, when due, expire visualizations in the object store."""
+        now = time.monotonic()
+        if self.ttl_seconds > 0:
+            await self._stamp_accesses()
+        if now >= self._next_catalog_refresh:
+            self._next_catalog_refresh = now + self.catalog_refresh_seconds
+            result = await asyncio.to_thread(self.service.refresh_catalog_from_store)
+            self.catalog_added += result["added"]
+            self.catalog_removed += len(result["removed"])
+            for viz_id in result["removed"]:
+                # Deleted through another replica: drop the local copy as well
+                if viz_id in self.index:
+                    await self._evict(viz_id, pace, time.time())
+        deleted = 0
+        if self.ttl_seconds > 0 and now >= self._next_store_sweep:
+            self._next_store_sweep = now + self.store_sweep_interval_seconds
+            cutoff = time.time() - self.ttl_seconds
+            for viz_id in await asyncio.to_thread(self._store_expired):
+                last_access = self.index.last_access(viz_id)
+                if last_access is not None and last_access >= cutoff:
+                    # Read here since its access stamp was written
+                    continue
+                try:
+                    await self.service.delete_visualization(viz_id)
+                except FileNotFoundError:
+                    # Deleted meanwhile, e.g. by another replica's sweep
+                    continue
+                deleted += 1
+                if pace:
+                    await asyncio.sleep(pace)
+        return deleted
+
+    async def _stamp_accesses(self) -> None:
+        """Stamp the visualizations read since the last pass in the store, unless stamped within the interval."""
+        since, now = self._last_stamp_pass, time.time()
+        self._stamped = {viz_id: stamp for viz_id, stamp in self._stamped.items()
+                         if now - stamp < self.stamp_interval_seconds}
+        due = [viz_id for viz_id in self.index.accessed_since(since) if viz_id not in self._stamped]
+        if due:
+            await asyncio.to_thread(self.service.stamp_store_accesses, due)
+            self._stamped.update((viz_id, now) for viz_id in due)
+        self._last_stamp_pass = now
+
+    def _store_expired(self) -> List[str]:
+        """Visualizations in the object store neither stored nor read by any replica within the TTL (blocking)."""
+        # A read is stamped up to a stamp interval and a sweep after it happened
+        cutoff = time.time() - self.ttl_seconds - self.stamp_interval_seconds - self.interval_seconds
+        accesses = self.service.list_store_accesses()
+        stored = self.service.list_store_visualizations()
+        orphans = [viz_id for viz_id in accesses if viz_id not in stored]
+        if orphans:
+            self.service.delete_store_accesses(orphans)
+        return [viz_id for viz_id, created in stored.items() if max(created, accesses.get(viz_id, 0.0)) < cutoff]
+
+    async def _evict(self, viz_id: str, pace: float, listed_access: float) -> bool:
+        """Evict a candidate unless it was deleted, or accessed after ``listed_access``, since it was listed."""
+        last_access = self.index.last_access(viz_id)
+        if last_access is None or last_access > listed_access:
+            return False
+        before = self.index.snapshot()
+        try:
+            await self.service.evict_visualization(viz_id)
+        except FileNotFoundError:
+            self.index.forget(viz_id)
+        after = self.index.snapshot()
+        self.files_evicted += before["files_used"] - after["files_used"]
+        self.bytes_evicted += before["bytes_used"] - after["bytes_used"]
+        if pace:
+            await asyncio.sleep(pace)
+        return True
+
+    async def _persist(self) -> None:
+        state = self.index.dump()
+        try:
+            await self.service.writer.commit([FileWrite(path=self.index.path, data=json.dumps(state).encode("utf-8"))])
+        except Exception as e:
+            self.index.dirty = True
+            logger.error(f"Failed to persist access index: {str(e)}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return retention settings, eviction counters and sweep timings."""
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "max_bytes": self.max_bytes,
+            **self.index.snapshot(),
+            "evicted_ttl": self.evicted_ttl,
+            "evicted_quota": self.evicted_quota,
+            "evicted_store": self.evicted_store,
+            "catalog_added": self.catalog_added,
+            "catalog_removed": self.catalog_removed,
+            "files_evicted": self.files_evicted,
+            "bytes_evicted": self.bytes_evicted,
+            "uploads_expired": self.uploads_expired,
+            "errors": self.errors,
+            "sweep": self.sweep_stats.snapshot()
+        }
+
+# Create sweeper instance
+retention_sweeper = RetentionSweeper(streamlit_service, upload_service)
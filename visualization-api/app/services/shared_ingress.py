@@ -0,0 +1,206 @@
+import random
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from kubernetes_asyncio import client
+
+from .k8s_informer import ResourceInformer
+
+logger = logging.getLogger(__name__)
+
+MERGE_PATCH_CONTENT_TYPE = "application/merge-patch+json"
+
+# Attempts at writing one batch before its callers get an error
+MAX_CONFLICT_RETRIES = 8
+
+@dataclass
+class PathEdit:
+    path: str
+    # The path to add (replacing one with the same path string), or None to remove it
+    entry: Optional[client.V1HTTPIngressPath]
+    future: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+def ingress_paths(ingress: Optional[client.V1Ingress]) -> List[client.V1HTTPIngressPath]:
+    if ingress is None or ingress.spec is None or not ingress.spec.rules:
+        return []
+    http = ingress.spec.rules[0].http
+    return list(http.paths or []) if http else []
+
+def _backend_service(entry: client.V1HTTPIngressPath) -> Optional[str]:
+    service = entry.backend.service if entry.backend else None
+    return service.name if service else None
+
+class SharedIngressPaths:
+    """
+    Adds and removes the paths of Ingress objects shared by many visualizations,
+    so each expose or delete edits one path instead of creating or deleting a
+    whole Ingress (every Ingress change makes nginx-ingress reload its config).
+
+    Edits of one Ingress are queued and written by a single task per Ingress:
+    all edits that arrive within ``batch_seconds``, or while the previous write
+    is in flight, go into one write. Each write is guarded by the resourceVersion
+    it was computed from (a merge patch carrying it, or a delete precondition), so
+    a concurrent change by another replica makes it fail with 409 Conflict; the
+    batch is then recomputed from a fresh read and written again. An Ingress is
+    created with its first path and deleted with its last one.
+    """
+
+    def __init__(self, networking_v1: client.NetworkingV1Api, informer: ResourceInformer, namespace: str,
+                 build_spec: Callable[[str, List[client.V1HTTPIngressPath]], client.V1Ingress],
+                 request_timeout: float, batch_seconds: float = 0.02, informers_enabled: bool = True):
+        self.networking_v1 = networking_v1
+        self.informer = informer
+        self.namespace = namespace
+        self.build_spec = build_spec
+        self.request_timeout = request_timeout
+        self.batch_seconds = batch_seconds
+        self.informers_enabled = informers_enabled
+        self._pending: Dict[str, List[PathEdit]] = {}
+        self._writers: Dict[str, asyncio.Task] = {}
+        self.edits = 0
+        self.batches = 0
+        self.writes = 0
+        self.unchanged = 0
+        self.conflicts = 0
+
+    def cached(self, ingress_name: str) -> Optional[client.V1Ingress]:
+        """The informer's copy of a shared Ingress, or None if absent or the cache is not synced."""
+        if not (self.informers_enabled and self.informer.synced):
+            return None
+        return self.informer.get(ingress_name)
+
+    def cached_path(self, ingress_name: str, path: str) -> Optional[client.V1HTTPIngressPath]:
+        for entry in ingress_paths(self.cached(ingress_name)):
+            if entry.path == path:
+                return entry
+        return None
+
+    async def add(self, ingress_name: str, entry: client.V1HTTPIngressPath) -> bool:
+        """Route ``entry`` through the shared Ingress; True if this call added the path."""
+        cached = self.cached_path(ingress_name, entry.path)
+        if cached is not None and _backend_service(cached) == _backend_service(entry):
+            return False
+        return await self._submit(ingress_name, PathEdit(entry.path, entry))
+
+    async def remove(self, ingress_name: str, path: str) -> bool:
+        """Drop ``path`` from the shared Ingress; True if this call removed it."""
+        return await self._submit(ingress_name, PathEdit(path, None))
+
+    async def _submit(self, ingress_name: str, edit: PathEdit) -> bool:
+        self.edits += 1
+        self._pending.setdefault(ingress_name, []).append(edit)
+        if ingress_name not in self._writers:
+            self._writers[ingress_name] = asyncio.get_running_loop().create_task(self._run(ingress_name))
+        # Shielded: the edit is written even if this caller goes away
+        return await asyncio.shield(edit.future)
+
+    async def _run(self, ingress_name: str) -> None:
+        try:
+            while self._pending.get(ingress_name):
+                if self.batch_seconds > 0:
+                    await asyncio.sleep(self.batch_seconds)
+                edits = self._pending.pop(ingress_name)
+                self.batches += 1
+                try:
+                    results = await self._write(ingress_name, edits)
+                except Exception as e:
+                    logger.error(f"Failed to update shared Ingress {ingress_name}: {e}")
+                    for edit in edits:
+                        if not edit.future.done():
+                            edit.future.set_exception(e)
+                    continue
+                for edit, result in zip(edits, results):
+                    if not edit.future.done():
+                        edit.future.set_result(result)
+        finally:
+            self._writers.pop(ingress_name, None)
+
+    async def _read(self, ingress_name: str) -> Optional[client.V1Ingress]:
+        try:
+            return await self.networking_v1.read_namespaced_ingress(
+                name=ingress_name, namespace=self.namespace, _request_timeout=self.request_timeout
+            )
+        except client.ApiException as e:
+            if e.status != 404:
+                raise
+            return None
+
+    async def _write(self, ingress_name: str, edits: List[PathEdit]) -> List[bool]:
+        """Apply a batch of edits to the Ingress; for each edit, whether it changed the paths."""
+        cached = self.informers_enabled and self.informer.synced
+        for attempt in range(MAX_CONFLICT_RETRIES):
+            # The informer's copy is usually current (it holds this process's own last write);
+            # a stale copy makes the write fail with 409, and the next attempt reads the object
+            current = self.informer.get(ingress_name) if cached else await self._read(ingress_name)
+            before = ingress_paths(current)
+            paths = {entry.path: entry for entry in before}
+            results = []
+            for edit in edits:
+                present = paths.get(edit.path)
+                if edit.entry is None:
+                    results.append(paths.pop(edit.path, None) is not None)
+                else:
+                    results.append(present is None)
+                    paths[edit.path] = edit.entry
+            after = list(paths.values())
+            if [(p.path, _backend_service(p)) for p in after] == [(p.path, _backend_service(p)) for p in before]:
+                if cached and any(edit.entry is None for edit in edits):
+                    # Nothing is written to catch a stale copy, so confirm removals from the object itself
+                    cached = False
+                    continue
+                self.unchanged += 1
+                return results
+            try:
+                await self._apply(ingress_name, current, after)
+            except client.ApiException as e:
+                # 409: changed (or created) since it was read; 404: deleted since it was read
+                if e.status not in (404, 409):
+                    raise
+                self.conflicts += 1
+                cached = False
+                logger.info(f"Shared Ingress {ingress_name} changed concurrently, retrying")
+                await asyncio.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+                continue
+            self.writes += 1
+            logger.info(f"Shared Ingress {ingress_name} now routes {len(after)} paths ({len(edits)} edits)")
+            return results
+        raise Exception(f"Kubernetes API error: shared Ingress {ingress_name} kept changing concurrently")
+
+    async def _apply(self, ingress_name: str, current: Optional[client.V1Ingress],
+                     paths: List[client.V1HTTPIngressPath]) -> None:
+        if current is None:
+            ingress = await self.networking_v1.create_namespaced_ingress(
+                namespace=self.namespace, body=self.build_spec(ingress_name, paths),
+                _request_timeout=self.request_timeout
+            )
+            self.informer.record(ingress)
+            return
+        resource_version = current.metadata.resource_version
+        if not paths:
+            await self.networking_v1.delete_namespaced_ingress(
+                name=ingress_name, namespace=self.namespace,
+                body=client.V1DeleteOptions(preconditions=client.V1Preconditions(resource_version=resource_version)),
+                _request_timeout=self.request_timeout
+            )
+            self.informer.forget(ingress_name)
+            return
+        spec = self.networking_v1.api_client.sanitize_for_serialization(self.build_spec(ingress_name, paths))
+        # A resourceVersion in the patch makes the API server reject it with 409 if the object changed
+        spec["metadata"] = {"annotations": spec["metadata"].get("annotations"), "resourceVersion": resource_version}
+        ingress = await self.networking_v1.patch_namespaced_ingress(
+            name=ingress_name, namespace=self.namespace, body=spec,
+            _content_type=MERGE_PATCH_CONTENT_TYPE, _request_timeout=self.request_timeout
+        )
+        self.informer.record(ingress)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "edits": self.edits,
+            "batches": self.batches,
+            "writes": self.writes,
+            "unchanged": self.unchanged,
+            "conflicts": self.conflicts,
+            "pending": sum(len(edits) for edits in self._pending.values())
+        }
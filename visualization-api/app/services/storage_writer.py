@@ -0,0 +1,370 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FSYNC_MODES = ("none", "always", "group")
+
+@dataclass
+class FileWrite:
+    """A file to commit as part of a storage transaction.
+
+    Either ``obj`` (serialized to JSON on the writer executor), ``data``
+    (already serialized bytes) or ``source`` (a fully written file on the same
+    filesystem, moved into place without being read) must be set.
+    """
+    path: str
+    obj: Any = None
+    data: Optional[bytes] = None
+    source: Optional[str] = None
+
+@dataclass
+class CommittedFile:
+    path: str
+    size: int
+
+@dataclass
+class _StagedFile:
+    path: str
+    tmp_path: str
+    size: int
+    moved: bool = False  # tmp_path is a caller-provided source file
+    backup_path: Optional[str] = None  # hard link to the file replaced at path, kept until the commit succeeds
+    placed: bool = False
+
+@dataclass
+class _Transaction:
+    files: List[FileWrite]
+    future: asyncio.Future
+    enqueued_at: float
+
+class StageStats:
+    """Running timing statistics for one pipeline stage (milliseconds)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def record(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.last_ms = ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "last_ms": round(self.last_ms, 3)
+        }
+
+class StorageWriter:
+    """
+    Batched, atomic file writer that keeps blocking disk I/O off the event loop.
+
+    Handlers enqueue a transaction (a list of files) and await its commit.
+    A single consumer task drains whatever transactions are queued into a batch,
+    serializes and writes every file to a temp file on a bounded thread pool,
+    fsyncs them (per file, once per batch, or not at all), then renames the temp
+    files into place so readers never observe a partially written payload. If a
+    rename fails, the transaction's earlier renames are rolled back.
+    """
+
+    STAGES = ("queue", "serialize", "compress", "write", "fsync", "rename")
+
+    def __init__(self, max_workers: int = 4, fsync_mode: str = "group",
+                 batch_max: int = 32, max_pending: int = 256):
+        if fsync_mode not in FSYNC_MODES:
+            raise ValueError(f"Unsupported fsync mode: {fsync_mode} (expected one of {', '.join(FSYNC_MODES)})")
+        self.max_workers = max_workers
+        self.fsync_mode = fsync_mode
+        self.batch_max = batch_max
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="storage-writer")
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._stats_lock = threading.Lock()
+        self.stages = {name: StageStats() for name in self.STAGES}
+        self.batches = 0
+        self.transactions = 0
+        self.failed_transactions = 0
+        self.files_written = 0
+        self.bytes_written = 0
+        self.max_batch_size = 0
+
+    def _ensure_started(self) -> None:
+        if self._consumer is not None and not self._consumer.done():
+            return
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            if self._queue is not None:
+                self._fail_queued(RuntimeError("Storage writer restarted on another event loop"))
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._loop = loop
+        # Transactions still queued when the previous consumer stopped are committed by this one
+        self._consumer = loop.create_task(self._consume())
+
+    def _fail_queued(self, error: BaseException) -> None:
+        """Fail the transactions left in a queue that no consumer will drain."""
+        while not self._queue.empty():
+            txn = self._queue.get_nowait()
+            self._queue.task_done()
+            try:
+                self._fail(txn, error)
+            except RuntimeError:
+                # Their event loop is already closed
+                pass
+
+    def _record(self, stage: str, started: float) -> None:
+        ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            self.stages[stage].record(ms)
+
+    async def commit(self, files: List[FileWrite]) -> List[CommittedFile]:
+        """Enqueue a transaction and wait until all of its files are in place."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Transaction(files=files, future=future, enqueued_at=time.perf_counter()))
+        return await future
+
+    async def run(self, func, *args):
+        """Run a blocking storage call on the writer's bounded executor."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def run_stage(self, stage: str, func, *args):
+        """Like run(), but accounts the call's duration to one of the pipeline stages."""
+        def timed():
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self._record(stage, started)
+        return await self.run(timed)
+
+    async def _consume(self) -> None:
+        while True:
+            txn = await self._queue.get()
+            batch = [txn]
+            while len(batch) < self.batch_max and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._commit_batch(batch)
+            except asyncio.CancelledError:
+                for txn in batch:
+                    self._fail(txn, RuntimeError("Storage writer stopped before the transaction was committed"))
+                raise
+            except Exception as e:
+                # _commit_batch resolves every future itself; this only guards the loop
+                logger.error(f"Storage writer batch failed unexpectedly: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _commit_batch(self, batch: List[_Transaction]) -> None:
+        loop = asyncio.get_running_loop()
+        now = time.perf_counter()
+        with self._stats_lock:
+            self.batches += 1
+            self.max_batch_size = max(self.max_batch_size, len(batch))
+            for txn in batch:
+                self.stages["queue"].record((now - txn.enqueued_at) * 1000)
+
+        # Stage 1: serialize + write temp files, in parallel across the executor
+        staged: List[Optional[List[_StagedFile]]] = []
+        for txn, results in zip(batch, await asyncio.gather(*[
+            asyncio.gather(*[loop.run_in_executor(self._executor, self._stage_file, fw) for fw in txn.files],
+                           return_exceptions=True)
+            for txn in batch
+        ])):
+            errors = [r for r in results if isinstance(r, BaseException)]
+            if errors:
+                self._discard([r for r in results if isinstance(r, _StagedFile)])
+                self._fail(txn, errors[0])
+                staged.append(None)
+            else:
+                staged.append(results)
+
+        # Stage 2: group commit - one fsync pass for every file in the batch
+        if self.fsync_mode == "group":
+            pending = [(i, files) for i, files in enumerate(staged) if files is not None]
+            started = time.perf_counter()
+            results = await asyncio.gather(*[
+                asyncio.gather(*[loop.run_in_executor(self._executor, self._fsync_path, f.tmp_path) for f in files],
+                               return_exceptions=True)
+                for _, files in pending
+            ])
+            if pending:
+                self._record("fsync", started)
+            for (i, files), fsync_results in zip(pending, results):
+                errors = [r for r in fsync_results if isinstance(r, BaseException)]
+                if errors:
+                    self._discard(files)
+                    self._fail(batch[i], errors[0])
+                    staged[i] = None
+
+        # Stage 3: rename into place and persist the directory entries
+        for txn, files in zip(batch, staged):
+            if files is None:
+                continue
+            try:
+                committed = await loop.run_in_executor(self._executor, self._publish, files)
+            except Exception as e:
+                self._discard(files)
+                self._fail(txn, e)
+                continue
+            with self._stats_lock:
+                self.transactions += 1
+                self.files_written += len(committed)
+                self.bytes_written += sum(c.size for c in committed)
+            if not txn.future.done():
+                txn.future.set_result(committed)
+
+    def _fail(self, txn: _Transaction, error: BaseException) -> None:
+        logger.error(f"Storage transaction failed: {error}")
+        with self._stats_lock:
+            self.failed_transactions += 1
+        if not txn.future.done():
+            txn.future.set_exception(error)
+
+    def _stage_file(self, fw: FileWrite) -> _StagedFile:
+        if fw.source is not None:
+            os.makedirs(os.path.dirname(fw.path), exist_ok=True)
+            if self.fsync_mode == "always":
+                started = time.perf_counter()
+                self._fsync_path(fw.source)
+                self._record("fsync", started)
+            return _StagedFile(path=fw.path, tmp_path=fw.source, size=os.path.getsize(fw.source), moved=True)
+
+        started = time.perf_counter()
+        if fw.data is not None:
+            data = fw.data
+        else:
+            data = json.dumps(fw.obj).encode("utf-8")
+        self._record("serialize", started)
+
+        directory = os.path.dirname(fw.path)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, f".{os.path.basename(fw.path)}.{uuid.uuid4().hex}.tmp")
+        started = time.perf_counter()
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            self._record("write", started)
+            if self.fsync_mode == "always":
+                started = time.perf_counter()
+                os.fsync(f.fileno())
+                self._record("fsync", started)
+        return _StagedFile(path=fw.path, tmp_path=tmp_path, size=len(data))
+
+    @staticmethod
+    def _fsync_path(path: str) -> None:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _publish(self, files: List[_StagedFile]) -> List[CommittedFile]:
+        """
+        Rename every file of a transaction into place, or none: a file being replaced
+        is first hard-linked to a backup, so if a later rename fails the files already
+        renamed are put back (or removed, if they are new) before the error is raised.
+        """
+        started = time.perf_counter()
+        try:
+            for f in files:
+                if os.path.exists(f.path):
+                    backup_path = os.path.join(os.path.dirname(f.path),
+                                               f".{os.path.basename(f.path)}.{uuid.uuid4().hex}.bak")
+                    try:
+                        os.link(f.path, backup_path)
+                    except OSError:
+                        # Filesystems without hard links
+                        shutil.copyfile(f.path, backup_path)
+                    f.backup_path = backup_path
+                os.replace(f.tmp_path, f.path)
+                f.placed = True
+        except BaseException:
+            self._roll_back(files)
+            raise
+        for f in files:
+            if f.backup_path is not None:
+                os.remove(f.backup_path)
+        if self.fsync_mode != "none":
+            for directory in {os.path.dirname(f.path) for f in files}:
+                self._fsync_path(directory)
+        self._record("rename", started)
+        return [CommittedFile(path=f.path, size=f.size) for f in files]
+
+    @staticmethod
+    def _roll_back(files: List[_StagedFile]) -> None:
+        """Undo the renames of a partially published transaction, newest first."""
+        for f in reversed(files):
+            try:
+                if f.placed and f.moved:
+                    # Hand the caller's source file back
+                    os.replace(f.path, f.tmp_path)
+                elif f.placed:
+                    os.remove(f.path)
+                if f.backup_path is not None:
+                    os.replace(f.backup_path, f.path)
+            except OSError as e:
+                logger.error(f"Failed to roll back {f.path}: {e}")
+            f.placed, f.backup_path = False, None
+
+    @staticmethod
+    def _discard(files: List[_StagedFile]) -> None:
+        for f in files:
+            if f.moved:
+                # Source files belong to the caller, who decides whether to retry
+                continue
+            try:
+                os.remove(f.tmp_path)
+            except OSError:
+                pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return writer counters and per-stage timings."""
+        with self._stats_lock:
+            return {
+                "fsync_mode": self.fsync_mode,
+                "max_workers": self.max_workers,
+                "pending": self._queue.qsize() if self._queue is not None else 0,
+                "batches": self.batches,
+                "max_batch_size": self.max_batch_size,
+                "transactions": self.transactions,
+                "failed_transactions": self.failed_transactions,
+                "files_written": self.files_written,
+                "bytes_written": self.bytes_written,
+                "stages": {name: stats.snapshot() for name, stats in self.stages.items()}
+            }
+
+    async def close(self) -> None:
+        """Flush queued transactions and stop the consumer task."""
+        if self._consumer is not None and not self._consumer.done():
+            await self._queue.join()
+            self._consumer.cancel()
+        self._executor.shutdown(wait=True)
+
+# Create writer instance
+storage_writer = StorageWriter(
+    max_workers=int(os.environ.get("STORAGE_WRITER_WORKERS", "4")),
+    fsync_mode=os.environ.get("STORAGE_FSYNC_MODE", "group"),
+    batch_max=int(os.environ.get("STORAGE_WRITER_BATCH_MAX", "32")),
+    max_pending=int(os.environ.get("STORAGE_WRITER_MAX_PENDING", "256"))
+)
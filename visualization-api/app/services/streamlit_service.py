@@ -1,17 +1,776 @@
 import os
 import uuid
 import json
+import asyncio
+import hashlib
+import shutil
+import contextlib
+import time
 from datetime import datetime
 import logging
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from .storage_writer import FileWrite, storage_writer
+from .visualization_cache import visualization_cache
+from . import columnar
+from . import aggregates
+from . import figures
+from .access_index import AccessIndex, scan_blob
+from . import catalog
+from .catalog import Catalog
+from . import layout
+from . import downsampling
+from . import data_query
+from .data_query import DataQuery
+from .compression import Codec, accepts_encoding, default_codec, get_codec
+from .object_store import default_object_store
 
 logger = logging.getLogger(__name__)
 
+VISUALIZATION_KINDS = ("streamlit", "scientific", "dashboard")
+
+# Top-level entries of STREAMLIT_DATA_DIR that are not visualizations
+RESERVED_ENTRIES = ("blobs", "uploads")
+
+def stored_content(visualization_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The stored body of a visualization: everything but its id and created_at, which
+    are kept in its own meta.json so that identical posts can share one blob.
+    """
+    return {k: v for k, v in visualization_data.items() if k not in ("id", "created_at")}
+
+@dataclass
+class StoredPayload:
+    """A stored visualization body, either held in memory or to be streamed from disk."""
+    viz_id: str
+    size: Optional[int]  # None for streams of unknown length
+    etag: str
+    body: Optional[bytes] = None
+    path: Optional[str] = None
+    stream: Optional[Iterable[bytes]] = None
+    encoding: Optional[str] = None  # Content-Encoding of body/path/stream; None for identity
+    identity_size: Optional[int] = None
+    redirect_url: Optional[str] = None  # presigned object store URL serving the body directly
+
+@dataclass
+class EncodedPayload:
+    body: Optional[bytes]  # None for columns ingested in binary form (never rendered as JSON)
+    etag: str
+    content_key: str
+    columns: Optional[columnar.ColumnarPayload] = None
+    summary: Optional[Dict[str, Any]] = None  # catalog fields of this visualization
+    aggregates: Optional[bytes] = None  # encoded aggregates.json, stored with the blob
+
+@dataclass
+class StagedPayload:
+    """A payload already written to disk (e.g. by a chunked upload), ready to be moved into a blob."""
+    etag: str
+    size: int
+    content_key: str
+    files: Dict[str, str]  # blob-relative path -> staged file
+    manifest: Optional[Dict[str, Any]] = None  # set for columnar payloads
+    encoding: Optional[str] = None
+    stored_size: Optional[int] = None
+    summary: Optional[Dict[str, Any]] = None
+
 class StreamlitService:
     def __init__(self):
         # Data storage directory (use environment variable or default)
         self.data_dir = os.environ.get("STREAMLIT_DATA_DIR", "/data/api/streamlit_visualizations")
         os.makedirs(self.data_dir, exist_ok=True)
+        # Visualization directories fan out as <ab>/<cd>/<viz_id> by the leading id characters (0 = flat)
+        self.shard_depth = int(os.environ.get("STREAMLIT_SHARD_DEPTH", "2"))
+        if not 0 <= self.shard_depth <= layout.MAX_SHARD_DEPTH:
+            raise ValueError(f"STREAMLIT_SHARD_DEPTH must be between 0 and {layout.MAX_SHARD_DEPTH}")
+        recorded_depth = layout.read_layout(self.data_dir)
+        if recorded_depth is None and not layout.has_directories(self.data_dir, RESERVED_ENTRIES):
+            layout.write_layout(self.data_dir, self.shard_depth)
+            recorded_depth = self.shard_depth
+        # Depths an existing visualization may be found at: the configured one, then, until
+        # migrate-layout has run, the one the store was written with (flat before sharding)
+        self.lookup_depths = [self.shard_depth]
+        if (recorded_depth or 0) != self.shard_depth:
+            self.lookup_depths.append(recorded_depth or 0)
+        self.writer = storage_writer
+        self.cache = visualization_cache
+        # Numeric arrays at least this long are stored as memory-mappable .npy columns (0 disables)
+        self.columnar_min_length = int(os.environ.get("STREAMLIT_COLUMNAR_MIN_LENGTH", "1000"))
+        # Content coding applied to stored JSON bodies (STREAMLIT_COMPRESSION=none|gzip|zstd)
+        self.codec = default_codec()
+        # Maximum number of items accepted by create_visualizations_batch
+        self.batch_max_items = int(os.environ.get("VIZ_BATCH_MAX_ITEMS", "500"))
+        # Last access and size of every visualization, for the retention sweeper
+        self.access_index = AccessIndex(os.path.join(self.data_dir, "access_index.json"))
+        # SQLite catalog of titles, chart types, creation times and metadata, for listing and search
+        self.catalog = Catalog(os.environ.get("CATALOG_PATH", os.path.join(self.data_dir, "catalog.db")))
+        # Shared object store holding every visualization (STORAGE_BACKEND); the data directory
+        # then acts as this replica's cache of it
+        self.object_store = default_object_store()
+        # The figure stored with each blob (other max_points values are only cached in memory);
+        # match the Streamlit app's MAX_POINTS (0 stores the figure requested without max_points)
+        self.figure_max_points = int(os.environ.get("FIGURE_STORED_MAX_POINTS", "5000")) or None
+        # Redirect reads of large stored bodies to presigned object store URLs
+        self.presigned_redirect = os.environ.get("STORAGE_PRESIGNED_REDIRECT", "false").lower() == "true"
+        # Striped locks serializing create/delete of the same content-addressed blob
+        self._blob_locks = [asyncio.Lock() for _ in range(64)]
+
+    def _viz_dir(self, viz_id: str, depth: Optional[int] = None) -> str:
+        """Directory of a visualization in the configured layout (or at shard ``depth``); no disk access."""
+        if not viz_id or viz_id in (".", "..") or os.sep in viz_id or (os.altsep and os.altsep in viz_id):
+            raise FileNotFoundError(f"Invalid visualization id: {viz_id}")
+        depth = self.shard_depth if depth is None else depth
+        return os.path.join(self.data_dir, *layout.shard_parts(viz_id, depth), viz_id)
+
+    def _locate(self, viz_id: str) -> str:
+        """
+        Directory holding an existing visualization (blocking): one stat per lookup
+        depth. The configured path is checked again last, so a directory moved by a
+        concurrent migrate-layout run is still found.
+        """
+        paths = [self._viz_dir(viz_id, depth) for depth in self.lookup_depths]
+        if len(paths) > 1:
+            paths.append(paths[0])
+        for path in paths:
+            if os.path.isdir(path):
+                return path
+        raise FileNotFoundError(f"Streamlit visualization data not found: {viz_id}")
+
+    def _meta_path(self, viz_id: str) -> str:
+        return os.path.join(self._viz_dir(viz_id), "meta.json")
+
+    def _blob_dir(self, content_key: str) -> str:
+        return os.path.join(self.data_dir, "blobs", content_key[:2], content_key)
+
+    def _blob_lock_index(self, content_key: str) -> int:
+        return int(content_key[:8], 16) % len(self._blob_locks)
+
+    def _blob_lock(self, content_key: str) -> asyncio.Lock:
+        return self._blob_locks[self._blob_lock_index(content_key)]
+
+    def _encode_payload(self, visualization_data: Dict[str, Any]) -> EncodedPayload:
+        content = stored_content(visualization_data)
+        body = json.dumps(content).encode("utf-8")
+        canonical = json.dumps(content, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        columns = None
+        if self.columnar_min_length > 0:
+            columns = columnar.extract_columns(content, self.columnar_min_length)
+        return EncodedPayload(
+            body=body,
+            etag=hashlib.sha256(body).hexdigest(),
+            content_key=hashlib.sha256(canonical).hexdigest(),
+            columns=columns,
+            summary=catalog.summarize(visualization_data),
+            aggregates=aggregates.encode(aggregates.compute_document(content))
+        )
+
+    @staticmethod
+    def _encode_columns(visualization_data: Dict[str, Any], columns: Dict[str, Any]) -> EncodedPayload:
+        """
+        Encode a payload whose ``data`` columns arrived as validated arrays. Nothing is
+        rendered as JSON: the ETag and content key hash the template and raw column bytes.
+        """
+        names = list(columns)
+        token = uuid.uuid4().hex
+        content = stored_content(visualization_data)
+        data = dict(content["data"])
+        data.update({name: columnar.placeholder(token, i) for i, name in enumerate(names)})
+        template = columnar.split_template(json.dumps(dict(content, data=data)), token, range(len(names)))
+        canonical = json.dumps(dict(content, data=data), sort_keys=True, separators=(",", ":"))
+        canonical = canonical.replace(token, "")
+
+        etag, content_key = hashlib.sha256(), hashlib.sha256(canonical.encode("utf-8"))
+        for piece in template:
+            etag.update(piece.encode("utf-8"))
+        for name in names:
+            columnar.hash_column(columns[name], name, etag, content_key)
+        return EncodedPayload(
+            body=None,
+            etag=etag.hexdigest(),
+            content_key=content_key.hexdigest(),
+            columns=columnar.ColumnarPayload(template=template, names=names, arrays=[columns[n] for n in names]),
+            summary=catalog.summarize(visualization_data),
+            aggregates=aggregates.encode(aggregates.compute_document(
+                dict(content, data=dict(content["data"], **columns))
+            ))
+        )
+
+    @staticmethod
+    def _blob_files(blob_dir: str, encoded: EncodedPayload, stored_body: Optional[bytes] = None,
+                    codec: Optional[Codec] = None) -> list:
+        """
+        Files making up a new blob: data.json[.gz|.zst], or a manifest plus one .npy per
+        numeric column, and the precomputed aggregates.
+        """
+        files = []
+        if encoded.aggregates is not None:
+            files.append(FileWrite(path=os.path.join(blob_dir, aggregates.AGGREGATES_FILE), data=encoded.aggregates))
+        if encoded.columns is None:
+            name = "data.json" + (codec.extension if codec else "")
+            return files + [FileWrite(path=os.path.join(blob_dir, name), data=stored_body)]
+        files.append(FileWrite(path=os.path.join(blob_dir, "manifest.json"), obj=encoded.columns.manifest()))
+        for i, arr in enumerate(encoded.columns.arrays):
+            files.append(FileWrite(path=os.path.join(blob_dir, columnar.column_file(i)), data=columnar.encode_npy(arr)))
+        return files
+
+    def _load_blob(self, content_key: str) -> Optional[Tuple[Dict[str, Any], list]]:
+        """Return (blob meta, referencing viz ids) for a stored blob, or None if absent."""
+        blob_dir = self._blob_dir(content_key)
+        try:
+            meta = self._read_json(os.path.join(blob_dir, "meta.json"))
+        except FileNotFoundError:
+            return None
+        try:
+            refs = os.listdir(os.path.join(blob_dir, "refs"))
+        except FileNotFoundError:
+            refs = []
+        return meta, refs
+
+    async def _store_visualization(self, viz_id: str, visualization_data: Optional[Dict[str, Any]] = None,
+                                   dedupe: bool = False, encoded: Optional[EncodedPayload] = None) -> str:
+        """
+        Serialize and atomically write a visualization payload off the event loop.
+
+        Payloads are content-addressed: the body is stored under blobs/ and the
+        visualization id holds a reference to it, so identical payloads share one
+        blob. With ``dedupe`` set, an existing visualization with identical content
+        is returned instead of a new id.
+        An already ``encoded`` payload may be passed instead of ``visualization_data``.
+        Returns the visualization id that serves the payload.
+        """
+        if encoded is None:
+            encoded = await self.writer.run_stage("serialize", self._encode_payload, visualization_data)
+        return (await self._store_visualizations([(viz_id, encoded, dedupe)]))[0]
+
+    async def _store_visualizations(self, items: List[Tuple[str, EncodedPayload, bool]]) -> List[str]:
+        """
+        Store several encoded payloads, given as (viz_id, encoded, dedupe), in one
+        storage transaction: either every file of every item is committed or none is.
+        Returns the visualization id serving each item, in order.
+        """
+        # Blob locks are taken in index order so concurrent batches cannot deadlock
+        lock_indices = sorted({self._blob_lock_index(encoded.content_key) for _, encoded, _ in items})
+        async with contextlib.AsyncExitStack() as stack:
+            for index in lock_indices:
+                await stack.enter_async_context(self._blob_locks[index])
+
+            files, results, new_blobs, stored = [], [], [], []
+            # Blobs written earlier in this batch: content key -> (blob meta, viz ids)
+            batch_blobs: Dict[str, Tuple[Dict[str, Any], list]] = {}
+            for viz_id, encoded, dedupe in items:
+                content_key = encoded.content_key
+                existing = batch_blobs.get(content_key)
+                if existing is None:
+                    existing = await self.writer.run(self._load_blob, content_key)
+                if existing is not None and existing[1] and dedupe:
+                    logger.info(f"Deduplicated visualization payload {content_key[:12]} to {existing[1][0]}")
+                    results.append(existing[1][0])
+                    continue
+                blob_dir = self._blob_dir(content_key)
+                if existing is not None:
+                    # Only a reference and the visualization's own meta.json are written
+                    blob_meta = existing[0]
+                    existing[1].append(viz_id)
+                    batch_blobs[content_key] = existing
+                    files += [
+                        FileWrite(path=os.path.join(blob_dir, "refs", viz_id), data=b""),
+                        FileWrite(path=self._meta_path(viz_id), obj=self._viz_meta(blob_meta, content_key,
+                                                                                   encoded.summary))
+                    ]
+                    results.append(viz_id)
+                    stored.append((viz_id, content_key, encoded.summary))
+                    continue
+
+                blob_meta = {
+                    "etag": encoded.etag,
+                    "content_type": "application/json",
+                    "format": "json" if encoded.columns is None else "columnar"
+                }
+                if encoded.body is not None:
+                    blob_meta["size"] = len(encoded.body)
+                if encoded.aggregates is not None:
+                    blob_meta["aggregates"] = aggregates.AGGREGATES_VERSION
+                # Columns stay uncompressed so they can be memory-mapped
+                codec = self.codec if encoded.columns is None else None
+                stored_body = encoded.body
+                if codec is not None:
+                    stored_body = await self.writer.run_stage("compress", codec.compress, encoded.body)
+                    blob_meta.update(encoding=codec.name, stored_size=len(stored_body))
+                blob_files = await self.writer.run_stage("serialize", self._blob_files, blob_dir, encoded,
+                                                         stored_body, codec)
+                blob_files.append(FileWrite(path=os.path.join(blob_dir, "meta.json"), obj=blob_meta))
+                files += blob_files
+                new_blobs.append((viz_id, encoded.etag, stored_body, blob_meta, [f.path for f in blob_files]))
+                batch_blobs[content_key] = (blob_meta, [viz_id])
+                files += [
+                    FileWrite(path=os.path.join(blob_dir, "refs", viz_id), data=b""),
+                    FileWrite(path=self._meta_path(viz_id), obj=self._viz_meta(blob_meta, content_key, encoded.summary))
+                ]
+                results.append(viz_id)
+                stored.append((viz_id, content_key, encoded.summary))
+            committed = await self.writer.commit(files) if files else []
+            await self._publish([path for *_, paths in new_blobs for path in paths],
+                                [(viz_id, content_key) for viz_id, content_key, _ in stored])
+
+        sizes = {f.path: f.size for f in committed}
+        blob_sizes = {}
+        for viz_id, etag, stored_body, blob_meta, paths in new_blobs:
+            blob_sizes[viz_id] = (sum(sizes.get(path, 0) for path in paths), len(paths))
+            if stored_body is not None:
+                # Visualizations are immutable, so the stored body can be served as-is
+                self.cache.put(viz_id, stored_body, etag=etag, encoding=blob_meta.get("encoding"))
+        for viz_id, content_key, _ in stored:
+            await self._index_visualization(viz_id, content_key, *blob_sizes.get(viz_id, (None, None)))
+        await self._catalog_add([(viz_id, summary) for viz_id, _, summary in stored])
+        return results
+
+    @staticmethod
+    def _viz_meta(blob_meta: Dict[str, Any], content_key: str, summary: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """A visualization's meta.json: its blob's meta, the blob key and its own catalog fields."""
+        meta = dict(blob_meta, blob=content_key)
+        if summary is not None:
+            meta["summary"] = summary
+        return meta
+
+    async def _catalog_add(self, entries: List[Tuple[str, Optional[Dict[str, Any]]]]) -> None:
+        """Record stored visualizations in the catalog. Failures are logged, not raised:
+        the payloads are already committed and a catalog rebuild picks them up."""
+        entries = [(viz_id, summary) for viz_id, summary in entries if summary is not None]
+        try:
+            await self.writer.run(self.catalog.add, entries)
+        except Exception as e:
+            logger.error(f"Failed to add {len(entries)} visualizations to the catalog: {str(e)}")
+
+    async def _index_visualization(self, viz_id: str, content_key: str, blob_bytes: Optional[int] = None,
+                                   blob_files: Optional[int] = None) -> None:
+        """Add a stored visualization to the access index, sizing its blob if the index has not seen it."""
+        if blob_bytes is None and not self.access_index.has_blob(content_key):
+            blob_bytes, blob_files = await self.writer.run(scan_blob, self._blob_dir(content_key))
+        self.access_index.record(viz_id, content_key, blob_bytes, blob_files)
+
+    async def store_staged_visualization(self, viz_id: str, staged: StagedPayload, dedupe: bool = False) -> str:
+        """
+        Like _store_visualization, for a payload whose files are already on disk:
+        they are renamed into the blob rather than read into memory. Staged files
+        are left in place if the blob already exists.
+        """
+        content_key = staged.content_key
+        blob_dir = self._blob_dir(content_key)
+
+        async with self._blob_lock(content_key):
+            existing = await self.writer.run(self._load_blob, content_key)
+            if existing is not None and existing[1] and dedupe:
+                logger.info(f"Deduplicated visualization payload {content_key[:12]} to {existing[1][0]}")
+                return existing[1][0]
+            blob_files = []
+            if existing is not None:
+                blob_meta = existing[0]
+            else:
+                blob_meta = {
+                    "etag": staged.etag,
+                    "size": staged.size,
+                    "content_type": "application/json",
+                    "format": "json" if staged.manifest is None else "columnar"
+                }
+                if staged.encoding:
+                    blob_meta.update(encoding=staged.encoding, stored_size=staged.stored_size)
+                if aggregates.AGGREGATES_FILE in staged.files:
+                    blob_meta["aggregates"] = aggregates.AGGREGATES_VERSION
+                blob_files = [FileWrite(path=os.path.join(blob_dir, name), source=path)
+                              for name, path in staged.files.items()]
+                if staged.manifest is not None:
+                    blob_files.append(FileWrite(path=os.path.join(blob_dir, "manifest.json"), obj=staged.manifest))
+                blob_files.append(FileWrite(path=os.path.join(blob_dir, "meta.json"), obj=blob_meta))
+            files = blob_files + [
+                FileWrite(path=os.path.join(blob_dir, "refs", viz_id), data=b""),
+                FileWrite(path=self._meta_path(viz_id), obj=self._viz_meta(blob_meta, content_key, staged.summary))
+            ]
+            committed = await self.writer.commit(files)
+            await self._publish([f.path for f in blob_files], [(viz_id, content_key)])
+        if blob_files:
+            await self._index_visualization(viz_id, content_key, sum(f.size for f in committed[:len(blob_files)]),
+                                            len(blob_files))
+        else:
+            await self._index_visualization(viz_id, content_key)
+        await self._catalog_add([(viz_id, staged.summary)])
+        return viz_id
+
+    async def delete_visualization(self, viz_id: str) -> None:
+        """Delete a visualization, removing its blob once no other visualization references it."""
+        try:
+            viz_dir = await asyncio.to_thread(self._locate, viz_id)
+        except FileNotFoundError:
+            if self.object_store is None:
+                raise
+            # Stored through another replica and never read here
+            viz_dir = None
+        if viz_dir is not None:
+            try:
+                meta = await asyncio.to_thread(self._read_json, os.path.join(viz_dir, "meta.json"))
+            except FileNotFoundError:
+                meta = {}
+        else:
+            meta = await asyncio.to_thread(self._read_store_meta, viz_id)
+        content_key = meta.get("blob")
+        if content_key is None:
+            await self.writer.run(shutil.rmtree, viz_dir)
+        else:
+            async with self._blob_lock(content_key):
+                if viz_dir is not None:
+                    await self.writer.run(self._release_blob, viz_id, content_key, viz_dir)
+                if self.object_store is not None:
+                    await asyncio.to_thread(self._unpublish, viz_id, content_key)
+        self.cache.invalidate_visualization(viz_id)
+        self.access_index.forget(viz_id)
+        try:
+            await self.writer.run(self.catalog.remove, [viz_id])
+        except Exception as e:
+            logger.error(f"Failed to remove visualization {viz_id} from the catalog: {str(e)}")
+        logger.info(f"Streamlit visualization deleted: {viz_id}")
+
+    def _release_blob(self, viz_id: str, content_key: str, viz_dir: str) -> None:
+        blob_dir = self._blob_dir(content_key)
+        try:
+            os.remove(os.path.join(blob_dir, "refs", viz_id))
+        except FileNotFoundError:
+            pass
+        shutil.rmtree(viz_dir, ignore_errors=True)
+        try:
+            remaining = os.listdir(os.path.join(blob_dir, "refs"))
+        except FileNotFoundError:
+            remaining = []
+        if not remaining:
+            shutil.rmtree(blob_dir, ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(blob_dir))
+            except OSError:
+                pass
+            logger.info(f"Released unreferenced payload blob: {content_key[:12]}")
+
+    async def evict_visualization(self, viz_id: str) -> None:
+        """
+        Free the local disk used by a visualization. With an object store only this
+        replica's copy is dropped (it is fetched again on the next read); otherwise,
+        or for visualizations the store does not hold, it is deleted.
+        """
+        if self.object_store is None:
+            return await self.delete_visualization(viz_id)
+        viz_dir = await asyncio.to_thread(self._locate, viz_id)
+        try:
+            meta = await asyncio.to_thread(self._read_json, os.path.join(viz_dir, "meta.json"))
+        except FileNotFoundError:
+            meta = {}
+        content_key = meta.get("blob")
+        if content_key is None:
+            return await self.delete_visualization(viz_id)
+        async with self._blob_lock(content_key):
+            await self.writer.run(self._release_blob, viz_id, content_key, viz_dir)
+        self.cache.invalidate_visualization(viz_id)
+        self.access_index.forget(viz_id)
+        logger.info(f"Evicted local copy of visualization: {viz_id}")
+
+    def _store_key(self, path: str) -> str:
+        """Object store key of a file in the data directory (blobs keep their relative path)."""
+        return os.path.relpath(path, self.data_dir).replace(os.sep, "/")
+
+    @staticmethod
+    def _store_meta_key(viz_id: str) -> str:
+        # Independent of the local shard layout, which may differ between replicas
+        return f"visualizations/{viz_id}/meta.json"
+
+    @staticmethod
+    def _store_access_key(viz_id: str) -> str:
+        return f"access/{viz_id}"
+
+    async def _publish(self, blob_paths: List[str], visualizations: List[Tuple[str, str]]) -> None:
+        """
+        Upload newly committed files to the object store: blob files first, then the
+        ref and meta.json of each (viz_id, content key), so a visualization never
+        appears in the store before its payload. Called with the blob locks held.
+        """
+        if self.object_store is None:
+            return
+        store = self.object_store
+        try:
+            await asyncio.gather(*[asyncio.to_thread(store.put_file, self._store_key(path), path)
+                                   for path in blob_paths])
+            uploads = []
+            for viz_id, content_key in visualizations:
+                ref_path = os.path.join(self._blob_dir(content_key), "refs", viz_id)
+                uploads.append(asyncio.to_thread(store.put_file, self._store_key(ref_path), ref_path))
+                uploads.append(asyncio.to_thread(store.put_file, self._store_meta_key(viz_id), self._meta_path(viz_id)))
+            await asyncio.gather(*uploads)
+        except Exception as e:
+            logger.error(f"Failed to publish visualizations to the object store: {str(e)}")
+            raise RuntimeError(f"Failed to publish visualizations to the object store: {str(e)}")
+
+    def _unpublish(self, viz_id: str, content_key: str) -> None:
+        """Remove a visualization from the object store, and its blob once unreferenced (blocking)."""
+        prefix = self._store_key(self._blob_dir(content_key)) + "/"
+        self.object_store.delete([prefix + "refs/" + viz_id, self._store_meta_key(viz_id),
+                                  self._store_access_key(viz_id)])
+        keys = self.object_store.list(prefix)
+        if not any(key[len(prefix):].startswith("refs/") for key in keys):
+            self.object_store.delete(keys)
+
+    def _list_store_ids(self, prefix: str, suffix: str = "") -> Dict[str, float]:
+        ids = {}
+        for key, stamp in self.object_store.list_modified(prefix).items():
+            name = key[len(prefix):]
+            if not name.endswith(suffix):
+                continue
+            name = name[:len(name) - len(suffix)]
+            if name and "/" not in name:
+                ids[name] = stamp
+        return ids
+
+    def list_store_visualizations(self) -> Dict[str, float]:
+        """viz_id -> time its meta.json was stored, for every visualization in the object store (blocking)."""
+        return self._list_store_ids("visualizations/", "/meta.json")
+
+    def list_store_accesses(self) -> Dict[str, float]:
+        """viz_id -> last access stamped in the object store by any replica (blocking)."""
+        return self._list_store_ids("access/")
+
+    def stamp_store_accesses(self, viz_ids: List[str]) -> None:
+        """Record in the object store that visualizations were read now (blocking): one empty object each."""
+        for viz_id in viz_ids:
+            self.object_store.put_bytes(self._store_access_key(viz_id), b"")
+
+    def delete_store_accesses(self, viz_ids: List[str]) -> None:
+        self.object_store.delete([self._store_access_key(viz_id) for viz_id in viz_ids])
+
+    def refresh_catalog_from_store(self, workers: int = 16) -> Dict[str, Any]:
+        """
+        Bring the catalog in step with the object store (blocking): visualizations
+        stored through other replicas are added from their meta.json in the store,
+        and ones no longer in the store are removed (their ids are returned under
+        "removed"). The catalog is read before the store is listed, so a visualization
+        created meanwhile is never taken for a deleted one. Visualizations stored
+        before payload deduplication only exist locally and are kept.
+        """
+        known = self.catalog.ids()
+        stored = self.list_store_visualizations()
+
+        def entry(viz_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+            try:
+                meta = self._read_store_meta(viz_id)
+            except FileNotFoundError:
+                # Deleted while listing
+                return None
+            except ValueError as e:
+                logger.error(f"Skipping unreadable visualization {viz_id} in the object store: {e}")
+                return None
+            summary = meta.get("summary") or {"created_at": datetime.fromtimestamp(stored[viz_id]).isoformat()}
+            return viz_id, summary
+
+        known_set = set(known)
+        missing = [viz_id for viz_id in stored if viz_id not in known_set]
+        added = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for i in range(0, len(missing), catalog.REBUILD_BATCH):
+                entries = [e for e in pool.map(entry, missing[i:i + catalog.REBUILD_BATCH]) if e is not None]
+                self.catalog.add(entries)
+                added += len(entries)
+        removed = [viz_id for viz_id in known if viz_id not in stored and not self._local_only(viz_id)]
+        self.catalog.remove(removed)
+        if added or removed:
+            logger.info(f"Catalog refreshed from the object store: {added} added, {len(removed)} removed")
+        return {"added": added, "removed": removed}
+
+    def _local_only(self, viz_id: str) -> bool:
+        """Whether a visualization is kept on this replica only (stored before payload deduplication)."""
+        try:
+            return "blob" not in self._load_meta(viz_id)
+        except FileNotFoundError:
+            return False
+
+    def _read_store_meta(self, viz_id: str) -> Dict[str, Any]:
+        self._viz_dir(viz_id)  # validates the id
+        try:
+            return json.loads(self.object_store.get_bytes(self._store_meta_key(viz_id)))
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Streamlit visualization data not found: {viz_id}")
+
+    def _materialize(self, viz_id: str, meta: Dict[str, Any]) -> None:
+        """Copy a visualization held by the object store into the data directory (blocking)."""
+        content_key = meta["blob"]
+        blob_dir = self._blob_dir(content_key)
+        if not os.path.exists(os.path.join(blob_dir, "meta.json")):
+            prefix = self._store_key(blob_dir) + "/"
+            tmp_dir = f"{blob_dir}.{uuid.uuid4().hex}.tmp"
+            try:
+                for key in self.object_store.list(prefix):
+                    rel = key[len(prefix):]
+                    if rel.startswith("refs/"):
+                        continue
+                    path = os.path.join(tmp_dir, *rel.split("/"))
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    self.object_store.get_file(key, path)
+                os.makedirs(os.path.join(tmp_dir, "refs"), exist_ok=True)
+                os.rename(tmp_dir, blob_dir)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        open(os.path.join(blob_dir, "refs", viz_id), "wb").close()
+        meta_path = self._meta_path(viz_id)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        tmp_path = f"{meta_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+        logger.info(f"Fetched visualization from the object store: {viz_id}")
+
+    async def _get_meta(self, viz_id: str, fetch: bool = True) -> Dict[str, Any]:
+        """
+        meta.json of a visualization. One missing locally is fetched from the object
+        store, if there is one; with ``fetch`` unset only its meta.json is read from it.
+        """
+        try:
+            return await asyncio.to_thread(self._load_meta, viz_id)
+        except FileNotFoundError:
+            if self.object_store is None:
+                raise
+        meta = await asyncio.to_thread(self._read_store_meta, viz_id)
+        if not fetch:
+            return meta
+        async with self._blob_lock(meta["blob"]):
+            await asyncio.to_thread(self._materialize, viz_id, meta)
+        await self._index_visualization(viz_id, meta["blob"])
+        await self._catalog_add([(viz_id, meta.get("summary"))])
+        return await asyncio.to_thread(self._load_meta, viz_id)
+
+    async def _presigned_payload(self, viz_id: str, accept_encoding: Optional[str]) -> Optional[StoredPayload]:
+        """
+        A redirect to the object store for stored JSON bodies too large for the
+        response cache, if presigned redirects are enabled and the client accepts
+        the stored coding. Small bodies are still served (and cached) by the API.
+        """
+        if self.object_store is None or not self.presigned_redirect:
+            return None
+        meta = await self._get_meta(viz_id, fetch=False)
+        if "blob" not in meta or meta.get("format") == "columnar":
+            return None
+        encoding = meta.get("encoding")
+        if encoding and not accepts_encoding(accept_encoding, encoding):
+            return None
+        stored_size = meta.get("stored_size", meta["size"])
+        if stored_size <= self.cache.max_item_bytes:
+            return None
+        key = self._store_key(self._payload_path(viz_id, meta))
+        url = await asyncio.to_thread(self.object_store.presigned_url, key)
+        if url is None:
+            return None
+        return StoredPayload(viz_id=viz_id, size=stored_size, etag=meta["etag"], encoding=encoding, redirect_url=url)
+
+    async def presigned_column_url(self, viz_id: str, name: str) -> Optional[str]:
+        """Presigned object store URL of one stored .npy column, if presigned redirects are enabled."""
+        if self.object_store is None or not self.presigned_redirect:
+            return None
+        meta = await self._get_meta(viz_id, fetch=False)
+        if meta.get("format") != "columnar":
+            return None
+        blob_dir = self._blob_dir(meta["blob"])
+        try:
+            manifest = await asyncio.to_thread(self._read_json, os.path.join(blob_dir, "manifest.json"))
+        except FileNotFoundError:
+            manifest = json.loads(await asyncio.to_thread(self.object_store.get_bytes,
+                                                          self._store_key(blob_dir) + "/manifest.json"))
+        for i, column in enumerate(manifest["columns"]):
+            if column["name"] == name:
+                key = self._store_key(os.path.join(blob_dir, columnar.column_file(i)))
+                return await asyncio.to_thread(self.object_store.presigned_url, key)
+        return None
+
+    @staticmethod
+    def _visualization_data(
+        kind: str,
+        viz_id: str,
+        title: str,
+        data: Dict[str, Any],
+        chart_type: Optional[str] = None,
+        layout: Optional[Dict[str, Any]] = None,
+        options: Optional[Dict[str, Any]] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """The stored document of a new streamlit, scientific or dashboard visualization."""
+        if kind not in VISUALIZATION_KINDS:
+            raise ValueError(f"Unsupported visualization type: {kind} (expected one of {', '.join(VISUALIZATION_KINDS)})")
+        visualization_data = {
+            "id": viz_id,
+            "created_at": datetime.now().isoformat(),
+            "title": title,
+            "chart_type": "dashboard" if kind == "dashboard" else chart_type,
+            "data": data
+        }
+        if kind != "dashboard":
+            visualization_data["layout"] = layout or {}
+        visualization_data["options"] = options or {}
+        if kind != "streamlit":
+            visualization_data["metadata"] = metadata or {}
+        return visualization_data
+
+    async def create_visualizations_batch(self, specs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Create many visualizations with a single storage transaction. Each spec holds
+        ``type`` (streamlit, scientific or dashboard) and the fields of the matching
+        create request. Returns one result per spec, in order; if the transaction
+        fails, every item that reached it reports the error.
+        """
+        if len(specs) > self.batch_max_items:
+            raise ValueError(f"Batch of {len(specs)} items exceeds the limit of {self.batch_max_items}")
+        results: List[Optional[Dict[str, Any]]] = [None] * len(specs)
+        pending = []
+        for index, spec in enumerate(specs):
+            viz_id = str(uuid.uuid4())
+            try:
+                visualization_data = self._visualization_data(
+                    spec["type"], viz_id, spec["title"], spec["data"], chart_type=spec.get("chart_type"),
+                    layout=spec.get("layout"), options=spec.get("options"), metadata=spec.get("metadata")
+                )
+            except Exception as e:
+                results[index] = self._batch_error(viz_id, e)
+                continue
+            pending.append((index, viz_id, visualization_data, spec.get("dedupe", False)))
+
+        encoded = await asyncio.gather(*[
+            self.writer.run_stage("serialize", self._encode_payload, visualization_data)
+            for _, _, visualization_data, _ in pending
+        ], return_exceptions=True)
+        items, indices = [], []
+        for (index, viz_id, _, dedupe), payload in zip(pending, encoded):
+            if isinstance(payload, BaseException):
+                results[index] = self._batch_error(viz_id, payload)
+            else:
+                items.append((viz_id, payload, dedupe))
+                indices.append(index)
+
+        try:
+            stored = await self._store_visualizations(items) if items else []
+        except Exception as e:
+            logger.error(f"Error storing visualization batch: {str(e)}")
+            for index, (viz_id, _, _) in zip(indices, items):
+                results[index] = self._batch_error(viz_id, e)
+            return results
+
+        streamlit_url = os.environ.get("STREAMLIT_URL", "https://viz-test-visualization-api")
+        for index, viz_id in zip(indices, stored):
+            results[index] = {
+                "visualization_id": viz_id,
+                "status": "ready",
+                "visualization_url": f"{streamlit_url}/?id={viz_id}",
+                "message": "Visualization created successfully"
+            }
+        logger.info(f"Visualization batch stored: {len(stored)} of {len(specs)} items")
+        return results
+
+    @staticmethod
+    def _batch_error(viz_id: str, error: BaseException) -> Dict[str, Any]:
+        return {
+            "visualization_id": viz_id,
+            "status": "error",
+            "error_message": str(error),
+            "message": "Failed to create visualization"
+        }
 
     async def create_visualization(
         self,
@@ -19,29 +778,71 @@ class StreamlitService:
         chart_type: str,
         data: Dict[str, Any],
         layout: Optional[Dict[str, Any]] = None,
-        options: Optional[Dict[str, Any]] = None
+        options: Optional[Dict[str, Any]] = None,
+        dedupe: bool = False
     ) -> Dict[str, Any]:
         """Create a Streamlit visualization and return access URL."""
         viz_id = str(uuid.uuid4())
+        visualization_data = self._visualization_data("streamlit", viz_id, title, data, chart_type=chart_type,
+                                                      layout=layout, options=options)
+
+        try:
+            viz_id = await self._store_visualization(viz_id, visualization_data, dedupe=dedupe)
+            logger.info(f"Streamlit visualization data stored: {viz_id}")
+
+            # Get Streamlit base URL from environment variable
+            streamlit_url = os.environ.get("STREAMLIT_URL", "https://viz-test-visualization-api")
+            visualization_url = f"{streamlit_url}/?id={viz_id}"
+
+            return {
+                "visualization_id": viz_id,
+                "status": "ready",
+                "visualization_url": visualization_url,
+                "message": "Streamlit visualization created successfully"
+            }
+        except Exception as e:
+            logger.error(f"Error creating Streamlit visualization: {str(e)}")
+            return {
+                "visualization_id": viz_id,
+                "status": "error",
+                "error_message": str(e),
+                "message": "Failed to create Streamlit visualization"
+            }
+
+    async def create_columnar_visualization(
+        self,
+        title: str,
+        chart_type: str,
+        columns: Dict[str, Any],
+        data: Optional[Dict[str, Any]] = None,
+        layout: Optional[Dict[str, Any]] = None,
+        options: Optional[Dict[str, Any]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        dedupe: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Create a visualization from numeric columns already validated as arrays
+        (see column_validation.py). The columns are stored as .npy files directly,
+        without ever being converted to Python lists.
+        """
+        viz_id = str(uuid.uuid4())
         visualization_data = {
             "id": viz_id,
             "created_at": datetime.now().isoformat(),
             "title": title,
             "chart_type": chart_type,
-            "data": data,
+            "data": data or {},
             "layout": layout or {},
             "options": options or {}
         }
-        viz_dir = os.path.join(self.data_dir, viz_id)
-        os.makedirs(viz_dir, exist_ok=True)
+        if metadata is not None:
+            visualization_data["metadata"] = metadata
 
         try:
-            data_path = os.path.join(viz_dir, "data.json")
-            with open(data_path, "w") as f:
-                json.dump(visualization_data, f)
-            logger.info(f"Streamlit visualization data stored: {viz_id}")
+            encoded = await self.writer.run_stage("serialize", self._encode_columns, visualization_data, columns)
+            viz_id = await self._store_visualization(viz_id, encoded=encoded, dedupe=dedupe)
+            logger.info(f"Columnar visualization data stored: {viz_id}")
 
-            # Get Streamlit base URL from environment variable
             streamlit_url = os.environ.get("STREAMLIT_URL", "https://viz-test-visualization-api")
             visualization_url = f"{streamlit_url}/?id={viz_id}"
 
@@ -49,33 +850,580 @@ class StreamlitService:
                 "visualization_id": viz_id,
                 "status": "ready",
                 "visualization_url": visualization_url,
-                "message": "Streamlit visualization created successfully"
+                "message": "Columnar visualization created successfully"
             }
         except Exception as e:
-            logger.error(f"Error creating Streamlit visualization: {str(e)}")
+            logger.error(f"Error creating columnar visualization: {str(e)}")
             return {
                 "visualization_id": viz_id,
                 "status": "error",
                 "error_message": str(e),
-                "message": "Failed to create Streamlit visualization"
+                "message": "Failed to create columnar visualization"
             }
 
-    async def get_visualization_data(self, viz_id: str) -> Dict[str, Any]:
-        """Get Streamlit visualization data."""
-        data_path = os.path.join(self.data_dir, viz_id, "data.json")
-        if not os.path.exists(data_path):
+    async def open_visualization_data(self, viz_id: str, accept_encoding: Optional[str] = None,
+                                      allow_redirect: bool = False) -> StoredPayload:
+        """
+        Locate the stored visualization body and its ETag without parsing it.
+        Cached or small bodies are returned in memory; anything larger than the
+        cache's per-item limit is left on disk to be streamed by the caller, or,
+        with ``allow_redirect`` and presigned redirects enabled, returned as an
+        object store URL. Compressed bodies are passed through when
+        ``accept_encoding`` allows their coding and decompressed otherwise.
+        """
+        self.access_index.touch(viz_id)
+        entry = self.cache.get(viz_id)
+        if entry is not None and entry.etag is not None:
+            payload = StoredPayload(viz_id=viz_id, size=len(entry.body), etag=entry.etag,
+                                    body=entry.body, encoding=entry.encoding)
+            return await self._negotiate(payload, accept_encoding)
+
+        if allow_redirect:
+            try:
+                payload = await self._presigned_payload(viz_id, accept_encoding)
+            except FileNotFoundError:
+                logger.error(f"Streamlit visualization data not found: {viz_id}")
+                raise FileNotFoundError(f"Streamlit visualization data not found: {viz_id}")
+            except Exception as e:
+                # Fall back to serving the body from this replica
+                logger.error(f"Error presigning Streamlit visualization data: {str(e)}")
+                payload = None
+            if payload is not None:
+                return payload
+
+        try:
+            meta = await self._get_meta(viz_id)
+            data_path = self._payload_path(viz_id, meta)
+        except FileNotFoundError:
             logger.error(f"Streamlit visualization data not found: {viz_id}")
             raise FileNotFoundError(f"Streamlit visualization data not found: {viz_id}")
+        except Exception as e:
+            logger.error(f"Error retrieving Streamlit visualization data: {str(e)}")
+            raise RuntimeError(f"Error retrieving Streamlit visualization data: {str(e)}")
+
+        if meta.get("format") == "columnar":
+            return await self._open_columnar(viz_id, meta)
+
+        encoding = meta.get("encoding")
+        stored_size = meta.get("stored_size", meta["size"])
+        if stored_size > self.cache.max_item_bytes:
+            payload = StoredPayload(viz_id=viz_id, size=stored_size, etag=meta["etag"], path=data_path,
+                                    encoding=encoding, identity_size=meta["size"])
+            return await self._negotiate(payload, accept_encoding)
 
         try:
-            with open(data_path, "r") as f:
-                visualization_data = json.load(f)
+            body = await asyncio.to_thread(self._read_file, data_path)
+            self.cache.put(viz_id, body, etag=meta["etag"], encoding=encoding)
             logger.info(f"Retrieved Streamlit visualization data: {viz_id}")
-            return visualization_data
+            payload = StoredPayload(viz_id=viz_id, size=len(body), etag=meta["etag"], body=body, encoding=encoding)
+            return await self._negotiate(payload, accept_encoding)
+        except Exception as e:
+            logger.error(f"Error retrieving Streamlit visualization data: {str(e)}")
+            raise RuntimeError(f"Error retrieving Streamlit visualization data: {str(e)}")
+
+    async def _negotiate(self, payload: StoredPayload, accept_encoding: Optional[str]) -> StoredPayload:
+        """Decode a compressed payload unless the client accepts its content coding."""
+        if payload.encoding is None or accepts_encoding(accept_encoding, payload.encoding):
+            return payload
+        codec = get_codec(payload.encoding)
+        if payload.body is not None:
+            body = await asyncio.to_thread(codec.decompress, payload.body)
+            return StoredPayload(viz_id=payload.viz_id, size=len(body), etag=payload.etag, body=body)
+        return StoredPayload(viz_id=payload.viz_id, size=payload.identity_size, etag=payload.etag,
+                             stream=self._iter_decoded(payload.path, codec))
+
+    @staticmethod
+    def _iter_decoded(path: str, codec: Codec) -> Iterable[bytes]:
+        with open(path, "rb") as f:
+            yield from codec.iter_decompress(f)
+
+    async def _open_columnar(self, viz_id: str, meta: Dict[str, Any]) -> StoredPayload:
+        """Rebuild the JSON body of a columnar blob: in memory if cacheable, else as a stream."""
+        try:
+            manifest, columns = await asyncio.to_thread(self._load_columnar, meta["blob"])
+            stream = columnar.iter_json(manifest, columns)
+            # Columns ingested in binary form have no rendered size yet; bound it instead
+            size = meta.get("size")
+            if (size if size is not None else columnar.max_json_size(manifest)) > self.cache.max_item_bytes:
+                return StoredPayload(viz_id=viz_id, size=size, etag=meta["etag"], stream=stream)
+            body = await asyncio.to_thread(b"".join, stream)
+            self.cache.put(viz_id, body, etag=meta["etag"])
+            logger.info(f"Retrieved columnar Streamlit visualization data: {viz_id}")
+            return StoredPayload(viz_id=viz_id, size=len(body), etag=meta["etag"], body=body)
+        except Exception as e:
+            logger.error(f"Error retrieving Streamlit visualization data: {str(e)}")
+            raise RuntimeError(f"Error retrieving Streamlit visualization data: {str(e)}")
+
+    def _load_columnar(self, content_key: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        blob_dir = self._blob_dir(content_key)
+        manifest = self._read_json(os.path.join(blob_dir, "manifest.json"))
+        return manifest, columnar.load_columns(blob_dir, manifest)
+
+    async def open_columns(self, viz_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Memory-mapped numeric columns of a visualization's ``data``, keyed by name,
+        or None if the payload is stored as plain JSON.
+        """
+        self.access_index.touch(viz_id)
+        try:
+            meta = await self._get_meta(viz_id)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Streamlit visualization data not found: {viz_id}")
+        if meta.get("format") != "columnar":
+            return None
+        _, columns = await asyncio.to_thread(self._load_columnar, meta["blob"])
+        return columns
+
+    def _payload_path(self, viz_id: str, meta: Dict[str, Any]) -> str:
+        """Path of the stored body: the blob, or data.json for pre-dedupe visualizations."""
+        if "blob" in meta:
+            name = "data.json"
+            if meta.get("encoding"):
+                name += get_codec(meta["encoding"]).extension
+            return os.path.join(self._blob_dir(meta["blob"]), name)
+        return meta["data_path"]
+
+    def _load_meta(self, viz_id: str) -> Dict[str, Any]:
+        """
+        Read the visualization's meta.json. Payloads stored before the sidecar
+        existed are hashed once here and the sidecar is backfilled. For those,
+        ``data_path`` is set to the data.json in the visualization's directory.
+        """
+        viz_dir = self._locate(viz_id)
+        meta_path = os.path.join(viz_dir, "meta.json")
+        data_path = os.path.join(viz_dir, "data.json")
+        try:
+            meta = self._read_json(meta_path)
+            return meta if "blob" in meta else dict(meta, data_path=data_path)
+        except FileNotFoundError:
+            pass
+
+        digest = hashlib.sha256()
+        size = 0
+        with open(data_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+                size += len(chunk)
+        meta = {"etag": digest.hexdigest(), "size": size, "content_type": "application/json"}
+        tmp_path = f"{meta_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+        logger.info(f"Backfilled metadata for visualization: {viz_id}")
+        return dict(meta, data_path=data_path)
+
+    def _read_identity_body(self, viz_id: str, meta: Dict[str, Any]) -> bytes:
+        """Read the full uncompressed JSON body (blocking)."""
+        if meta.get("format") == "columnar":
+            manifest, columns = self._load_columnar(meta["blob"])
+            return b"".join(columnar.iter_json(manifest, columns))
+        body = self._read_file(self._payload_path(viz_id, meta))
+        if meta.get("encoding"):
+            body = get_codec(meta["encoding"]).decompress(body)
+        return body
+
+    async def query_visualization_data(self, viz_id: str, query: DataQuery) -> Optional[StoredPayload]:
+        """
+        Get the visualization with its data windowed to ``x_min``/``x_max``, paged by
+        ``offset``/``limit`` and reduced to at most ``max_points`` (LTTB for line/area
+        charts, min/max buckets for bar charts), in that order; with ``summarize``,
+        box/violin samples are replaced by their statistics instead. Variants are cached
+        per query. Returns None if the query leaves the stored payload unchanged.
+        """
+        self.access_index.touch(viz_id)
+        key = (viz_id,) + query.cache_key()
+        entry = self.cache.get(key)
+        if entry is not None:
+            return StoredPayload(viz_id=viz_id, size=len(entry.body), etag=entry.etag, body=entry.body)
+
+        try:
+            meta = await self._get_meta(viz_id)
+        except FileNotFoundError:
+            logger.error(f"Streamlit visualization data not found: {viz_id}")
+            raise FileNotFoundError(f"Streamlit visualization data not found: {viz_id}")
+
+        body = await asyncio.to_thread(self._run_query, viz_id, meta, query)
+        if body is None:
+            return None
+        etag = f"{meta['etag']}-{query.etag_suffix()}"
+        self.cache.put(key, body, etag=etag)
+        return StoredPayload(viz_id=viz_id, size=len(body), etag=etag, body=body)
+
+    def _run_query(self, viz_id: str, meta: Dict[str, Any], query: DataQuery) -> Optional[bytes]:
+        if query.summarize:
+            body = self._summarize_samples(viz_id, meta)
+            if body is not None:
+                return body
+        if meta.get("format") == "columnar":
+            manifest, columns = self._load_columnar(meta["blob"])
+            skeleton = columnar.skeleton(manifest)
+            n = len(columns["y"]) if "y" in columns else 0
+            # Same-length series kept as JSON (e.g. string labels) must be cut too: use the JSON path
+            if "x" in columns and "y" in columns and not any(
+                    isinstance(v, list) and len(v) == n for v in skeleton["data"].values()):
+                chart_type = skeleton.get("chart_type")
+                x_sorted = next((c.get("sorted") for c in manifest["columns"] if c["name"] == "x"), None)
+                if x_sorted is None:
+                    x_sorted = data_query.is_sorted(columns["x"])
+                extra = self._select_series(chart_type, columns, query, x_sorted)
+                if extra is None:
+                    return None
+                return b"".join(columnar.iter_json(manifest, columns, extra=extra))
+
+        visualization_data = json.loads(self._read_identity_body(viz_id, meta))
+        data = visualization_data.get("data")
+        if not isinstance(data, dict):
+            return None
+        if isinstance(data.get("data"), list):
+            extra = self._select_rows(data, query)
+        elif isinstance(data.get("x"), list) and isinstance(data.get("y"), list):
+            extra = self._select_series(visualization_data.get("chart_type"), data, query,
+                                        data_query.is_sorted(data["x"]) if query.has_window else True)
+        else:
+            extra = None
+        if extra is None:
+            return None
+        visualization_data.update(extra)
+        return json.dumps(visualization_data).encode("utf-8")
+
+    def _summarize_samples(self, viz_id: str, meta: Dict[str, Any]) -> Optional[bytes]:
+        """
+        The visualization with the samples of a box/violin chart replaced by the
+        per-group statistics precomputed in its aggregates (``data.distributions``),
+        or None for other charts. The body is O(groups) instead of O(samples).
+        """
+        if meta.get("format") == "columnar":
+            manifest = self._read_json(os.path.join(self._blob_dir(meta["blob"]), "manifest.json"))
+            visualization_data = columnar.skeleton(manifest)
+        else:
+            visualization_data = json.loads(self._read_identity_body(viz_id, meta))
+        data = visualization_data.get("data")
+        if visualization_data.get("chart_type") not in aggregates.DISTRIBUTION_CHART_TYPES or not isinstance(data, dict):
+            return None
+        stats = json.loads(self._read_aggregates(viz_id, meta)).get("distributions")
+        if stats is None:
+            return None
+        data = {k: v for k, v in data.items() if k not in ("data", "x", "y")}
+        visualization_data["data"] = dict(data, distributions=stats)
+        visualization_data["summarized"] = {"samples": sum(group["count"] for group in stats["groups"]),
+                                            "groups": len(stats["groups"])}
+        return json.dumps(visualization_data).encode("utf-8")
+
+    @staticmethod
+    def _select_series(chart_type: Optional[str], data: Dict[str, Any], query: DataQuery,
+                       x_sorted: bool) -> Optional[Dict[str, Any]]:
+        """
+        Apply ``query`` to the ``x``/``y`` series of ``data`` in place (every column of the
+        same length is cut alongside). Returns the response fields describing the result.
+        """
+        x, y = data["x"], data["y"]
+        n = len(y)
+        start, end = 0, n
+        if query.has_window:
+            if not x_sorted:
+                raise ValueError("x_min/x_max require data.x sorted in ascending order")
+            start, end = data_query.window_bounds(x, query.x_min, query.x_max)
+        matched = end - start
+        start, end = data_query.page_bounds(start, end, query.offset, query.limit)
+
+        idx = None
+        if query.max_points is not None:
+            idx = downsampling.select_indices(chart_type, x[start:end], y[start:end], query.max_points)
+        if not query.has_range and idx is None:
+            return None
+
+        for name, values in list(data.items()):
+            if not hasattr(values, "__len__") or isinstance(values, (str, dict)) or len(values) != n:
+                continue
+            values = values[start:end]
+            if idx is not None:
+                values = values[idx] if hasattr(values, "shape") else [values[i] for i in idx.tolist()]
+            data[name] = values
+
+        extra = {}
+        if query.has_range:
+            extra["query"] = data_query.query_info(query, n, matched, end - start)
+        if idx is not None:
+            extra["downsampling"] = StreamlitService._downsampling_info(chart_type, end - start, len(idx))
+        return extra
+
+    @staticmethod
+    def _select_rows(data: Dict[str, Any], query: DataQuery) -> Optional[Dict[str, Any]]:
+        """Apply the window and page of ``query`` to list-of-dict ``data["data"]`` rows (by their ``x``)."""
+        if not query.has_range:
+            return None
+        rows = data["data"]
+        n = len(rows)
+        start, end = 0, n
+        if query.has_window:
+            if not all(isinstance(r, dict) and "x" in r for r in rows) or \
+                    not data_query.is_sorted([r["x"] for r in rows]):
+                raise ValueError("x_min/x_max require rows with an x value, sorted in ascending order")
+            start, end = data_query.window_bounds(rows, query.x_min, query.x_max, key=lambda r: r["x"])
+        matched = end - start
+        start, end = data_query.page_bounds(start, end, query.offset, query.limit)
+        data["data"] = rows[start:end]
+        return {"query": data_query.query_info(query, n, matched, end - start)}
+
+    @staticmethod
+    def _downsampling_info(chart_type: str, original_points: int, points: int) -> Dict[str, Any]:
+        return {
+            "method": downsampling.DOWNSAMPLE_METHODS[chart_type],
+            "original_points": original_points,
+            "points": points
+        }
+
+    async def open_aggregates(self, viz_id: str) -> StoredPayload:
+        """
+        Precomputed aggregates of the visualization's data as a JSON body: count,
+        min/max/mean/std and a histogram per numeric column, and their correlation
+        matrix (see services/aggregates.py). They are computed once at ingest;
+        payloads stored before that are aggregated on first request and cached.
+        """
+        self.access_index.touch(viz_id)
+        key = (viz_id, "aggregates")
+        entry = self.cache.get(key)
+        if entry is not None:
+            return StoredPayload(viz_id=viz_id, size=len(entry.body), etag=entry.etag, body=entry.body)
+        try:
+            meta = await self._get_meta(viz_id)
+        except FileNotFoundError:
+            logger.error(f"Streamlit visualization data not found: {viz_id}")
+            raise FileNotFoundError(f"Streamlit visualization data not found: {viz_id}")
+        body = await asyncio.to_thread(self._read_aggregates, viz_id, meta)
+        etag = f"{meta['etag']}-aggregates{aggregates.AGGREGATES_VERSION}"
+        self.cache.put(key, body, etag=etag)
+        return StoredPayload(viz_id=viz_id, size=len(body), etag=etag, body=body)
+
+    def _read_aggregates(self, viz_id: str, meta: Dict[str, Any]) -> bytes:
+        if meta.get("aggregates") == aggregates.AGGREGATES_VERSION:
+            return self._read_file(os.path.join(self._blob_dir(meta["blob"]), aggregates.AGGREGATES_FILE))
+        if meta.get("format") == "columnar":
+            manifest, columns = self._load_columnar(meta["blob"])
+            document = columnar.skeleton(manifest)
+            document["data"].update(columns)
+        else:
+            document = json.loads(self._read_identity_body(viz_id, meta))
+        return aggregates.encode(aggregates.compute_document(document))
+
+    async def open_figure(self, viz_id: str, max_points: Optional[int] = None) -> StoredPayload:
+        """
+        The visualization as render-ready Plotly figure JSON (see services/figures.py),
+        built once per ``max_points`` from the downsampled/summarized data and its
+        aggregates. Figures are cached in memory; the one for the configured default
+        ``max_points`` is also stored with the payload blob, so a restarted replica
+        reuses it. Other values are never written to disk, so they cannot fill it.
+        """
+        self.access_index.touch(viz_id)
+        key = (viz_id, "figure", max_points)
+        entry = self.cache.get(key)
+        if entry is not None:
+            return StoredPayload(viz_id=viz_id, size=len(entry.body), etag=entry.etag, body=entry.body)
+        try:
+            meta = await self._get_meta(viz_id)
+        except FileNotFoundError:
+            logger.error(f"Streamlit visualization data not found: {viz_id}")
+            raise FileNotFoundError(f"Streamlit visualization data not found: {viz_id}")
+        etag = f"{meta['etag']}-figure{figures.FIGURE_VERSION}" + (f"-p{max_points}" if max_points else "")
+        content_key = meta.get("blob")
+        # Payloads stored before deduplication have no blob: their figures are only cached in memory
+        path = None
+        if content_key is not None and max_points == self.figure_max_points:
+            path = os.path.join(self._blob_dir(content_key), figures.FIGURES_DIR, figures.figure_file(max_points))
+        try:
+            body = await asyncio.to_thread(self._read_file, path) if path is not None else None
+        except FileNotFoundError:
+            body = None
+        if body is None:
+            body = await asyncio.to_thread(self._build_figure, viz_id, meta, max_points)
+            if path is not None:
+                async with self._blob_lock(content_key):
+                    # The blob may have been released, or the figure stored by a concurrent request, meanwhile
+                    if await asyncio.to_thread(self._figure_missing, content_key, path):
+                        committed = await self.writer.commit([FileWrite(path, data=body)])
+                        self.access_index.grow_blob(content_key, committed[0].size)
+        self.cache.put(key, body, etag=etag)
+        return StoredPayload(viz_id=viz_id, size=len(body), etag=etag, body=body)
+
+    def _figure_missing(self, content_key: str, path: str) -> bool:
+        return os.path.exists(os.path.join(self._blob_dir(content_key), "meta.json")) and not os.path.exists(path)
+
+    def _build_figure(self, viz_id: str, meta: Dict[str, Any], max_points: Optional[int]) -> bytes:
+        body = self._run_query(viz_id, meta, DataQuery(max_points=max_points, summarize=True))
+        if body is None:
+            body = self._read_identity_body(viz_id, meta)
+        document = figures.build(json.loads(body), json.loads(self._read_aggregates(viz_id, meta)))
+        return figures.encode(document)
+
+    async def get_visualization_bytes(self, viz_id: str) -> bytes:
+        """Get the serialized Streamlit visualization data as bytes."""
+        payload = await self.open_visualization_data(viz_id)
+        if payload.body is not None:
+            return payload.body
+        try:
+            if payload.stream is not None:
+                return await asyncio.to_thread(b"".join, payload.stream)
+            return await asyncio.to_thread(self._read_file, payload.path)
         except Exception as e:
             logger.error(f"Error retrieving Streamlit visualization data: {str(e)}")
             raise RuntimeError(f"Error retrieving Streamlit visualization data: {str(e)}")
 
+    async def get_visualization_data(self, viz_id: str) -> Dict[str, Any]:
+        """Get Streamlit visualization data parsed into Python objects (for transformations)."""
+        return json.loads(await self.get_visualization_bytes(viz_id))
+
+    async def list_visualizations(
+        self,
+        chart_type: Optional[str] = None,
+        title_prefix: Optional[str] = None,
+        created_after: Optional[str] = None,
+        created_before: Optional[str] = None,
+        metadata: Optional[List[Tuple[str, Optional[str]]]] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """List stored visualizations from the catalog, newest first (see Catalog.search)."""
+        return await asyncio.to_thread(self.catalog.search, chart_type, title_prefix, created_after,
+                                       created_before, metadata, limit, cursor)
+
+    def _visualization_dirs(self) -> List[Tuple[str, str]]:
+        """(viz_id, directory) of every stored visualization, in any layout (blocking)."""
+        return list(layout.iter_visualization_dirs(self.data_dir, RESERVED_ENTRIES))
+
+    def _exists(self, viz_id: str) -> bool:
+        try:
+            self._locate(viz_id)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _read_summary(self, viz_id: str) -> Dict[str, Any]:
+        """
+        Catalog fields of a stored visualization (blocking). They are kept in meta.json;
+        for visualizations stored before the catalog existed they are read from the
+        payload, without the column data for columnar blobs.
+        """
+        meta = self._load_meta(viz_id)
+        if "summary" in meta:
+            return meta["summary"]
+        if meta.get("format") == "columnar":
+            manifest = self._read_json(os.path.join(self._blob_dir(meta["blob"]), "manifest.json"))
+            document = columnar.skeleton(manifest)
+        else:
+            document = json.loads(self._read_identity_body(viz_id, meta))
+        summary = catalog.summarize(document)
+        if document.get("id") != viz_id or not summary["created_at"]:
+            # Blob bodies carry no id/created_at (older ones those of the first visualization stored)
+            stamp = os.path.getmtime(os.path.join(self._locate(viz_id), "meta.json"))
+            summary["created_at"] = datetime.fromtimestamp(stamp).isoformat()
+        return summary
+
+    def iter_catalog_entries(self) -> Iterable[Tuple[str, Dict[str, Any]]]:
+        """(viz_id, catalog fields) of every stored visualization (blocking)."""
+        for viz_id, _ in self._visualization_dirs():
+            try:
+                yield viz_id, self._read_summary(viz_id)
+            except FileNotFoundError:
+                # Deleted while listing
+                continue
+            except ValueError as e:
+                logger.error(f"Skipping unreadable visualization {viz_id}: {e}")
+
+    def rebuild_catalog(self) -> Dict[str, int]:
+        """Resynchronize the catalog with the visualizations on disk (blocking; safe while serving)."""
+        result = self.catalog.rebuild(self.iter_catalog_entries(), self._exists)
+        logger.info(f"Catalog rebuilt: {result['upserted']} visualizations, {result['removed']} stale entries removed")
+        return result
+
+    def migrate_layout(self, max_moves_per_second: float = 0) -> Dict[str, int]:
+        """
+        Move every visualization directory not yet at its STREAMLIT_SHARD_DEPTH path
+        there (blocking; safe while serving). Each move is a single rename on the same
+        filesystem, and lookups check both the old and the new location, so readers
+        never miss a visualization. Once nothing is left in another layout the new
+        depth is recorded and lookups stop checking the old one (after a restart).
+        """
+        moved = skipped = 0
+        for viz_id, path in self._visualization_dirs():
+            target = self._viz_dir(viz_id)
+            if path == target:
+                continue
+            if os.path.exists(target):
+                logger.error(f"Not migrating {path}: {target} already exists")
+                skipped += 1
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                os.rename(path, target)
+            except FileNotFoundError:
+                # Deleted while migrating
+                continue
+            layout.prune_empty_shards(self.data_dir, os.path.dirname(path))
+            moved += 1
+            if moved % 1000 == 0:
+                logger.info(f"Layout migration: {moved} visualizations moved")
+            if max_moves_per_second > 0:
+                time.sleep(1.0 / max_moves_per_second)
+        if not skipped:
+            layout.write_layout(self.data_dir, self.shard_depth)
+        logger.info(f"Layout migration to shard depth {self.shard_depth}: {moved} moved, {skipped} skipped")
+        return {"moved": moved, "skipped": skipped, "shard_depth": self.shard_depth}
+
+    def sync_object_store(self) -> Dict[str, int]:
+        """
+        Upload the visualizations on disk that the object store does not hold yet
+        (blocking; safe while serving). Blobs already in the store are not uploaded
+        again. Visualizations stored before payload deduplication have no blob and
+        are skipped; they stay readable only on this replica.
+        """
+        if self.object_store is None:
+            raise ValueError("No object store configured (set STORAGE_BACKEND)")
+        store = self.object_store
+        uploaded = present = skipped = 0
+        published = set()
+        for viz_id, viz_dir in self._visualization_dirs():
+            try:
+                meta = self._read_json(os.path.join(viz_dir, "meta.json"))
+            except FileNotFoundError:
+                meta = {}
+            content_key = meta.get("blob")
+            if content_key is None:
+                logger.error(f"Not syncing {viz_id}: stored before payload deduplication")
+                skipped += 1
+                continue
+            if store.exists(self._store_meta_key(viz_id)):
+                present += 1
+                continue
+            blob_dir = self._blob_dir(content_key)
+            prefix = self._store_key(blob_dir) + "/"
+            if content_key not in published and not store.exists(prefix + "meta.json"):
+                for root, _, names in os.walk(blob_dir):
+                    # Figures are rebuilt on demand by each replica
+                    if os.path.basename(root) in ("refs", figures.FIGURES_DIR):
+                        continue
+                    for name in names:
+                        path = os.path.join(root, name)
+                        store.put_file(self._store_key(path), path)
+            published.add(content_key)
+            ref_path = os.path.join(blob_dir, "refs", viz_id)
+            store.put_file(self._store_key(ref_path), ref_path)
+            store.put_file(self._store_meta_key(viz_id), os.path.join(viz_dir, "meta.json"))
+            uploaded += 1
+            if uploaded % 1000 == 0:
+                logger.info(f"Object store sync: {uploaded} visualizations uploaded")
+        logger.info(f"Object store sync: {uploaded} uploaded, {present} already present, {skipped} skipped")
+        return {"uploaded": uploaded, "present": present, "skipped": skipped}
+
+    @staticmethod
+    def _read_file(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def _read_json(path: str) -> Any:
+        with open(path, "r") as f:
+            return json.load(f)
+
     async def create_scientific_visualization(
         self,
         title: str,
@@ -83,27 +1431,16 @@ class StreamlitService:
         data: Dict[str, Any],
         layout: Optional[Dict[str, Any]] = None,
         options: Optional[Dict[str, Any]] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        dedupe: bool = False
     ) -> Dict[str, Any]:
         """Create a scientific visualization and return access URL."""
         viz_id = str(uuid.uuid4())
-        visualization_data = {
-            "id": viz_id,
-            "created_at": datetime.now().isoformat(),
-            "title": title,
-            "chart_type": chart_type,
-            "data": data,
-            "layout": layout or {},
-            "options": options or {},
-            "metadata": metadata or {}
-        }
-        viz_dir = os.path.join(self.data_dir, viz_id)
-        os.makedirs(viz_dir, exist_ok=True)
+        visualization_data = self._visualization_data("scientific", viz_id, title, data, chart_type=chart_type,
+                                                      layout=layout, options=options, metadata=metadata)
 
         try:
-            data_path = os.path.join(viz_dir, "data.json")
-            with open(data_path, "w") as f:
-                json.dump(visualization_data, f)
+            viz_id = await self._store_visualization(viz_id, visualization_data, dedupe=dedupe)
             logger.info(f"Scientific visualization data stored: {viz_id}")
 
             streamlit_url = os.environ.get("STREAMLIT_URL", "https://viz-test-visualization-api")
@@ -129,26 +1466,16 @@ class StreamlitService:
         title: str,
         data: Dict[str, Any],
         options: Optional[Dict[str, Any]] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        dedupe: bool = False
     ) -> Dict[str, Any]:
         """Create a dashboard visualization and return access URL."""
         viz_id = str(uuid.uuid4())
-        visualization_data = {
-            "id": viz_id,
-            "created_at": datetime.now().isoformat(),
-            "title": title,
-            "chart_type": "dashboard",
-            "data": data,
-            "options": options or {},
-            "metadata": metadata or {}
-        }
-        viz_dir = os.path.join(self.data_dir, viz_id)
-        os.makedirs(viz_dir, exist_ok=True)
+        visualization_data = self._visualization_data("dashboard", viz_id, title, data,
+                                                      options=options, metadata=metadata)
 
         try:
-            data_path = os.path.join(viz_dir, "data.json")
-            with open(data_path, "w") as f:
-                json.dump(visualization_data, f)
+            viz_id = await self._store_visualization(viz_id, visualization_data, dedupe=dedupe)
             logger.info(f"Dashboard visualization data stored: {viz_id}")
 
             streamlit_url = os.environ.get("STREAMLIT_URL", "https://viz-test-visualization-api")
@@ -0,0 +1,455 @@
+import os
+import csv
+import json
+import uuid
+import math
+import asyncio
+import hashlib
+import shutil
+import logging
+from datetime import datetime
+from itertools import islice
+from typing import Any, AsyncIterable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from . import columnar
+from . import aggregates
+from . import catalog
+from .storage_writer import FileWrite
+from .streamlit_service import StagedPayload, StreamlitService, stored_content, streamlit_service
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_FORMATS = ("ndjson", "csv")
+
+# Received bytes are buffered up to this size before each write to the part file
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+class UploadTooLargeError(ValueError):
+    """The upload would exceed the configured size limit."""
+
+def _json_text(value: Any) -> str:
+    kind = type(value)
+    if kind is int or (kind is float and math.isfinite(value)):
+        return repr(value)
+    return json.dumps(value)
+
+class _ColumnSink:
+    """
+    One column of an upload being transposed from rows. Every value is appended to a
+    file of JSON texts (one per line); while the column is homogeneously int or float
+    the values also go to a raw binary file that becomes a memory-mappable .npy column.
+    Values are processed in batches of ``columnar.JSON_CHUNK_ELEMENTS``.
+    """
+
+    def __init__(self, directory: str, index: int, preceding_rows: int):
+        self.text_path = os.path.join(directory, f"col_{index}.jsonl")
+        self.raw_path = os.path.join(directory, f"col_{index}.bin")
+        self._text = open(self.text_path, "w", encoding="utf-8")
+        self._raw = None
+        self._last = None
+        self.kind: Any = None  # int or float while numeric, False once the column is not
+        self.sorted = True
+        self.pending: List[Any] = [None] * preceding_rows
+        self.flush()
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(np.int64 if self.kind is int else np.float64)
+
+    def append(self, value: Any) -> None:
+        self.pending.append(value)
+        if len(self.pending) >= columnar.JSON_CHUNK_ELEMENTS:
+            self.flush()
+
+    def flush(self) -> None:
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        self._text.write("\n".join(map(_json_text, batch)))
+        self._text.write("\n")
+        if self.kind is False:
+            return
+
+        kinds = set(map(type, batch))
+        if self.kind is None and len(kinds) == 1 and kinds <= {int, float}:
+            self.kind = kinds.pop()
+            self._raw = open(self.raw_path, "wb")
+            kinds = {self.kind}
+        if kinds != {self.kind}:
+            # Mixed int/float columns would re-encode 1 as 1.0, so they stay JSON (as in extract_columns)
+            self._drop_raw()
+            return
+        try:
+            arr = np.asarray(batch, dtype=self.dtype)
+        except OverflowError:
+            self._drop_raw()
+            return
+        if self.sorted:
+            self.sorted = bool(np.all(arr[1:] >= arr[:-1])) and (self._last is None or bool(arr[0] >= self._last))
+        self._last = arr[-1]
+        arr.tofile(self._raw)
+
+    def _drop_raw(self) -> None:
+        self.kind = False
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+            os.remove(self.raw_path)
+
+    def close(self) -> None:
+        self.flush()
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+        self._text.close()
+
+    def iter_texts(self, separator: str) -> Iterator[str]:
+        """The column's JSON array elements joined by ``separator``, in chunks."""
+        with open(self.text_path, "r", encoding="utf-8") as f:
+            first = True
+            while True:
+                batch = [line[:-1] for line in islice(f, columnar.JSON_CHUNK_ELEMENTS)]
+                if not batch:
+                    return
+                if not first:
+                    yield separator
+                first = False
+                yield separator.join(batch)
+
+def _csv_value(text: str) -> Any:
+    if text == "":
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+def _iter_ndjson(path: str) -> Iterator[Dict[str, Any]]:
+    decode = json.JSONDecoder().decode
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                row = decode(line)
+            except ValueError as e:
+                raise ValueError(f"Invalid NDJSON on line {line_no}: {e}")
+            if not isinstance(row, dict):
+                raise ValueError(f"NDJSON line {line_no} is not a JSON object")
+            yield row
+
+def _iter_csv(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        for row in reader:
+            if not row:
+                continue
+            if len(row) != len(header):
+                raise ValueError(f"CSV line {reader.line_num} has {len(row)} fields, expected {len(header)}")
+            yield dict(zip(header, map(_csv_value, row)))
+
+class UploadService:
+    """
+    Chunked upload sessions for datasets too large for a single JSON request.
+
+    A session is opened with the visualization's envelope (title, chart type, ...),
+    NDJSON or CSV chunks are appended straight to a part file in the storage
+    directory, and finalizing transposes the rows into ``data`` columns on disk and
+    stores the result as a regular visualization. Memory use does not grow with the
+    size of the dataset.
+    """
+
+    def __init__(self, service: StreamlitService):
+        self.service = service
+        self.writer = service.writer
+        self.upload_dir = os.path.join(service.data_dir, "uploads")
+        # Total bytes accepted per upload session
+        self.max_bytes = int(os.environ.get("UPLOAD_MAX_BYTES", str(16 * 1024 * 1024 * 1024)))
+        # Striped locks serializing appends and finalize of the same session
+        self._locks = [asyncio.Lock() for _ in range(64)]
+
+    def _session_dir(self, upload_id: str) -> str:
+        try:
+            upload_id = str(uuid.UUID(upload_id))
+        except (TypeError, ValueError):
+            raise FileNotFoundError(f"Upload session not found: {upload_id}")
+        return os.path.join(self.upload_dir, upload_id)
+
+    def _session_path(self, upload_id: str) -> str:
+        return os.path.join(self._session_dir(upload_id), "session.json")
+
+    def _part_path(self, upload_id: str) -> str:
+        return os.path.join(self._session_dir(upload_id), "data.part")
+
+    def _lock(self, upload_id: str) -> asyncio.Lock:
+        key = os.path.basename(self._session_dir(upload_id))
+        return self._locks[int(key[:8], 16) % len(self._locks)]
+
+    def _load_session(self, upload_id: str) -> Dict[str, Any]:
+        try:
+            with open(self._session_path(upload_id), "r") as f:
+                session = json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Upload session not found: {upload_id}")
+        try:
+            session["received_bytes"] = os.path.getsize(self._part_path(upload_id))
+        except FileNotFoundError:
+            session["received_bytes"] = 0
+        return session
+
+    async def create_session(
+        self,
+        title: str,
+        chart_type: str,
+        format: str = "ndjson",
+        layout: Optional[Dict[str, Any]] = None,
+        options: Optional[Dict[str, Any]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        dedupe: bool = False
+    ) -> Dict[str, Any]:
+        """Open an upload session and return its id."""
+        if format not in UPLOAD_FORMATS:
+            raise ValueError(f"Unsupported upload format: {format} (expected one of {', '.join(UPLOAD_FORMATS)})")
+        upload_id = str(uuid.uuid4())
+        session = {
+            "upload_id": upload_id,
+            "created_at": datetime.now().isoformat(),
+            "title": title,
+            "chart_type": chart_type,
+            "format": format,
+            "layout": layout or {},
+            "options": options or {},
+            "metadata": metadata,
+            "dedupe": dedupe
+        }
+        await self.writer.commit([FileWrite(path=self._session_path(upload_id), obj=session)])
+        logger.info(f"Upload session opened: {upload_id} ({format})")
+        return dict(session, status="open", received_bytes=0)
+
+    async def get_session(self, upload_id: str) -> Dict[str, Any]:
+        session = await asyncio.to_thread(self._load_session, upload_id)
+        return dict(session, status="open")
+
+    async def append_chunk(self, upload_id: str, chunks: AsyncIterable[bytes],
+                           offset: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Append a chunk, streamed as received, to the session's part file. With
+        ``offset`` the chunk is only accepted if it starts exactly where the data
+        received so far ends, so a client can safely retry a chunk. A chunk that
+        fails part-way is rolled back entirely.
+        """
+        async with self._lock(upload_id):
+            session = await asyncio.to_thread(self._load_session, upload_id)
+            start = session["received_bytes"]
+            if offset is not None and offset != start:
+                raise ValueError(f"Chunk offset {offset} does not match the {start} bytes received so far")
+
+            f = await self.writer.run(open, self._part_path(upload_id), "ab")
+            size = start
+            try:
+                buffer = bytearray()
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadTooLargeError(f"Upload exceeds {self.max_bytes} bytes")
+                    buffer += chunk
+                    if len(buffer) >= WRITE_BUFFER_BYTES:
+                        await self.writer.run(f.write, bytes(buffer))
+                        buffer.clear()
+                if buffer:
+                    await self.writer.run(f.write, bytes(buffer))
+                await self.writer.run(f.flush)
+            except BaseException:
+                await self.writer.run(f.truncate, start)
+                raise
+            finally:
+                await self.writer.run(f.close)
+
+        logger.info(f"Upload {upload_id}: received {size - start} bytes ({size} total)")
+        return dict(session, status="open", received_bytes=size)
+
+    async def abort(self, upload_id: str) -> None:
+        """Discard an upload session and everything received for it."""
+        async with self._lock(upload_id):
+            session_dir = self._session_dir(upload_id)
+            if not await asyncio.to_thread(os.path.isdir, session_dir):
+                raise FileNotFoundError(f"Upload session not found: {upload_id}")
+            await self.writer.run(shutil.rmtree, session_dir)
+        logger.info(f"Upload session aborted: {upload_id}")
+
+    def _idle_sessions(self, cutoff: float) -> List[str]:
+        """Upload sessions that have not received data since ``cutoff`` (a Unix timestamp)."""
+        try:
+            names = os.listdir(self.upload_dir)
+        except FileNotFoundError:
+            return []
+        idle = []
+        for name in names:
+            session_dir = os.path.join(self.upload_dir, name)
+            try:
+                last_activity = max(os.path.getmtime(os.path.join(session_dir, entry))
+                                    for entry in os.listdir(session_dir) + ["."])
+            except OSError:
+                continue
+            if last_activity < cutoff:
+                idle.append(name)
+        return idle
+
+    async def expire_sessions(self, cutoff: float) -> int:
+        """Abort upload sessions idle since ``cutoff``; returns how many were removed."""
+        expired = 0
+        for upload_id in await asyncio.to_thread(self._idle_sessions, cutoff):
+            try:
+                await self.abort(upload_id)
+                expired += 1
+            except FileNotFoundError:
+                pass
+        return expired
+
+    async def finalize(self, upload_id: str) -> Dict[str, Any]:
+        """Turn the uploaded rows into a stored visualization and close the session."""
+        async with self._lock(upload_id):
+            session = await asyncio.to_thread(self._load_session, upload_id)
+            staging_dir = os.path.join(self._session_dir(upload_id), "staging")
+            viz_id = str(uuid.uuid4())
+            try:
+                staged, rows = await asyncio.to_thread(self._stage, upload_id, session, viz_id, staging_dir)
+                viz_id = await self.service.store_staged_visualization(viz_id, staged, dedupe=session["dedupe"])
+            except BaseException:
+                await self.writer.run(shutil.rmtree, staging_dir, True)
+                raise
+            await self.writer.run(shutil.rmtree, self._session_dir(upload_id), True)
+
+        logger.info(f"Upload {upload_id} finalized as visualization {viz_id} ({rows} rows)")
+        streamlit_url = os.environ.get("STREAMLIT_URL", "https://viz-test-visualization-api")
+        return {
+            "visualization_id": viz_id,
+            "status": "ready",
+            "visualization_url": f"{streamlit_url}/?id={viz_id}",
+            "message": f"Visualization created from upload ({rows} rows)"
+        }
+
+    def _stage(self, upload_id: str, session: Dict[str, Any], viz_id: str,
+               staging_dir: str) -> Tuple[StagedPayload, int]:
+        """Transpose the uploaded rows into columns and write the blob files (blocking)."""
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        os.makedirs(staging_dir)
+        part_path = self._part_path(upload_id)
+        if not os.path.exists(part_path):
+            open(part_path, "wb").close()
+        rows_iter = _iter_ndjson(part_path) if session["format"] == "ndjson" else _iter_csv(part_path)
+
+        sinks: Dict[str, _ColumnSink] = {}
+        rows = 0
+        try:
+            for row in rows_iter:
+                for name, value in row.items():
+                    sink = sinks.get(name)
+                    if sink is None:
+                        sink = sinks[name] = _ColumnSink(staging_dir, len(sinks), rows)
+                    sink.append(value)
+                if len(row) < len(sinks):
+                    for name, sink in sinks.items():
+                        if name not in row:
+                            sink.append(None)
+                rows += 1
+        finally:
+            for sink in sinks.values():
+                sink.close()
+        names = list(sinks)
+        columns = list(sinks.values())
+
+        envelope = {
+            "id": viz_id,
+            "created_at": datetime.now().isoformat(),
+            "title": session["title"],
+            "chart_type": session["chart_type"],
+            "data": {},
+            "layout": session["layout"],
+            "options": session["options"]
+        }
+        if session.get("metadata") is not None:
+            envelope["metadata"] = session["metadata"]
+        token = uuid.uuid4().hex
+        envelope["data"] = {name: columnar.placeholder(token, i) for i, name in enumerate(names)}
+        # Stored and hashed like _encode_payload: no id/created_at, sorted compact JSON for the content key
+        content = stored_content(envelope)
+        template = columnar.split_template(json.dumps(content), token, range(len(names)))
+        order = sorted(range(len(names)), key=lambda i: names[i])
+        canonical = columnar.split_template(json.dumps(content, sort_keys=True, separators=(",", ":")), token, order)
+
+        content_key = hashlib.sha256()
+        for chunk in self._iter_body(canonical, [columns[i] for i in order], ","):
+            content_key.update(chunk)
+
+        digest = hashlib.sha256()
+        size = 0
+
+        def hashed(chunks: Iterable[bytes]) -> Iterator[bytes]:
+            nonlocal size
+            for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                yield chunk
+
+        # Aggregated from the raw numeric columns before they become .npy files (or are dropped)
+        numeric = {name: np.memmap(column.raw_path, dtype=column.dtype, mode="r", shape=(rows,))
+                   if rows and column.kind in (int, float) else None
+                   for name, column in zip(names, columns)}
+        aggregates_path = os.path.join(staging_dir, aggregates.AGGREGATES_FILE)
+        with open(aggregates_path, "wb") as f:
+            f.write(aggregates.encode(aggregates.compute_document(dict(content, data=numeric))))
+        del numeric
+
+        min_length = self.service.columnar_min_length
+        body = hashed(self._iter_body(template, columns, ", "))
+        if names and min_length > 0 and rows >= min_length and all(c.kind in (int, float) for c in columns):
+            for _ in body:
+                pass
+            files, manifest_columns = {aggregates.AGGREGATES_FILE: aggregates_path}, []
+            for i, (name, column) in enumerate(zip(names, columns)):
+                npy_path = os.path.join(staging_dir, f"col_{i}.npy")
+                columnar.write_npy(npy_path, column.dtype, rows, column.raw_path)
+                os.remove(column.raw_path)
+                files[columnar.column_file(i)] = npy_path
+                manifest_columns.append({"name": name, "file": columnar.column_file(i), "dtype": str(column.dtype),
+                                         "length": rows, "sorted": column.sorted})
+            staged = StagedPayload(etag=digest.hexdigest(), size=size, content_key=content_key.hexdigest(),
+                                   files=files, manifest={"template": template, "columns": manifest_columns},
+                                   summary=catalog.summarize(envelope))
+            return staged, rows
+
+        codec = self.service.codec
+        name = "data.json" + (codec.extension if codec else "")
+        body_path = os.path.join(staging_dir, name)
+        with open(body_path, "wb") as f:
+            for chunk in (codec.iter_compress(body) if codec else body):
+                f.write(chunk)
+        staged = StagedPayload(etag=digest.hexdigest(), size=size, content_key=content_key.hexdigest(),
+                               files={name: body_path, aggregates.AGGREGATES_FILE: aggregates_path},
+                               encoding=codec.name if codec else None,
+                               stored_size=os.path.getsize(body_path) if codec else None,
+                               summary=catalog.summarize(envelope))
+        return staged, rows
+
+    @staticmethod
+    def _iter_body(template: List[str], columns: List[_ColumnSink], separator: str) -> Iterator[bytes]:
+        for i, column in enumerate(columns):
+            yield template[i].encode("utf-8")
+            yield b"["
+            for text in column.iter_texts(separator):
+                yield text.encode("utf-8")
+            yield b"]"
+        yield template[-1].encode("utf-8")
+
+# Create service instance
+upload_service = UploadService(streamlit_service)
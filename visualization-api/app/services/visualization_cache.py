@@ -0,0 +1,111 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    etag: Optional[str]
+    expires_at: float
+    encoding: Optional[str] = None
+
+class VisualizationCache:
+    """
+    Byte-budgeted LRU cache with TTL for serialized visualization responses.
+
+    Entries are evicted by total size rather than entry count so the cache
+    stays inside the pod memory limit regardless of payload sizes.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, max_item_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_item_bytes = max_item_bytes if max_item_bytes is not None else max_bytes
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if self.ttl_seconds > 0 and entry.expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, body: bytes, etag: Optional[str] = None, encoding: Optional[str] = None) -> bool:
+        """Store a response body; returns False if it is too large to cache."""
+        size = len(body)
+        if size > self.max_item_bytes or size > self.max_bytes:
+            with self._lock:
+                self.rejected += 1
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CacheEntry(
+                body=body, etag=etag, expires_at=time.monotonic() + self.ttl_seconds, encoding=encoding
+            )
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_visualization(self, viz_id: str) -> None:
+        """Drop a visualization's body and every derived variant keyed as (viz_id, ...)."""
+        with self._lock:
+            for key in [k for k in self._entries if k == viz_id or (isinstance(k, tuple) and k[0] == viz_id)]:
+                self._remove(key)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self.current_bytes -= len(entry.body)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "rejected": self.rejected
+            }
+
+# Create cache instance (64 MiB by default, well inside the 512Mi pod limit)
+_cache_max_bytes = int(os.environ.get("VIZ_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+visualization_cache = VisualizationCache(
+    max_bytes=_cache_max_bytes,
+    ttl_seconds=float(os.environ.get("VIZ_CACHE_TTL_SECONDS", "3600")),
+    max_item_bytes=int(os.environ.get("VIZ_CACHE_MAX_ITEM_BYTES", str(_cache_max_bytes // 8)))
+)
@@ -0,0 +1,79 @@
+"""
+The services are module-level singletons configured from the environment when
+they are imported, so the environment is set up here, before any test module
+imports app.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+_ROOT = tempfile.mkdtemp(prefix="visualization-api-tests-")
+_KUBECONFIG = os.path.join(_ROOT, "kubeconfig")
+
+# Nothing listens there: the informers keep retrying in the background, and tests
+# exercising the Kubernetes client point it at their own fake API server
+with open(_KUBECONFIG, "w") as f:
+    f.write("""
+apiVersion: v1
+kind: Config
+clusters:
+- cluster: {server: "http://127.0.0.1:1"}
+  name: tests
+contexts:
+- context: {cluster: tests, user: tests}
+  name: tests
+current-context: tests
+users:
+- name: tests
+  user: {token: tests}
+""")
+
+os.environ["STREAMLIT_DATA_DIR"] = os.path.join(_ROOT, "data")
+os.environ["KUBECONFIG"] = _KUBECONFIG
+os.environ["INGRESS_DOMAIN"] = "tests.example.org"
+os.environ.pop("STORAGE_BACKEND", None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Test helpers (k8s_api) import as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """A StreamlitService storing into its own data directory."""
+    monkeypatch.setenv("STREAMLIT_DATA_DIR", str(tmp_path / "data"))
+    from app.services.storage_writer import StorageWriter
+    from app.services.streamlit_service import StreamlitService
+    service = StreamlitService()
+    # Its own writer: the shared one's consumer task runs on the client fixture's event loop
+    service.writer = StorageWriter()
+    yield service
+    service.writer._executor.shutdown(wait=True)
+    service.catalog.close()
+
+@pytest.fixture(scope="session")
+def client():
+    """The API, started once: shutting it down closes the shared storage writer."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture(scope="session")
+def fake_api_server():
+    from k8s_api import FakeApiServer
+    server = FakeApiServer()
+    server.start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def fake_api(fake_api_server, tmp_path, monkeypatch):
+    """The fake Kubernetes API server, emptied, with the kube config pointing at it."""
+    from kubernetes_asyncio.config import kube_config
+    fake_api_server.reset()
+    # The client reads KUBECONFIG when it is imported
+    monkeypatch.setattr(kube_config, "KUBE_CONFIG_DEFAULT_LOCATION",
+                        fake_api_server.write_kubeconfig(str(tmp_path / "kubeconfig")))
+    return fake_api_server
@@ -0,0 +1,174 @@
+"""
+In-process fake Kubernetes API server for the Service and Ingress calls of
+K8sResourceManager: resourceVersions, merge patches, server-side apply and
+delete preconditions, watches that carry no events, injected failures, and a
+log of every request. Runs on its own
+thread and event loop, as experiments/perf_exp_h.py does.
+"""
+import json
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+class FakeApiServer:
+    def __init__(self, latency_seconds: float = 0.02):
+        self.latency_seconds = latency_seconds
+        self.objects: Dict[str, Dict[str, Any]] = {"services": {}, "ingresses": {}}
+        # (method, kind, name) of every write
+        self.writes: List[Tuple[str, str, Optional[str]]] = []
+        self.conflicts = 0
+        # (method, kind) -> status code answered to those writes instead of applying them
+        self.failures: Dict[Tuple[str, str], int] = {}
+        # Requests being handled at once, and the most seen since the last reset
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.port: Optional[int] = None
+        self._version = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        with self._lock:
+            for store in self.objects.values():
+                store.clear()
+            self.writes.clear()
+            self.conflicts = 0
+            self.failures.clear()
+            self.peak_in_flight = self.in_flight
+
+    def count(self, method: str, kind: str) -> int:
+        return sum(1 for m, k, _ in self.writes if (m, k) == (method, kind))
+
+    def next_version(self) -> str:
+        self._version += 1
+        return str(self._version)
+
+    def edit(self, kind: str, name: str, change) -> None:
+        """Change a stored object behind the clients' backs, as another replica would."""
+        with self._lock:
+            change(self.objects[kind][name])
+            self.objects[kind][name]["metadata"]["resourceVersion"] = self.next_version()
+
+    @staticmethod
+    def _merge(target: Dict[str, Any], patch: Dict[str, Any]) -> None:
+        for key, value in patch.items():
+            if value is None:
+                target.pop(key, None)
+            elif isinstance(value, dict) and isinstance(target.get(key), dict):
+                FakeApiServer._merge(target[key], value)
+            else:
+                target[key] = value
+
+    @staticmethod
+    def _status(code: int, reason: str) -> web.Response:
+        return web.json_response({"kind": "Status", "code": code, "reason": reason}, status=code)
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return await self._respond(request)
+        finally:
+            self.in_flight -= 1
+
+    async def _respond(self, request: web.Request) -> web.StreamResponse:
+        await asyncio.sleep(self.latency_seconds)
+        kind, name = request.match_info["kind"], request.match_info.get("name")
+        if name is None and request.method == "GET" and request.query.get("watch", "").lower() == "true":
+            response = web.StreamResponse()
+            await response.prepare(request)
+            await asyncio.sleep(min(1.0, float(request.query.get("timeoutSeconds", "1"))))
+            return response
+        body = await request.json() if request.method in ("POST", "PATCH") or request.can_read_body else None
+        with self._lock:
+            if request.method == "PATCH" and request.content_type == "application/apply-patch+yaml":
+                return self._server_side_apply(kind, name, body)
+            return self._apply(request.method, kind, name, body)
+
+    def _apply(self, method: str, kind: str, name: Optional[str], body: Any) -> web.Response:
+        store = self.objects[kind]
+        if method == "GET":
+            if name is None:
+                return web.json_response({"kind": "List", "metadata": {"resourceVersion": self.next_version()},
+                                          "items": list(store.values())})
+            if name not in store:
+                return self._status(404, "NotFound")
+            return web.json_response(store[name])
+        self.writes.append((method, kind, name))
+        if (method, kind) in self.failures:
+            return self._status(self.failures[(method, kind)], "Injected")
+        if method == "POST":
+            name = body["metadata"]["name"]
+            if name in store:
+                return self._status(409, "AlreadyExists")
+            body["metadata"]["resourceVersion"] = self.next_version()
+            store[name] = body
+            return web.json_response(body, status=201)
+        if name not in store:
+            return self._status(404, "NotFound")
+        if method == "PATCH":
+            expected = body.get("metadata", {}).get("resourceVersion")
+        else:
+            expected = ((body or {}).get("preconditions") or {}).get("resourceVersion")
+        if expected is not None and expected != store[name]["metadata"]["resourceVersion"]:
+            self.conflicts += 1
+            return self._status(409, "Conflict")
+        if method == "PATCH":
+            self._merge(store[name], body)
+            store[name]["metadata"]["resourceVersion"] = self.next_version()
+            return web.json_response(store[name])
+        store.pop(name)
+        return web.json_response({"kind": "Status", "status": "Success"})
+
+    def _server_side_apply(self, kind: str, name: str, body: Dict[str, Any]) -> web.Response:
+        # The applied manifest owns every field it sets: they replace the stored ones
+        store = self.objects[kind]
+        self.writes.append(("APPLY", kind, name))
+        if ("APPLY", kind) in self.failures:
+            return self._status(self.failures[("APPLY", kind)], "Injected")
+        created = name not in store
+        obj = store.setdefault(name, {"metadata": {}})
+        for key, value in body.items():
+            if key == "metadata":
+                obj["metadata"].update(value)
+            else:
+                obj[key] = value
+        obj["metadata"]["resourceVersion"] = self.next_version()
+        return web.json_response(obj, status=201 if created else 200)
+
+    def start(self) -> None:
+        app = web.Application()
+        for prefix in ("/api/v1", "/apis/networking.k8s.io/v1"):
+            app.router.add_route("*", prefix + "/namespaces/{ns}/{kind}", self._handle)
+            app.router.add_route("*", prefix + "/namespaces/{ns}/{kind}/{name}", self._handle)
+        started = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            self._runner = web.AppRunner(app)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, "127.0.0.1", 0)
+            self._loop.run_until_complete(site.start())
+            self.port = site._server.sockets[0].getsockname()[1]
+            started.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=serve, daemon=True).start()
+        started.wait()
+
+    def stop(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def write_kubeconfig(self, path: str) -> str:
+        with open(path, "w") as f:
+            json.dump({
+                "apiVersion": "v1", "kind": "Config", "current-context": "fake",
+                "clusters": [{"name": "fake", "cluster": {"server": f"http://127.0.0.1:{self.port}"}}],
+                "contexts": [{"name": "fake", "context": {"cluster": "fake", "user": "fake"}}],
+                "users": [{"name": "fake", "user": {"token": "fake"}}]
+            }, f)
+        return path
@@ -0,0 +1,112 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from app.services import aggregates
+
+def columns_with_gaps(rows=10_000):
+    rng = np.random.default_rng(7)
+    x = rng.normal(1e6, 3.0, rows)
+    y = 2 * x + rng.normal(0.0, 1.0, rows)
+    z = rng.integers(0, 100, rows)
+    y[::7] = np.nan
+    x[::11] = np.inf
+    return x, y, z
+
+def test_chunked_aggregates_match_whole_column_results(monkeypatch):
+    monkeypatch.setattr(aggregates, "CHUNK_ROWS", 333)
+    x, y, z = columns_with_gaps()
+    finite = y[np.isfinite(y)]
+    summary = aggregates.column_summary(y)
+    assert summary["count"] == finite.shape[0]
+    assert (summary["min"], summary["max"]) == (finite.min(), finite.max())
+    assert summary["mean"] == pytest.approx(finite.mean(), rel=1e-12)
+    assert summary["std"] == pytest.approx(finite.std(ddof=1), rel=1e-9)
+    counts, edges = np.histogram(finite, bins=aggregates.HISTOGRAM_BINS)
+    assert summary["histogram"] == {"edges": edges.tolist(), "counts": counts.tolist()}
+
+    corr = aggregates.correlation_matrix([x, y, z])
+    both = np.isfinite(x) & np.isfinite(y)
+    assert corr[0, 1] == pytest.approx(np.corrcoef(x[both], y[both])[0, 1], rel=1e-9)
+    assert corr[1, 2] == pytest.approx(np.corrcoef(y[np.isfinite(y)], z[np.isfinite(y)])[0, 1], abs=1e-9)
+
+def test_constant_and_empty_columns():
+    assert aggregates.column_summary(np.array([5, 5, 5]))["histogram"]["counts"][10] == 3
+    assert aggregates.column_summary(np.array([np.nan, np.inf]))["count"] == 0
+    assert np.isnan(aggregates.correlation_matrix([np.array([1.0]), np.array([2.0])])).all()
+
+def test_memory_mapped_columns_are_not_loaded_whole(tmp_path):
+    rows = 2_000_000
+    columns = {}
+    for name, scale in (("x", 1), ("y", 3)):
+        arr = np.memmap(tmp_path / name, dtype=np.int64, mode="w+", shape=(rows,))
+        arr[:] = np.arange(rows) * scale
+        arr.flush()
+        columns[name] = np.memmap(tmp_path / name, dtype=np.int64, mode="r", shape=(rows,))
+
+    tracemalloc.start()
+    try:
+        document = aggregates.compute_document({"chart_type": "line", "data": columns})
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # One float64 copy of a single column alone would be 16 MB
+    assert peak < 8 * 1024 * 1024
+    assert document["columns"]["y"]["max"] == 3 * (rows - 1)
+    assert document["correlation"]["matrix"][0][1] == pytest.approx(1.0)
+
+def test_distribution_matches_numpy_quartiles_and_fences(monkeypatch):
+    monkeypatch.setattr(aggregates, "MAX_OUTLIERS", 5)
+    rng = np.random.default_rng(3)
+    values = np.sort(np.concatenate([rng.normal(0.0, 1.0, 1001), [-40.0, -30.0] + [25.0 + i for i in range(8)]]))
+    stats = aggregates.distribution("g", values)
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    assert (stats["q1"], stats["median"], stats["q3"]) == pytest.approx((q1, median, q3))
+    inside = values[(values >= q1 - 1.5 * (q3 - q1)) & (values <= q3 + 1.5 * (q3 - q1))]
+    assert (stats["lowerfence"], stats["upperfence"]) == (inside.min(), inside.max())
+    assert stats["outliers_total"] == values.shape[0] - inside.shape[0]
+    # Capped to an evenly spread subset that keeps both extremes
+    assert len(stats["outliers"]) == 5 and stats["outliers"][0] == -40.0 and stats["outliers"][-1] == 32.0
+    density = stats["kde"]["density"]
+    assert len(density) == aggregates.KDE_GRID_POINTS
+    step = stats["kde"]["grid"][1] - stats["kde"]["grid"][0]
+    assert sum(density) * step == pytest.approx(1.0, abs=0.05)
+
+def test_degenerate_distributions():
+    assert aggregates.distribution("empty", np.array([])) == {"name": "empty", "count": 0}
+    constant = aggregates.distribution("c", np.array([2.0, 2.0, 2.0]))
+    assert (constant["q1"], constant["q3"], constant["sd"], constant["kde"]) == (2.0, 2.0, 0.0, None)
+
+def test_samples_are_grouped_like_the_app_plots_them():
+    rows = [{"category": c, "value": v} for c, v in
+            [("b", 3), ("a", 1), ("b", 1), (None, 9), ("a", float("nan")), ("c", 5)]]
+    groups, x_label = aggregates.sample_groups({"data": rows})
+    assert x_label == "category"
+    assert [(name, values.tolist()) for name, values in groups] == [("b", [1.0, 3.0]), ("a", [1.0]), ("c", [5.0])]
+    table = [{"u": 3, "v": 0.5, "label": "p"}, {"u": 1, "v": float("inf"), "label": "q"}, {"u": 2, "label": "r"}]
+    groups, x_label = aggregates.sample_groups({"data": table})
+    assert x_label == "variable"
+    assert [(name, values.tolist()) for name, values in groups] == [("u", [1.0, 2.0, 3.0]), ("v", [0.5])]
+    assert aggregates.sample_groups({"data": [{"category": [1], "value": 1}]}) is None
+
+def test_summarized_box_plots_are_served_per_group(client):
+    rows = [{"category": f"g{i % 3}", "value": i * 0.5} for i in range(3000)]
+    viz_id = client.post("/visualizations/streamlit", json={
+        "title": "box", "chart_type": "boxplot", "data": {"data": rows}
+    }).json()["visualization_id"]
+    url = f"/api/visualization/data/{viz_id}"
+    full = client.get(url)
+    summarized = client.get(url, params={"summarize": "true"})
+    assert len(summarized.content) < len(full.content) / 10
+    assert summarized.headers["ETag"] != full.headers["ETag"]
+    body = summarized.json()
+    assert body["summarized"] == {"samples": 3000, "groups": 3}
+    assert "data" not in body["data"]
+    assert [g["name"] for g in body["data"]["distributions"]["groups"]] == ["g0", "g1", "g2"]
+    # Other chart types are returned as stored
+    line_id = client.post("/visualizations/streamlit", json={
+        "title": "line", "chart_type": "line", "data": {"x": [1, 2], "y": [3, 4]}
+    }).json()["visualization_id"]
+    line = client.get(f"/api/visualization/data/{line_id}", params={"summarize": "true"}).json()
+    assert line["data"] == {"x": [1, 2], "y": [3, 4]} and "summarized" not in line
@@ -0,0 +1,61 @@
+import os
+import glob
+import asyncio
+
+from app.services.streamlit_service import StreamlitService
+
+DATA = {"x": [1, 2, 3], "y": [4, 5, 6]}
+
+def blobs(service):
+    return glob.glob(os.path.join(service.data_dir, "blobs", "*", "*"))
+
+async def create(service, dedupe=False):
+    result = await service.create_visualization("t", "line", DATA, dedupe=dedupe)
+    assert result["status"] == "ready"
+    return result["visualization_id"]
+
+async def read(service, viz_id):
+    service.cache.invalidate_visualization(viz_id)
+    return await service.get_visualization_data(viz_id)
+
+def test_identical_payloads_share_one_blob(service: StreamlitService):
+    async def scenario():
+        a = await create(service)
+        b = await create(service)
+        assert a != b
+        [blob_dir] = blobs(service)
+        assert sorted(os.listdir(os.path.join(blob_dir, "refs"))) == sorted([a, b])
+        # The body holds the content only; each visualization keeps its own created_at
+        assert await read(service, a) == await read(service, b) == {
+            "title": "t", "chart_type": "line", "data": DATA, "layout": {}, "options": {}
+        }
+        meta_a, meta_b = await service._get_meta(a), await service._get_meta(b)
+        assert meta_a["etag"] == meta_b["etag"] and meta_a["blob"] == meta_b["blob"]
+        assert meta_a["summary"]["created_at"] <= meta_b["summary"]["created_at"]
+        index = service.access_index.snapshot()
+        assert (index["visualizations"], index["blobs"]) == (2, 1)
+        used = index["bytes_used"]
+        assert await create(service, dedupe=True) in (a, b)
+
+        await service.delete_visualization(a)
+        assert os.listdir(os.path.join(blob_dir, "refs")) == [b]
+        assert (await read(service, b))["data"] == DATA
+        # The blob is still counted, once
+        assert service.access_index.snapshot()["bytes_used"] == used
+
+        await service.delete_visualization(b)
+        assert blobs(service) == []
+        assert not os.path.exists(service._viz_dir(b))
+        index = service.access_index.snapshot()
+        assert (index["visualizations"], index["blobs"], index["bytes_used"], index["files_used"]) == (0, 0, 0, 0)
+    asyncio.run(scenario())
+
+def test_dedupe_in_a_batch(service: StreamlitService):
+    async def scenario():
+        spec = {"type": "streamlit", "title": "t", "chart_type": "line", "data": DATA}
+        results = await service.create_visualizations_batch([spec, spec, dict(spec, dedupe=True)])
+        ids = [r["visualization_id"] for r in results]
+        assert ids[0] != ids[1] and ids[2] == ids[0]
+        [blob_dir] = blobs(service)
+        assert sorted(os.listdir(os.path.join(blob_dir, "refs"))) == sorted(ids[:2])
+    asyncio.run(scenario())
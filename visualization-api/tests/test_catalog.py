@@ -0,0 +1,89 @@
+import os
+import asyncio
+
+import pytest
+
+from app.services.catalog import Catalog, decode_cursor, encode_cursor
+from app.services.streamlit_service import StreamlitService
+
+def entry(n, chart_type="line", title=None, metadata=None):
+    return (f"viz-{n:03d}", {"title": title or f"run {n}", "chart_type": chart_type,
+                             "created_at": f"2026-01-01T00:{n // 60:02d}:{n % 60:02d}", "metadata": metadata})
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = Catalog(str(tmp_path / "catalog.db"))
+    yield catalog
+    catalog.close()
+
+def ids(items):
+    return [item["id"] for item in items]
+
+def test_filters_combine(catalog: Catalog):
+    catalog.add([
+        entry(1, "line", "alpha", {"site": "a", "run": 1}),
+        entry(2, "bar", "alpha two", {"site": "a"}),
+        entry(3, "line", "beta", {"site": "b", "tags": ["x"]}),
+        entry(4, "line", "alphabet")
+    ])
+    assert ids(catalog.search()[0]) == ["viz-004", "viz-003", "viz-002", "viz-001"]
+    assert ids(catalog.search(chart_type="line", title_prefix="alpha")[0]) == ["viz-004", "viz-001"]
+    assert ids(catalog.search(metadata=[("site", "a")])[0]) == ["viz-002", "viz-001"]
+    assert ids(catalog.search(metadata=[("site", "a"), ("run", "1")])[0]) == ["viz-001"]
+    # Lists and objects only match on key presence
+    assert ids(catalog.search(metadata=[("tags", None)])[0]) == ["viz-003"]
+    assert ids(catalog.search(created_after="2026-01-01T00:00:02", created_before="2026-01-01T00:00:04")[0]) == \
+        ["viz-003", "viz-002"]
+
+def test_cursor_pages_cover_every_row_once(catalog: Catalog):
+    catalog.add([entry(n) for n in range(25)])
+    # Same creation time: the id breaks the tie
+    catalog.add([("viz-tie", dict(entry(10)[1]))])
+    seen, cursor = [], None
+    while True:
+        items, cursor = catalog.search(limit=7, cursor=cursor)
+        seen += ids(items)
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 26
+    assert seen.index("viz-tie") == seen.index("viz-010") - 1
+
+def test_cursor_round_trip_and_rejection():
+    assert decode_cursor(encode_cursor("2026-01-01T00:00:00", "viz")) == ("2026-01-01T00:00:00", "viz")
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor("not-a-cursor")
+
+def test_replacing_an_entry_updates_its_metadata(catalog: Catalog):
+    catalog.add([entry(1, metadata={"site": "a"})])
+    catalog.add([entry(1, metadata={"site": "b"})])
+    assert catalog.search(metadata=[("site", "a")])[0] == []
+    assert catalog.search(metadata=[("site", "b")])[0][0]["metadata"] == {"site": "b"}
+    catalog.remove(["viz-001"])
+    assert catalog.count() == 0 and catalog.search(metadata=[("site", None)])[0] == []
+
+def test_rebuild_resynchronizes_with_the_visualizations_on_disk(service: StreamlitService):
+    async def scenario():
+        return [(await service.create_visualization(f"t{n}", "line", {"x": [n]}))["visualization_id"]
+                for n in range(3)]
+    viz_ids = asyncio.run(scenario())
+    service.catalog.remove(viz_ids[:1])
+    service.catalog.add([entry(1)])
+    assert service.rebuild_catalog() == {"upserted": 3, "removed": 1}
+    assert sorted(service.catalog.ids()) == sorted(viz_ids)
+    # A lost catalog is rebuilt from meta.json
+    service.catalog.close()
+    os.remove(service.catalog.path)
+    service.catalog = Catalog(service.catalog.path)
+    service.rebuild_catalog()
+    items, _ = service.catalog.search(title_prefix="t1")
+    assert ids(items) == [viz_ids[1]] and items[0]["chart_type"] == "line"
+
+def test_list_endpoint(client):
+    created = [client.post("/visualizations/streamlit", json={
+        "title": f"catalog-endpoint {n}", "chart_type": "scatter", "data": {"x": [n]}
+    }).json()["visualization_id"] for n in range(3)]
+    page = client.get("/visualizations", params={"title_prefix": "catalog-endpoint", "limit": 2}).json()
+    assert ids(page["items"]) == created[:0:-1]
+    rest = client.get("/visualizations", params={"title_prefix": "catalog-endpoint", "cursor": page["next_cursor"]})
+    assert ids(rest.json()["items"]) == created[:1] and rest.json()["next_cursor"] is None
+    assert client.get("/visualizations", params={"cursor": "bogus"}).status_code == 400
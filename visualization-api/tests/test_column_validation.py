@@ -0,0 +1,87 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+from app.services.column_validation import decode_column, validate_columns
+
+def npy(arr):
+    f = io.BytesIO()
+    np.save(f, arr)
+    return f.getvalue()
+
+def test_npy_columns_are_decoded_as_views():
+    arr = np.arange(100, dtype=np.float32)
+    raw = npy(arr)
+    decoded = decode_column("x", raw)
+    assert decoded.dtype == np.float32 and np.array_equal(decoded, arr)
+    assert not decoded.flags.owndata
+
+def test_raw_columns_need_a_supported_dtype():
+    raw = np.arange(10, dtype="<i4").tobytes()
+    assert np.array_equal(decode_column("x", raw, "int32"), np.arange(10))
+    with pytest.raises(ValueError, match="need a dtype"):
+        decode_column("x", raw)
+    with pytest.raises(ValueError, match="unsupported dtype"):
+        decode_column("x", raw, "complex64")
+    with pytest.raises(ValueError, match="not a whole number of int64 values"):
+        decode_column("x", raw[:-4] + b"\0", "int64")
+
+@pytest.mark.parametrize("raw, message", [
+    (npy(np.arange(10))[:-8], "does not match its header shape"),
+    (npy(np.array(["a", None], dtype=object)), "object arrays are not accepted"),
+    (b"\x93NUMPY\x09\x00garbage", "invalid .npy header"),
+])
+def test_malformed_npy_columns_are_rejected(raw, message):
+    with pytest.raises(ValueError, match=message):
+        decode_column("x", raw)
+
+def test_columns_are_normalized_to_int64_and_float64():
+    validated = validate_columns({
+        "a": np.arange(5, dtype=np.uint16),
+        "b": np.linspace(0, 1, 5, dtype=np.float16),
+        "c": np.arange(5, dtype=">i8")
+    })
+    assert [arr.dtype for arr in validated.values()] == [np.int64, np.float64, np.int64]
+    assert validated["c"].tolist() == list(range(5))
+
+@pytest.mark.parametrize("columns, message", [
+    ({"x": np.zeros((2, 2))}, "expected a 1-D array"),
+    ({"x": np.array([True, False])}, "is not an integer or float type"),
+    ({"x": np.array([1.0, np.nan])}, "NaN and infinite values"),
+    ({"x": np.array([1.0, -np.inf])}, "NaN and infinite values"),
+    ({"x": np.array([2 ** 63], dtype=np.uint64)}, "exceed the int64 range"),
+    ({"x": np.arange(3), "y": np.arange(4)}, r"same length \(x=3, y=4\)"),
+])
+def test_invalid_columns_are_rejected(columns, message):
+    with pytest.raises(ValueError, match=message):
+        validate_columns(columns)
+
+def post_columns(client, parts, **envelope):
+    envelope = dict({"title": "t", "chart_type": "line"}, **envelope)
+    files = [("columns", (name, raw, "application/octet-stream")) for name, raw in parts]
+    return client.post("/visualizations/streamlit/columnar", data={"envelope": json.dumps(envelope)}, files=files)
+
+def test_columnar_endpoint_accepts_npy_and_raw_parts(client):
+    response = post_columns(client, [("x.npy", npy(np.arange(2000))),
+                                     ("y.bin", np.arange(2000, dtype="<f8").tobytes())],
+                            dtypes={"y": "float64"})
+    assert response.status_code == 200
+    stored = client.get(f"/api/visualization/data/{response.json()['visualization_id']}").json()
+    assert stored["data"]["y"][:3] == [0.0, 1.0, 2.0]
+
+@pytest.mark.parametrize("parts, message", [
+    ([("x.npy", npy(np.arange(3))), ("x.bin", npy(np.arange(3)))], "distinct filenames"),
+    ([("x.npy", npy(np.arange(3))), ("y.npy", npy(np.arange(4)))], "same length"),
+    ([("x.npy", npy(np.array([np.nan])))], "NaN"),
+])
+def test_columnar_endpoint_rejects_invalid_columns(client, parts, message):
+    response = post_columns(client, parts)
+    assert response.status_code == 400
+    assert message in response.json()["detail"]
+
+def test_columnar_endpoint_validates_the_envelope(client):
+    response = client.post("/visualizations/streamlit/columnar", data={"envelope": json.dumps({"title": "t"})},
+                           files=[("columns", ("x.npy", npy(np.arange(3)), "application/octet-stream"))])
+    assert response.status_code == 422
@@ -0,0 +1,84 @@
+import os
+import json
+import asyncio
+import hashlib
+
+import numpy as np
+
+from app.services import columnar
+from app.services.streamlit_service import StreamlitService
+from app.services.visualization_cache import VisualizationCache
+
+def payload(points=3000):
+    return {
+        "title": "t",
+        "chart_type": "line",
+        "data": {
+            "x": list(range(points)),
+            "y": [i * 0.25 - 7.5 for i in range(points)],
+            "mixed": [1, 2.5] * (points // 2),
+            "labels": [f"p{i}" for i in range(points)],
+            "unit": "s"
+        },
+        "layout": {"title": "T é"},
+        "options": {}
+    }
+
+def rebuild(extracted):
+    manifest = extracted.manifest()
+    return b"".join(columnar.iter_json(manifest, dict(zip(extracted.names, extracted.arrays))))
+
+def test_template_and_columns_reproduce_the_body():
+    document = payload()
+    extracted = columnar.extract_columns(document, 1000)
+    # Mixed int/float lists would re-encode 1 as 1.0, so they stay in the template
+    assert extracted.names == ["x", "y"]
+    assert [arr.dtype for arr in extracted.arrays] == [np.int64, np.float64]
+    assert rebuild(extracted) == json.dumps(document).encode("utf-8")
+    assert [c["sorted"] for c in extracted.manifest()["columns"]] == [True, True]
+
+def test_short_or_non_numeric_arrays_stay_json():
+    assert columnar.extract_columns(payload(points=10), 1000) is None
+    assert columnar.extract_columns({"data": {"x": [True] * 2000}}, 1000) is None
+
+def test_large_series_are_stored_as_memory_mapped_columns(service: StreamlitService):
+    document = payload()
+    body = json.dumps(document).encode("utf-8")
+
+    async def scenario():
+        result = await service.create_visualization("t", "line", document["data"], layout=document["layout"])
+        viz_id = result["visualization_id"]
+        meta = await service._get_meta(viz_id)
+        assert meta["format"] == "columnar"
+        blob_dir = service._blob_dir(meta["blob"])
+        assert sorted(os.listdir(os.path.join(blob_dir, "columns"))) == ["col_0.npy", "col_1.npy"]
+        assert not os.path.exists(os.path.join(blob_dir, "data.json"))
+
+        columns = await service.open_columns(viz_id)
+        assert isinstance(columns["x"], np.memmap)
+        assert columns["y"][10] == document["data"]["y"][10]
+
+        service.cache.invalidate_visualization(viz_id)
+        stored = await service.open_visualization_data(viz_id)
+        assert stored.body == body
+        assert stored.etag == meta["etag"] == hashlib.sha256(body).hexdigest()
+
+        # Too large for the response cache: streamed in chunks instead
+        service.cache = VisualizationCache(max_bytes=1024 * 1024, ttl_seconds=0, max_item_bytes=1024)
+        streamed = await service.open_visualization_data(viz_id)
+        assert streamed.body is None
+        assert b"".join(streamed.stream) == body
+    asyncio.run(scenario())
+
+def test_binary_columns_and_json_posts_share_the_read_format(service: StreamlitService):
+    document = payload()
+    columns = {"x": np.arange(3000, dtype=np.int64), "y": np.array(document["data"]["y"])}
+    data = {k: v for k, v in document["data"].items() if k not in columns}
+
+    async def scenario():
+        result = await service.create_columnar_visualization("t", "line", columns, data=data, layout=document["layout"])
+        viz_id = result["visualization_id"]
+        assert (await service._get_meta(viz_id))["format"] == "columnar"
+        stored = json.loads((await service.open_visualization_data(viz_id)).body)
+        assert stored == dict(document, data=dict(data, **{k: v.tolist() for k, v in columns.items()}))
+    asyncio.run(scenario())
@@ -0,0 +1,75 @@
+import io
+import json
+import asyncio
+
+import pytest
+
+from app.services.compression import accepts_encoding, get_codec
+from app.services.streamlit_service import StreamlitService
+
+BODY = json.dumps({"x": list(range(5000))}).encode("utf-8")
+
+@pytest.mark.parametrize("name", ["gzip", "zstd"])
+def test_codec_round_trips(name):
+    codec = get_codec(name)
+    compressed = codec.compress(BODY)
+    assert len(compressed) < len(BODY)
+    assert codec.decompress(compressed) == BODY
+    streamed = b"".join(codec.iter_compress(BODY[i:i + 1000] for i in range(0, len(BODY), 1000)))
+    assert codec.decompress(streamed) == BODY
+    assert b"".join(codec.iter_decompress(io.BytesIO(compressed))) == BODY
+
+def test_gzip_output_is_deterministic():
+    codec = get_codec("gzip")
+    assert codec.compress(BODY) == codec.compress(BODY)
+
+def test_get_codec():
+    assert get_codec(None) is None and get_codec("none") is None
+    assert get_codec("zstd", 7).level == 7
+    with pytest.raises(ValueError):
+        get_codec("brotli")
+
+@pytest.mark.parametrize("header, name, accepted", [
+    (None, "gzip", False),
+    ("gzip, deflate", "gzip", True),
+    ("deflate", "gzip", False),
+    ("GZIP;q=0.5", "gzip", True),
+    ("gzip;q=0", "gzip", False),
+    ("*", "zstd", True),
+    ("*;q=0, gzip", "zstd", False),
+    ("zstd;q=0, *", "zstd", False),
+    ("br, zstd;q=0.1", "zstd", True),
+])
+def test_accepts_encoding(header, name, accepted):
+    assert accepts_encoding(header, name) == accepted
+
+@pytest.mark.parametrize("name", ["gzip", "zstd"])
+def test_stored_bodies_pass_through_or_are_decoded(service: StreamlitService, name):
+    service.codec = get_codec(name)
+
+    async def scenario():
+        result = await service.create_visualization("t", "line", {"x": [1, 2, 3], "y": [4, 5, 6]})
+        viz_id = result["visualization_id"]
+        meta = await service._get_meta(viz_id)
+        assert meta["encoding"] == name and service._payload_path(viz_id, meta).endswith(service.codec.extension)
+
+        passed = await service.open_visualization_data(viz_id, accept_encoding=f"{name}, identity")
+        assert passed.encoding == name
+        identity = await service.open_visualization_data(viz_id, accept_encoding="identity")
+        assert identity.encoding is None
+        assert service.codec.decompress(passed.body) == identity.body
+        assert passed.etag == identity.etag == meta["etag"]
+        assert json.loads(identity.body)["data"] == {"x": [1, 2, 3], "y": [4, 5, 6]}
+    asyncio.run(scenario())
+
+def test_negotiation_over_http(client):
+    response = client.post("/visualizations/streamlit", json={
+        "title": "t", "chart_type": "line", "data": {"x": list(range(300)), "y": list(range(300))}
+    })
+    url = f"/api/visualization/data/{response.json()['visualization_id']}"
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["Vary"] == "Accept-Encoding"
+    identity = client.get(url, headers={"Accept-Encoding": "zstd;q=0, identity"})
+    assert "Content-Encoding" not in identity.headers
+    assert identity.json() == compressed.json()
@@ -0,0 +1,103 @@
+import json
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services import data_query
+from app.services.data_query import DataQuery
+from app.services.streamlit_service import StreamlitService
+
+def test_window_bounds():
+    x = [0.0, 1.0, 1.0, 2.0, 3.5, 5.0]
+    assert data_query.window_bounds(x, 1.0, 3.5) == (1, 5)
+    assert data_query.window_bounds(np.array(x), 1.0, 3.5) == (1, 5)
+    assert data_query.window_bounds(x, None, 0.5) == (0, 1)
+    assert data_query.window_bounds(x, 4.0, None) == (5, 6)
+    assert data_query.window_bounds(x, 6.0, 7.0) == (6, 6)
+    # An inverted window is empty, not negative
+    assert data_query.window_bounds(x, 3.0, 1.0) == (4, 4)
+    rows = [{"x": v} for v in x]
+    assert data_query.window_bounds(rows, 1.0, 3.5, key=lambda r: r["x"]) == (1, 5)
+    with pytest.raises(ValueError):
+        data_query.window_bounds(["a", "b"], 1.0, None)
+
+def test_page_bounds():
+    assert data_query.page_bounds(10, 50, 0, None) == (10, 50)
+    assert data_query.page_bounds(10, 50, 5, 10) == (15, 25)
+    assert data_query.page_bounds(10, 50, 35, 10) == (45, 50)
+    assert data_query.page_bounds(10, 50, 100, 10) == (50, 50)
+
+def test_is_sorted():
+    assert data_query.is_sorted([1, 2, 2, 3])
+    assert data_query.is_sorted([])
+    assert not data_query.is_sorted([1, 3, 2])
+    assert not data_query.is_sorted(["a", "b"])
+
+def test_query_identity_and_etag():
+    assert DataQuery().is_identity
+    assert not DataQuery(summarize=True).is_identity
+    assert DataQuery(x_min=1, x_max=2, offset=5, limit=10, max_points=100).etag_suffix() == "x1:2-o5l10-p100"
+    assert DataQuery(offset=1).cache_key() != DataQuery(limit=1).cache_key()
+
+async def create(service, n, chart_type="line"):
+    x = list(range(n))
+    y = [float(i % 17) for i in x]
+    result = await service.create_visualization("t", chart_type, {"x": x, "y": y, "label": [f"p{i}" for i in x]})
+    return result["visualization_id"], x, y
+
+async def query(service, viz_id, **kwargs):
+    payload = await service.query_visualization_data(viz_id, DataQuery(**kwargs))
+    return None if payload is None else json.loads(payload.body)
+
+@pytest.mark.parametrize("n", [200, 3000])  # JSON and columnar (STREAMLIT_COLUMNAR_MIN_LENGTH) storage
+def test_window_and_page_series(service: StreamlitService, n):
+    async def scenario():
+        viz_id, x, y = await create(service, n)
+        assert (await service._get_meta(viz_id))["format"] == ("columnar" if n >= service.columnar_min_length else "json")
+        assert await query(service, viz_id) is None
+
+        doc = await query(service, viz_id, x_min=50, x_max=149.5)
+        assert doc["data"]["x"] == x[50:150]
+        assert doc["data"]["y"] == y[50:150]
+        # Columns of the same length are cut alongside
+        assert doc["data"]["label"] == [f"p{i}" for i in range(50, 150)]
+        assert doc["query"] == {"total": n, "matched": 100, "offset": 0, "limit": None, "returned": 100,
+                                "x_min": 50, "x_max": 149.5}
+
+        doc = await query(service, viz_id, x_min=50, x_max=149.5, offset=90, limit=20)
+        assert doc["data"]["x"] == x[140:150]
+        assert (doc["query"]["matched"], doc["query"]["returned"]) == (100, 10)
+
+        # Pages of the whole series put back together give the series
+        pages = []
+        for offset in range(0, n, 64):
+            pages += (await query(service, viz_id, offset=offset, limit=64))["data"]["x"]
+        assert pages == x
+
+        doc = await query(service, viz_id, x_min=10, max_points=50)
+        assert len(doc["data"]["x"]) == 50
+        assert doc["data"]["x"][0] == 10 and doc["data"]["x"][-1] == n - 1
+        assert doc["downsampling"] == {"method": "lttb", "original_points": n - 10, "points": 50}
+    asyncio.run(scenario())
+
+def test_window_requires_sorted_x(service: StreamlitService):
+    async def scenario():
+        result = await service.create_visualization("t", "line", {"x": [3, 1, 2], "y": [1, 2, 3]})
+        with pytest.raises(ValueError):
+            await query(service, result["visualization_id"], x_min=1)
+        # Paging does not need sorted x
+        assert (await query(service, result["visualization_id"], offset=1))["data"]["x"] == [1, 2]
+    asyncio.run(scenario())
+
+def test_window_and_page_rows(service: StreamlitService):
+    async def scenario():
+        rows = [{"x": i * 0.5, "value": i} for i in range(100)]
+        result = await service.create_visualization("t", "scatter", {"data": rows})
+        viz_id = result["visualization_id"]
+        doc = await query(service, viz_id, x_min=10, x_max=20, offset=2, limit=5)
+        assert doc["data"]["data"] == rows[22:27]
+        assert (doc["query"]["total"], doc["query"]["matched"], doc["query"]["returned"]) == (100, 21, 5)
+        # Rows are not downsampled
+        assert await query(service, viz_id, max_points=10) is None
+    asyncio.run(scenario())
@@ -0,0 +1,81 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.services.downsampling import lttb, minmax, select_indices
+
+def reference_lttb(x, y, n_out):
+    """Sveinn Steinarsson's LTTB, point by point."""
+    n = len(y)
+    every = (n - 2) / (n_out - 2)
+    selected = [0]
+    a = 0
+    for i in range(n_out - 2):
+        avg_start = math.floor((i + 1) * every) + 1
+        avg_end = min(math.floor((i + 2) * every) + 1, n)
+        avg_x = sum(x[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(y[avg_start:avg_end]) / (avg_end - avg_start)
+        best, best_area = None, -1.0
+        for j in range(math.floor(i * every) + 1, math.floor((i + 1) * every) + 1):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a])) * 0.5
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+def reference_minmax(y, n_out):
+    """The first minimum and maximum of each of n_out // 2 equal-width buckets."""
+    n, n_buckets = len(y), n_out // 2
+    picked = set()
+    for b in range(n_buckets):
+        members = [i for i in range(n) if i * n_buckets // n == b]
+        picked.add(min(members, key=lambda i: (y[i], i)))
+        picked.add(max(members, key=lambda i: (y[i], -i)))
+    return sorted(picked)
+
+def series(n, seed):
+    rng = np.random.default_rng(seed)
+    x = np.cumsum(rng.uniform(0.1, 2.0, n))
+    y = np.cumsum(rng.normal(size=n)) + 5 * np.sin(x / 10)
+    return x, y
+
+@pytest.mark.parametrize("n, n_out", [(10, 3), (100, 7), (1000, 100), (1001, 100), (5000, 333)])
+def test_lttb_matches_reference(n, n_out):
+    x, y = series(n, n + n_out)
+    selected = lttb(x, y, n_out)
+    assert selected.tolist() == reference_lttb(x.tolist(), y.tolist(), n_out)
+
+def test_lttb_keeps_short_series():
+    x, y = series(10, 0)
+    assert lttb(x, y, 10).tolist() == list(range(10))
+    assert lttb(x, y, 2).tolist() == list(range(10))
+
+def test_lttb_keeps_spikes():
+    y = np.zeros(10000)
+    y[1234], y[8765] = 100.0, -100.0
+    selected = lttb(np.arange(10000.0), y, 50)
+    assert {1234, 8765} <= set(selected.tolist())
+
+@pytest.mark.parametrize("n, n_out", [(10, 4), (100, 7), (1000, 100), (1001, 100), (5000, 333)])
+def test_minmax_matches_reference(n, n_out):
+    _, y = series(n, n * n_out)
+    assert minmax(y, n_out).tolist() == reference_minmax(y.tolist(), n_out)
+
+def test_minmax_ties_keep_the_first_point():
+    y = np.array([1.0, 1.0, 1.0, 1.0, 2.0, 0.0, 2.0, 0.0])
+    assert minmax(y, 4).tolist() == [0, 4, 5]
+
+def test_select_indices():
+    x, y = series(1000, 1)
+    assert select_indices("line", x.tolist(), y.tolist(), 100).tolist() == reference_lttb(x.tolist(), y.tolist(), 100)
+    assert select_indices("bar", x.tolist(), y.tolist(), 100).tolist() == reference_minmax(y.tolist(), 100)
+    # Categorical x values are bucketed by position
+    labels = [f"c{i}" for i in range(1000)]
+    assert select_indices("area", labels, y.tolist(), 100).tolist() == reference_lttb(list(range(1000)), y.tolist(), 100)
+    assert select_indices("line", x.tolist(), y.tolist(), 1000) is None
+    assert select_indices("scatter", x.tolist(), y.tolist(), 100) is None
+    assert select_indices("line", x.tolist(), y.tolist()[:-1], 100) is None
+    assert select_indices("line", x.tolist(), ["a"] * 1000, 100) is None
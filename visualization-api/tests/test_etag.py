@@ -0,0 +1,68 @@
+import pytest
+
+from app.main import _etag_matches
+
+def test_etag_matches():
+    assert _etag_matches('"abc"', '"abc"')
+    assert _etag_matches('W/"abc"', '"abc"')
+    assert _etag_matches('"xyz", W/"abc"', '"abc"')
+    assert _etag_matches("*", '"abc"')
+    assert not _etag_matches('"abc-gzip"', '"abc"')
+    assert not _etag_matches("abc", '"abc"')
+
+@pytest.fixture(scope="module")
+def viz_id(client):
+    x = list(range(500))
+    response = client.post("/visualizations/streamlit", json={
+        "title": "t", "chart_type": "line", "data": {"x": x, "y": [float(i % 7) for i in x]}
+    })
+    assert response.status_code == 200
+    return response.json()["visualization_id"]
+
+def test_data_revalidation(client, viz_id):
+    url = f"/api/visualization/data/{viz_id}"
+    response = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag.startswith('"') and etag.endswith('"')
+    assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+
+    revalidated = client.get(url, headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["ETag"] == etag
+    assert client.get(url, headers={"Accept-Encoding": "identity", "If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get(url, headers={"Accept-Encoding": "identity", "If-None-Match": '"stale"'}).status_code == 200
+
+def test_each_coding_has_its_own_etag(client, viz_id):
+    url = f"/api/visualization/data/{viz_id}"
+    identity = client.get(url, headers={"Accept-Encoding": "identity"})
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["ETag"] == identity.headers["ETag"][:-1] + '-gzip"'
+    assert compressed.json() == identity.json()
+    assert client.get(url, headers={"Accept-Encoding": "gzip",
+                                    "If-None-Match": identity.headers["ETag"]}).status_code == 200
+    assert client.get(url, headers={"Accept-Encoding": "gzip",
+                                    "If-None-Match": compressed.headers["ETag"]}).status_code == 304
+
+def test_query_variants_have_their_own_etag(client, viz_id):
+    url = f"/api/visualization/data/{viz_id}"
+    full = client.get(url, headers={"Accept-Encoding": "identity"}).headers["ETag"]
+    page = client.get(url, params={"offset": 10, "limit": 20})
+    sampled = client.get(url, params={"max_points": 50})
+    assert len({full, page.headers["ETag"], sampled.headers["ETag"]}) == 3
+    assert len(page.json()["data"]["x"]) == 20
+    assert client.get(url, params={"offset": 10, "limit": 20},
+                      headers={"If-None-Match": page.headers["ETag"]}).status_code == 304
+    assert client.get(url, params={"offset": 10, "limit": 21},
+                      headers={"If-None-Match": page.headers["ETag"]}).status_code == 200
+
+def test_aggregates_and_figure_revalidation(client, viz_id):
+    for url in (f"/api/visualization/data/{viz_id}/aggregates", f"/api/visualization/data/{viz_id}/figure"):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert client.get(url, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+def test_missing_visualization(client):
+    assert client.get("/api/visualization/data/missing", headers={"If-None-Match": "*"}).status_code == 404
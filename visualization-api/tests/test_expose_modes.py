@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from app.services.k8s_service import K8sResourceManager
+
+URL = "https://tests.example.org/wf-1/"
+
+def expose(manager, name="wf-1"):
+    return manager.create_resources(name, "viz", "", False, 8888, "jupyter")
+
+def run(coro_func):
+    async def scenario():
+        manager = K8sResourceManager()
+        try:
+            return await coro_func(manager)
+        finally:
+            await manager.close()
+    return asyncio.run(scenario())
+
+@pytest.fixture
+def uncached(monkeypatch):
+    # Lookups go to the fake API server, which never sends watch events
+    monkeypatch.setenv("K8S_INFORMERS_ENABLED", "false")
+
+@pytest.mark.parametrize("expose_mode", ["check", "optimistic", "apply"])
+def test_every_mode_creates_both_objects(fake_api, monkeypatch, uncached, expose_mode):
+    monkeypatch.setenv("K8S_EXPOSE_MODE", expose_mode)
+    assert run(expose) == URL
+    assert set(fake_api.objects["services"]) == {"viz-svc-wf-1"}
+    assert set(fake_api.objects["ingresses"]) == {"viz-ing-wf-1"}
+    ingress = fake_api.objects["ingresses"]["viz-ing-wf-1"]
+    assert ingress["spec"]["rules"][0]["http"]["paths"][0]["backend"]["service"]["name"] == "viz-svc-wf-1"
+
+def test_check_mode_reads_before_creating(fake_api, monkeypatch, uncached):
+    monkeypatch.setenv("K8S_EXPOSE_MODE", "check")
+    run(expose)
+
+    async def again(manager):
+        await expose(manager)
+        return manager.api_reads
+    assert run(again) == 2
+    assert (fake_api.count("POST", "services"), fake_api.count("POST", "ingresses")) == (1, 1)
+
+def test_optimistic_mode_treats_conflicts_as_existing(fake_api, monkeypatch, uncached):
+    monkeypatch.setenv("K8S_EXPOSE_MODE", "optimistic")
+    run(expose)
+
+    async def again(manager):
+        assert await expose(manager) == URL
+        return manager.api_reads, manager.rollbacks
+    # No reads, and the existing objects are not rolled back
+    assert run(again) == (0, 0)
+    assert fake_api.count("DELETE", "services") == fake_api.count("DELETE", "ingresses") == 0
+    assert set(fake_api.objects["services"]) == {"viz-svc-wf-1"}
+
+def test_apply_mode_converges_drifted_objects(fake_api, monkeypatch, uncached):
+    monkeypatch.setenv("K8S_EXPOSE_MODE", "apply")
+    run(expose)
+    fake_api.edit("services", "viz-svc-wf-1", lambda service: service["spec"]["ports"][0].update(targetPort=1))
+    run(expose)
+    assert fake_api.objects["services"]["viz-svc-wf-1"]["spec"]["ports"][0]["targetPort"] == 8888
+    assert fake_api.count("APPLY", "services") == 2
+
+@pytest.mark.parametrize("expose_mode, failing, kept, created", [
+    ("optimistic", ("POST", "ingresses"), "services", "viz-svc-wf-1"),
+    ("optimistic", ("POST", "services"), "ingresses", "viz-ing-wf-1"),
+    ("apply", ("APPLY", "ingresses"), "services", "viz-svc-wf-1"),
+])
+def test_a_failed_half_rolls_back_the_other(fake_api, monkeypatch, uncached, expose_mode, failing, kept, created):
+    monkeypatch.setenv("K8S_EXPOSE_MODE", expose_mode)
+    fake_api.failures[failing] = 403
+
+    async def failed(manager):
+        with pytest.raises(Exception, match="Kubernetes API error"):
+            await expose(manager)
+        return manager.rollbacks
+    assert run(failed) == 1
+    assert fake_api.objects["services"] == {} and fake_api.objects["ingresses"] == {}
+    assert ("DELETE", kept, created) in fake_api.writes
+
+def test_objects_that_already_existed_are_not_rolled_back(fake_api, monkeypatch, uncached):
+    monkeypatch.setenv("K8S_EXPOSE_MODE", "check")
+    run(expose)
+    fake_api.objects["ingresses"].clear()
+    monkeypatch.setenv("K8S_EXPOSE_MODE", "optimistic")
+    fake_api.failures[("POST", "ingresses")] = 500
+
+    async def failed(manager):
+        with pytest.raises(Exception):
+            await expose(manager)
+        return manager.rollbacks
+    assert run(failed) == 0
+    assert set(fake_api.objects["services"]) == {"viz-svc-wf-1"}
+
+def test_default_and_unknown_modes(monkeypatch):
+    monkeypatch.delenv("K8S_EXPOSE_MODE", raising=False)
+    assert K8sResourceManager().expose_mode == "check"
+    monkeypatch.setenv("K8S_EXPOSE_MODE", "eventually")
+    with pytest.raises(ValueError, match="Unsupported K8S_EXPOSE_MODE"):
+        K8sResourceManager()
@@ -0,0 +1,77 @@
+import os
+import json
+import asyncio
+
+from app.services import figures
+from app.services.streamlit_service import StreamlitService
+
+def test_basic_figures_follow_plotly_express():
+    figure = figures.basic_figure("area", {"x": [1, 2], "y": [3, 4], "x_label": "t"}, {"title": "T"})
+    assert figure["data"] == [{"type": "scatter", "mode": "lines", "stackgroup": "1", "x": [1, 2], "y": [3, 4],
+                               "showlegend": False}]
+    assert figure["layout"]["title"]["text"] == "T" and figure["layout"]["xaxis"]["title"]["text"] == "t"
+    rows = figures.basic_figure("scatter", {"data": [{"x": 1, "y": 2}, {"x": 3, "y": 4}]}, {})
+    assert (rows["data"][0]["x"], rows["data"][0]["y"]) == ([1, 3], [2, 4])
+    grouped = figures.basic_figure("bar", {"data": [
+        {"feature": "f1", "species": "a", "mean": 1}, {"feature": "f2", "species": "a", "mean": 2},
+        {"feature": "f1", "species": "b", "mean": 3}
+    ]}, {})
+    assert [(t["name"], t["x"], t["y"]) for t in grouped["data"]] == [("a", ["f1", "f2"], [1, 2]), ("b", ["f1"], [3])]
+    assert grouped["layout"]["barmode"] == "group"
+    # Shapes the Streamlit app renders itself
+    assert figures.basic_figure("line", {"data": [{"a": 1}]}, {}) is None
+    assert figures.chart_figure("heatmap", {"x": [1], "y": [1]}, {}, None) is None
+
+def test_scientific_figures_come_from_the_aggregates():
+    correlation = {"columns": ["a", "b"], "matrix": [[1.0, 0.5], [0.5, 1.0]]}
+    figure = figures.chart_figure("correlation", {}, {}, {"correlation": correlation})
+    assert figure["data"][0]["type"] == "heatmap" and figure["data"][0]["z"] == correlation["matrix"]
+    assert figures.chart_figure("correlation", {}, {}, {}) is None
+
+def test_dashboards_get_one_figure_per_chart():
+    document = figures.build({"title": "D", "chart_type": "dashboard", "data": {"charts": [
+        {"type": "line", "data": {"x": [1], "y": [2]}},
+        {"type": "correlation", "title": "C", "data": {}}
+    ]}}, {"charts": [{}, {"correlation": {"columns": ["a"], "matrix": [[1.0]]}}]})
+    charts = document["dashboard"]["charts"]
+    assert (document["dashboard"]["rows"], document["dashboard"]["cols"]) == (2, 2)
+    assert [(c["title"], c["figure"]["data"][0]["type"]) for c in charts] == [("Chart 1", "scatter"), ("C", "heatmap")]
+
+def test_figures_are_built_from_downsampled_data_and_stored_once(service: StreamlitService):
+    service.figure_max_points = 500
+    data = {"x": list(range(5000)), "y": [(i * 37) % 101 for i in range(5000)]}
+
+    async def scenario():
+        viz_id = (await service.create_visualization("t", "line", data))["visualization_id"]
+        meta = await service._get_meta(viz_id)
+        figures_dir = os.path.join(service._blob_dir(meta["blob"]), figures.FIGURES_DIR)
+        before = service.access_index.bytes_used
+
+        stored = await service.open_figure(viz_id, max_points=500)
+        document = json.loads(stored.body)
+        assert len(document["figure"]["data"][0]["x"]) <= 500
+        assert document["downsampling"]["original_points"] == 5000
+        assert stored.etag == f"{meta['etag']}-figure{figures.FIGURE_VERSION}-p500"
+        assert os.listdir(figures_dir) == [figures.figure_file(500)]
+        assert service.access_index.bytes_used == before + len(stored.body)
+
+        # Another resolution is only cached in memory
+        other = await service.open_figure(viz_id, max_points=1000)
+        assert len(json.loads(other.body)["figure"]["data"][0]["x"]) <= 1000
+        assert os.listdir(figures_dir) == [figures.figure_file(500)]
+
+        # A restarted replica reads the stored figure
+        service.cache.invalidate_visualization(viz_id)
+        assert (await service.open_figure(viz_id, max_points=500)).body == stored.body
+    asyncio.run(scenario())
+
+def test_figure_endpoint(client):
+    viz_id = client.post("/visualizations/streamlit", json={
+        "title": "box", "chart_type": "boxplot", "data": {"data": [{"category": "a", "value": v} for v in range(50)]}
+    }).json()["visualization_id"]
+    response = client.get(f"/api/visualization/data/{viz_id}/figure")
+    assert response.status_code == 200
+    assert response.json()["figure"]["data"][0]["type"] == "box"
+    cached = client.get(f"/api/visualization/data/{viz_id}/figure", headers={"If-None-Match": response.headers["ETag"]})
+    assert cached.status_code == 304
+    assert client.get(f"/api/visualization/data/{viz_id}/figure", params={"max_points": 2}).status_code == 422
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from app.services.k8s_service import K8sResourceManager
+
+@pytest.fixture
+def uncached(monkeypatch):
+    # Without informers every lookup is an API call, and no watch holds a connection
+    monkeypatch.setenv("K8S_INFORMERS_ENABLED", "false")
+
+def test_one_pooled_session_per_manager(fake_api, monkeypatch, uncached):
+    monkeypatch.setenv("K8S_CONNECTION_LIMIT", "5")
+
+    async def scenario():
+        manager = K8sResourceManager()
+        await asyncio.gather(*[manager.connect() for _ in range(10)])
+        api_client = manager.api_client
+        session = api_client.rest_client.pool_manager
+        assert session.connector.limit == 5
+        assert manager.core_v1.api_client is manager.networking_v1.api_client is api_client
+        await manager.close()
+        assert session.closed and manager.api_client is None
+        # Reconnects after close, e.g. a restarted lifespan
+        await manager.connect()
+        assert manager.api_client is not api_client
+        await manager.close()
+    asyncio.run(scenario())
+
+def test_connection_limit_bounds_concurrent_calls(fake_api, monkeypatch, uncached):
+    monkeypatch.setenv("K8S_CONNECTION_LIMIT", "2")
+
+    async def scenario():
+        manager = K8sResourceManager()
+        try:
+            urls = await asyncio.gather(*[
+                manager.create_resources(f"wf-{i}", "viz", "", False, 8888, "jupyter") for i in range(12)
+            ])
+        finally:
+            await manager.close()
+        return urls, manager.api_reads
+    urls, api_reads = asyncio.run(scenario())
+    assert urls == [f"https://tests.example.org/wf-{i}/" for i in range(12)]
+    assert api_reads == 24
+    assert fake_api.count("POST", "services") == fake_api.count("POST", "ingresses") == 12
+    assert fake_api.peak_in_flight <= 2
+
+def test_calls_time_out(fake_api, monkeypatch, uncached):
+    monkeypatch.setenv("K8S_REQUEST_TIMEOUT_SECONDS", "0.2")
+    monkeypatch.setattr(fake_api, "latency_seconds", 1.0)
+
+    async def scenario():
+        manager = K8sResourceManager()
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await manager.create_resources("wf-slow", "viz", "", False, 8888, "jupyter")
+        finally:
+            await manager.close()
+    asyncio.run(scenario())
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from app.services.k8s_service import K8sResourceManager
+
+async def started(manager):
+    await manager.start()
+
+    async def synced():
+        while not (manager.service_informer.synced and manager.ingress_informer.synced):
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(synced(), 5)
+    return manager
+
+def create(manager, name="wf-1", label="viz"):
+    return manager.create_resources(name, label, "", False, 8888, "jupyter")
+
+@pytest.mark.parametrize("expose_mode", ["check", "optimistic"])
+def test_concurrent_creates_share_one_operation(fake_api, monkeypatch, expose_mode):
+    monkeypatch.setenv("K8S_EXPOSE_MODE", expose_mode)
+
+    async def scenario():
+        manager = await started(K8sResourceManager())
+        try:
+            urls = await asyncio.gather(*[create(manager) for _ in range(10)])
+            assert set(urls) == {"https://tests.example.org/wf-1/"}
+            assert manager.coalesced_creates == 9
+            assert manager.snapshot()["inflight"] == 0
+        finally:
+            await manager.close()
+
+    asyncio.run(scenario())
+    assert (fake_api.count("POST", "services"), fake_api.count("POST", "ingresses")) == (1, 1)
+    assert set(fake_api.objects["services"]) == {"viz-svc-wf-1"}
+    assert set(fake_api.objects["ingresses"]) == {"viz-ing-wf-1"}
+
+def test_concurrent_deletes_share_one_operation(fake_api):
+    async def scenario():
+        manager = await started(K8sResourceManager())
+        try:
+            await create(manager)
+            await asyncio.gather(*[manager.delete_resources("wf-1", "viz") for _ in range(5)])
+            assert manager.coalesced_deletes == 4
+        finally:
+            await manager.close()
+
+    asyncio.run(scenario())
+    assert (fake_api.count("DELETE", "services"), fake_api.count("DELETE", "ingresses")) == (1, 1)
+    assert fake_api.objects == {"services": {}, "ingresses": {}}
+
+def test_create_and_delete_of_one_name_run_in_order(fake_api):
+    async def scenario():
+        manager = await started(K8sResourceManager())
+        try:
+            # The delete waits for the create it races, so nothing is left behind
+            await asyncio.gather(create(manager), manager.delete_resources("wf-1", "viz"))
+            assert fake_api.objects == {"services": {}, "ingresses": {}}
+            # And a create after the delete exposes it again, rather than joining the finished one
+            await asyncio.gather(manager.delete_resources("wf-1", "viz"), create(manager))
+            assert set(fake_api.objects["ingresses"]) == {"viz-ing-wf-1"}
+            assert (manager.coalesced_creates, manager.coalesced_deletes) == (0, 0)
+        finally:
+            await manager.close()
+
+    asyncio.run(scenario())
+
+def test_create_after_a_queued_delete_does_not_join_the_earlier_create(fake_api):
+    async def scenario():
+        manager = await started(K8sResourceManager())
+        try:
+            first = asyncio.ensure_future(create(manager))
+            await asyncio.sleep(0)
+            delete = asyncio.ensure_future(manager.delete_resources("wf-1", "viz"))
+            await asyncio.sleep(0)
+            # Queued behind the delete rather than sharing the first create's result
+            second = asyncio.ensure_future(create(manager))
+            await asyncio.gather(first, delete, second)
+            assert manager.coalesced_creates == 0
+            assert manager.snapshot()["inflight"] == 0
+        finally:
+            await manager.close()
+
+    asyncio.run(scenario())
+    assert set(fake_api.objects["services"]) == {"viz-svc-wf-1"}
+    assert set(fake_api.objects["ingresses"]) == {"viz-ing-wf-1"}
+    assert [(method, kind) for method, kind, _ in fake_api.writes] == [
+        ("POST", "services"), ("POST", "ingresses"),
+        ("DELETE", "ingresses"), ("DELETE", "services"),
+        ("POST", "services"), ("POST", "ingresses")
+    ]
+
+def test_calls_for_other_names_are_not_coalesced(fake_api):
+    async def scenario():
+        manager = await started(K8sResourceManager())
+        try:
+            await asyncio.gather(create(manager, "wf-1"), create(manager, "wf-2"), create(manager, "wf-1", "other"))
+            assert manager.coalesced_creates == 0
+        finally:
+            await manager.close()
+
+    asyncio.run(scenario())
+    assert set(fake_api.objects["ingresses"]) == {"viz-ing-wf-1", "viz-ing-wf-2"}
+
+def test_cancelled_caller_does_not_cancel_the_operation(fake_api):
+    async def scenario():
+        manager = await started(K8sResourceManager())
+        try:
+            first = asyncio.ensure_future(create(manager))
+            await asyncio.sleep(0)
+            second = asyncio.ensure_future(create(manager))
+            await asyncio.sleep(0.005)
+            first.cancel()
+            assert await second == "https://tests.example.org/wf-1/"
+            assert first.cancelled()
+        finally:
+            await manager.close()
+
+    asyncio.run(scenario())
+    assert set(fake_api.objects["ingresses"]) == {"viz-ing-wf-1"}
@@ -0,0 +1,113 @@
+import asyncio
+from types import SimpleNamespace
+
+from kubernetes_asyncio import client
+
+from app.services import k8s_informer
+from app.services.k8s_informer import ResourceInformer
+
+def obj(name):
+    return SimpleNamespace(metadata=SimpleNamespace(name=name))
+
+def event(kind, name, version):
+    return {"type": kind, "object": obj(name), "raw_object": {"metadata": {"name": name, "resourceVersion": version}}}
+
+class ScriptedWatch:
+    """Stands in for watch.Watch: each stream() plays the next script, a list of events or an exception."""
+    scripts = []
+    streams = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def stream(self, func, **kwargs):
+        ScriptedWatch.streams.append(kwargs)
+        if not ScriptedWatch.scripts:
+            # Nothing left to play: a watch that stays open
+            await asyncio.Event().wait()
+        script = ScriptedWatch.scripts.pop(0)
+        if isinstance(script, BaseException):
+            raise script
+        for item in script:
+            yield item
+
+def informer_with(monkeypatch, scripts, listings):
+    ScriptedWatch.scripts = list(scripts)
+    ScriptedWatch.streams = []
+    monkeypatch.setattr(k8s_informer.watch, "Watch", ScriptedWatch)
+    listings = list(listings)
+
+    async def list_func(namespace, **kwargs):
+        names, version = listings.pop(0)
+        return SimpleNamespace(items=[obj(name) for name in names],
+                               metadata=SimpleNamespace(resource_version=version))
+    return ResourceInformer("Service", list_func, "ns", "viz-svc-")
+
+async def until(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+def names(informer):
+    return sorted(informer._objects)
+
+def test_list_then_watch_applies_events(monkeypatch):
+    informer = informer_with(monkeypatch, [[
+        event("ADDED", "viz-svc-b", "11"),
+        event("ADDED", "other", "12"),
+        event("BOOKMARK", "", "13"),
+        event("DELETED", "viz-svc-a", "14"),
+    ]], [(["viz-svc-a", "unrelated"], "10")])
+
+    async def scenario():
+        assert not informer.synced
+        informer.start()
+        await until(lambda: informer.resource_version == "14")
+        assert informer.synced and names(informer) == ["viz-svc-b"]
+        assert informer.get("viz-svc-b") is not None and informer.get("viz-svc-a") is None
+        assert ScriptedWatch.streams[0]["resource_version"] == "10"
+        assert ScriptedWatch.streams[0]["allow_watch_bookmarks"]
+        await informer.stop()
+    asyncio.run(scenario())
+    snapshot = informer.snapshot()
+    assert (snapshot["lists"], snapshot["events"], snapshot["hits"], snapshot["misses"]) == (1, 2, 1, 1)
+
+def test_expired_watch_relists_without_backoff(monkeypatch):
+    gone = client.ApiException(status=k8s_informer.HTTP_GONE, reason="Gone")
+    informer = informer_with(monkeypatch, [gone], [(["viz-svc-a"], "10"), (["viz-svc-a", "viz-svc-b"], "20")])
+
+    async def scenario():
+        informer.start()
+        await until(lambda: informer.lists == 2)
+        # Relisted at once and watching from the new list, still synced throughout
+        assert informer.synced and names(informer) == ["viz-svc-a", "viz-svc-b"]
+        await until(lambda: len(ScriptedWatch.streams) == 2)
+        assert ScriptedWatch.streams[1]["resource_version"] == "20"
+        await informer.stop()
+    asyncio.run(scenario())
+    assert (informer.expired, informer.errors) == (1, 0)
+
+def test_failed_watch_unsyncs_until_the_next_list(monkeypatch):
+    informer = informer_with(monkeypatch, [ConnectionResetError("reset")], [(["viz-svc-a"], "10"), ([], "20")])
+
+    async def scenario():
+        informer.start()
+        await until(lambda: informer.errors == 1)
+        # Events may have been missed: callers fall back to the API server
+        assert not informer.synced and informer.resource_version is None
+        await until(lambda: informer.lists == 2)
+        assert informer.synced and names(informer) == []
+        await informer.stop()
+        assert not informer.synced
+    asyncio.run(scenario())
+
+def test_own_writes_are_visible_before_their_events():
+    informer = ResourceInformer("Service", None, "ns", "viz-svc-")
+    informer.record(obj("viz-svc-a"))
+    assert informer.get("viz-svc-a") is not None
+    informer.forget("viz-svc-a")
+    assert informer.get("viz-svc-a") is None
@@ -0,0 +1,83 @@
+import os
+import asyncio
+
+import pytest
+
+from app.services import layout
+from app.services.storage_writer import StorageWriter
+from app.services.streamlit_service import RESERVED_ENTRIES, StreamlitService
+
+@pytest.fixture
+def open_service(tmp_path, monkeypatch):
+    """Open StreamlitServices on one data directory with a given STREAMLIT_SHARD_DEPTH."""
+    monkeypatch.setenv("STREAMLIT_DATA_DIR", str(tmp_path / "data"))
+    opened = []
+
+    def open_service(depth):
+        monkeypatch.setenv("STREAMLIT_SHARD_DEPTH", str(depth))
+        service = StreamlitService()
+        service.writer = StorageWriter()
+        opened.append(service)
+        return service
+    yield open_service
+    for service in opened:
+        service.writer._executor.shutdown(wait=True)
+        service.catalog.close()
+
+def create(service, n):
+    async def scenario():
+        return (await service.create_visualization(f"t{n}", "line", {"x": [n]}))["visualization_id"]
+    return asyncio.run(scenario())
+
+def readable(service, viz_id):
+    async def scenario():
+        return (await service.open_visualization_data(viz_id)).etag
+    return asyncio.run(scenario())
+
+def test_shard_parts():
+    assert layout.shard_parts("abcdef01-2345", 2) == ["ab", "cd"]
+    assert layout.shard_parts("abcdef01-2345", 0) == []
+    assert layout.shard_parts("a", 2) == ["a_", "__"]
+
+def test_new_stores_record_their_depth(open_service):
+    service = open_service(2)
+    viz_id = create(service, 1)
+    assert layout.read_layout(service.data_dir) == 2 and service.lookup_depths == [2]
+    assert os.path.isdir(os.path.join(service.data_dir, viz_id[:2], viz_id[2:4], viz_id))
+    with pytest.raises(ValueError):
+        open_service(layout.MAX_SHARD_DEPTH + 1)
+
+def test_migration_keeps_every_visualization_readable(open_service):
+    flat = open_service(0)
+    viz_ids = [create(flat, n) for n in range(5)]
+    etags = [readable(flat, viz_id) for viz_id in viz_ids]
+    assert all(os.path.isdir(os.path.join(flat.data_dir, viz_id)) for viz_id in viz_ids)
+
+    sharded = open_service(2)
+    assert sharded.lookup_depths == [2, 0]
+    assert [readable(sharded, viz_id) for viz_id in viz_ids] == etags
+    # New visualizations go straight to the new layout while old ones are still flat
+    new_id = create(sharded, 5)
+    assert sharded._locate(new_id) == sharded._viz_dir(new_id)
+    listed = dict(layout.iter_visualization_dirs(sharded.data_dir, RESERVED_ENTRIES))
+    assert sorted(listed) == sorted(viz_ids + [new_id])
+
+    assert sharded.migrate_layout() == {"moved": 5, "skipped": 0, "shard_depth": 2}
+    assert layout.read_layout(sharded.data_dir) == 2
+    assert [readable(sharded, viz_id) for viz_id in viz_ids] == etags
+    assert not any(os.path.exists(sharded._viz_dir(viz_id, 0)) for viz_id in viz_ids)
+    assert open_service(2).lookup_depths == [2]
+
+    # And back: emptied shard directories are pruned
+    assert open_service(0).migrate_layout()["moved"] == 6
+    assert not any(layout.is_shard_name(entry) for entry in os.listdir(sharded.data_dir))
+
+def test_migration_skips_conflicting_directories(open_service):
+    flat = open_service(0)
+    viz_id = create(flat, 1)
+    sharded = open_service(2)
+    os.makedirs(sharded._viz_dir(viz_id))
+    assert sharded.migrate_layout() == {"moved": 0, "skipped": 1, "shard_depth": 2}
+    # The old depth is still looked up after a restart
+    assert layout.read_layout(sharded.data_dir) == 0
+    assert open_service(2).lookup_depths == [2, 0]
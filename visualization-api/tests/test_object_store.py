@@ -0,0 +1,108 @@
+import os
+import time
+
+import pytest
+import requests
+
+boto3 = pytest.importorskip("boto3")
+moto_server = pytest.importorskip("moto.server")
+
+from app.services.object_store import LocalObjectStore, S3ObjectStore
+
+@pytest.fixture(scope="module")
+def s3_endpoint():
+    """An S3 API served by moto over HTTP, as MinIO would be."""
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+@pytest.fixture(params=["local", "s3"])
+def store(request, tmp_path, monkeypatch):
+    if request.param == "local":
+        return LocalObjectStore(str(tmp_path / "store"))
+    endpoint = request.getfixturevalue("s3_endpoint")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    bucket = f"viz-{tmp_path.name.lower().replace('_', '-')}"[:63]
+    boto3.client("s3", endpoint_url=endpoint, region_name="us-east-1").create_bucket(Bucket=bucket)
+    return S3ObjectStore(bucket=bucket, prefix="tests/", endpoint_url=endpoint, region="us-east-1",
+                         multipart_threshold=5 * 1024 * 1024, multipart_chunk_size=5 * 1024 * 1024)
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+def test_put_and_get(store, tmp_path):
+    store.put_file("blobs/ab/abc/data.json", write(tmp_path, "data.json", b'{"a": 1}'))
+    store.put_bytes("access/viz", b"")
+    assert store.get_bytes("blobs/ab/abc/data.json") == b'{"a": 1}'
+    assert store.get_bytes("access/viz") == b""
+    target = str(tmp_path / "copy.json")
+    store.get_file("blobs/ab/abc/data.json", target)
+    with open(target, "rb") as f:
+        assert f.read() == b'{"a": 1}'
+    assert store.exists("blobs/ab/abc/data.json")
+    assert not store.exists("blobs/ab/abc/meta.json")
+
+def test_put_replaces(store, tmp_path):
+    store.put_bytes("visualizations/v/meta.json", b"old")
+    store.put_file("visualizations/v/meta.json", write(tmp_path, "meta.json", b"new"))
+    assert store.get_bytes("visualizations/v/meta.json") == b"new"
+
+def test_multipart_upload(store, tmp_path):
+    data = os.urandom(11 * 1024 * 1024)
+    store.put_file("blobs/ab/abc/columns/col_0.npy", write(tmp_path, "col_0.npy", data))
+    assert store.get_bytes("blobs/ab/abc/columns/col_0.npy") == data
+    if isinstance(store, S3ObjectStore):
+        assert store.snapshot()["multipart_uploads"] == 1
+
+def test_missing_objects(store, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        store.get_bytes("visualizations/missing/meta.json")
+    with pytest.raises(FileNotFoundError):
+        store.get_file("visualizations/missing/meta.json", str(tmp_path / "missing.json"))
+
+def test_list(store):
+    started = time.time()
+    for key in ("blobs/ab/abc/data.json", "blobs/ab/abc/refs/v1", "blobs/ab/abd/data.json", "access/v1"):
+        store.put_bytes(key, b"x")
+    assert sorted(store.list("blobs/ab/abc/")) == ["blobs/ab/abc/data.json", "blobs/ab/abc/refs/v1"]
+    assert store.list("visualizations/") == []
+    modified = store.list_modified("access/")
+    assert list(modified) == ["access/v1"]
+    assert started - 5 <= modified["access/v1"] <= time.time() + 5
+
+def test_delete(store):
+    store.put_bytes("blobs/ab/abc/data.json", b"x")
+    store.put_bytes("blobs/ab/abc/refs/v1", b"")
+    store.delete(["blobs/ab/abc/refs/v1", "blobs/ab/abc/missing"])
+    assert store.list("blobs/ab/abc/") == ["blobs/ab/abc/data.json"]
+    store.delete(store.list("blobs/"))
+    assert store.list("blobs/") == []
+    assert not store.exists("blobs/ab/abc/data.json")
+
+def test_presigned_url(store):
+    store.put_bytes("blobs/ab/abc/data.json.gz", b"\x1f\x8b compressed")
+    url = store.presigned_url("blobs/ab/abc/data.json.gz")
+    if isinstance(store, LocalObjectStore):
+        # Not supported: the API serves the object itself
+        assert url is None
+        return
+    response = requests.get(url, stream=True)
+    assert response.status_code == 200
+    # Read undecoded: the stored body is served as-is, with its Content-Encoding
+    assert response.raw.read() == b"\x1f\x8b compressed"
+    assert response.headers["Content-Type"] == "application/json"
+    assert response.headers["Content-Encoding"] == "gzip"
+
+def test_counters(store, tmp_path):
+    store.put_file("a/data.json", write(tmp_path, "data.json", b"12345"))
+    store.get_bytes("a/data.json")
+    store.delete(["a/data.json"])
+    snapshot = store.snapshot()
+    assert (snapshot["uploads"], snapshot["bytes_uploaded"]) == (1, 5)
+    assert (snapshot["downloads"], snapshot["bytes_downloaded"]) == (1, 5)
+    assert snapshot["deletes"] == 1
@@ -0,0 +1,60 @@
+import os
+import json
+import asyncio
+import hashlib
+
+from app.services.streamlit_service import StreamlitService
+from app.services.visualization_cache import VisualizationCache
+
+DATA = {"x": list(range(200)), "y": [i * 0.5 for i in range(200)]}
+
+async def create(service):
+    result = await service.create_visualization("t", "line", DATA)
+    assert result["status"] == "ready"
+    return result["visualization_id"]
+
+def test_body_is_served_as_stored(service: StreamlitService):
+    service.codec = None
+
+    async def scenario():
+        viz_id = await create(service)
+        meta = await service._get_meta(viz_id)
+        with open(service._payload_path(viz_id, meta), "rb") as f:
+            stored = f.read()
+        service.cache.invalidate_visualization(viz_id)
+        payload = await service.open_visualization_data(viz_id)
+        assert payload.body == stored
+        assert payload.etag == hashlib.sha256(stored).hexdigest() == meta["etag"]
+        assert payload.size == len(stored) and payload.encoding is None
+        assert json.loads(payload.body)["data"] == DATA
+    asyncio.run(scenario())
+
+def test_bodies_over_the_cache_item_limit_are_left_on_disk(service: StreamlitService):
+    service.codec = None
+    service.cache = VisualizationCache(max_bytes=1024 * 1024, ttl_seconds=0, max_item_bytes=64)
+
+    async def scenario():
+        viz_id = await create(service)
+        payload = await service.open_visualization_data(viz_id)
+        assert payload.body is None and payload.stream is None
+        assert payload.path == service._payload_path(viz_id, await service._get_meta(viz_id))
+        assert payload.size == os.path.getsize(payload.path)
+        assert service.cache.snapshot()["entries"] == 0
+    asyncio.run(scenario())
+
+def test_visualizations_stored_before_the_sidecar_get_it_backfilled(service: StreamlitService):
+    viz_id = "00000000-0000-4000-8000-000000000001"
+    body = json.dumps({"id": viz_id, "title": "old", "chart_type": "line", "data": DATA}).encode("utf-8")
+    viz_dir = service._viz_dir(viz_id)
+    os.makedirs(viz_dir)
+    with open(os.path.join(viz_dir, "data.json"), "wb") as f:
+        f.write(body)
+
+    async def scenario():
+        payload = await service.open_visualization_data(viz_id)
+        assert payload.body == body
+        assert payload.etag == hashlib.sha256(body).hexdigest()
+    asyncio.run(scenario())
+    with open(os.path.join(viz_dir, "meta.json")) as f:
+        assert json.load(f) == {"etag": hashlib.sha256(body).hexdigest(), "size": len(body),
+                                "content_type": "application/json"}
@@ -0,0 +1,83 @@
+import gzip
+import json
+import zlib
+
+import pytest
+import zstandard
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.middleware.request_decompression import RequestDecompressionMiddleware
+
+def streamlit_body(points=2000):
+    x = list(range(points))
+    return json.dumps({"title": "t", "chart_type": "line", "data": {"x": x, "y": x}}).encode("utf-8")
+
+def post(client, body, coding):
+    return client.post("/visualizations/streamlit", content=body,
+                       headers={"Content-Type": "application/json", "Content-Encoding": coding})
+
+@pytest.mark.parametrize("cut", [1, 3, 100], ids=["checksum", "last-block", "mid-frame"])
+def test_truncated_zstd_body_is_rejected(client, cut):
+    compressed = zstandard.ZstdCompressor(write_checksum=True).compress(streamlit_body())
+    response = post(client, compressed[:-cut], "zstd")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Truncated compressed request body"
+
+def test_complete_zstd_body_is_accepted(client):
+    compressed = zstandard.ZstdCompressor(write_checksum=True).compress(streamlit_body())
+    response = post(client, compressed, "zstd")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+
+def small_app(max_decompressed_bytes):
+    app = FastAPI()
+    app.add_middleware(RequestDecompressionMiddleware, max_decompressed_bytes=max_decompressed_bytes)
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        body = await request.body()
+        return {"size": len(body), "content_length": request.headers.get("content-length")}
+    return TestClient(app)
+
+@pytest.mark.parametrize("coding, compress", [
+    ("gzip", lambda b: gzip.compress(b)),
+    ("x-gzip", lambda b: gzip.compress(b)),
+    ("deflate", lambda b: zlib.compress(b)),
+    ("zstd", lambda b: zstandard.ZstdCompressor().compress(b)),
+    ("identity", lambda b: b),
+])
+def test_compressed_bodies_are_inflated(client, coding, compress):
+    response = post(client, compress(streamlit_body()), coding)
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+
+def test_inflated_body_drops_the_compressed_content_length():
+    body = b"a" * 10000
+    response = small_app(1 << 20).post("/echo", content=gzip.compress(body), headers={"Content-Encoding": "gzip"})
+    assert response.json() == {"size": len(body), "content_length": None}
+
+def test_unknown_coding_is_rejected(client):
+    response = post(client, streamlit_body(), "br")
+    assert response.status_code == 415
+    assert response.json()["detail"] == "Unsupported Content-Encoding: br"
+
+@pytest.mark.parametrize("coding, compress", [
+    ("gzip", lambda b: gzip.compress(b)),
+    ("zstd", lambda b: zstandard.ZstdCompressor().compress(b)),
+])
+def test_inflated_size_is_capped(coding, compress):
+    bomb = compress(b"\0" * (4 << 20))
+    response = small_app(1 << 20).post("/echo", content=bomb, headers={"Content-Encoding": coding})
+    assert response.status_code == 413
+    assert response.json()["detail"] == f"Decompressed request body exceeds {1 << 20} bytes"
+
+def test_invalid_gzip_body_is_rejected(client):
+    response = post(client, b"not gzip at all", "gzip")
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Invalid gzip request body")
+
+def test_truncated_gzip_body_is_rejected(client):
+    response = post(client, gzip.compress(streamlit_body())[:-20], "gzip")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Truncated compressed request body"
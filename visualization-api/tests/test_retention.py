@@ -0,0 +1,112 @@
+import time
+import asyncio
+
+import pytest
+
+from app.services.retention import RetentionSweeper
+from app.services.streamlit_service import StreamlitService
+from app.services.upload_service import UploadService
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+def sweeper_for(service, ttl_seconds=0, max_bytes=0):
+    sweeper = RetentionSweeper(service, UploadService(service))
+    sweeper.ttl_seconds = ttl_seconds
+    sweeper.max_bytes = max_bytes
+    sweeper.max_evictions_per_second = 0
+    sweeper.upload_ttl_seconds = 0
+    return sweeper
+
+async def create(service, n, points=200):
+    result = await service.create_visualization(f"t{n}", "line", {"x": list(range(points)), "y": [n] * points})
+    return result["visualization_id"]
+
+async def exists(service, viz_id):
+    try:
+        await service.open_visualization_data(viz_id)
+    except FileNotFoundError:
+        return False
+    return True
+
+def test_ttl_evicts_visualizations_not_read_recently(service: StreamlitService, clock):
+    sweeper = sweeper_for(service, ttl_seconds=100)
+
+    async def scenario():
+        old = await create(service, 1)
+        clock[0] += 60
+        recent = await create(service, 2)
+        clock[0] += 30
+        await service.open_visualization_data(old)
+        read = await create(service, 3)
+        clock[0] += 80
+        assert await sweeper.sweep() == {"ttl": 1, "quota": 0, "store": 0}
+        assert service.access_index.last_access(recent) is None
+        assert [await exists(service, v) for v in (old, recent, read)] == [True, False, True]
+    asyncio.run(scenario())
+    assert sweeper.snapshot()["evicted_ttl"] == 1
+
+def test_quota_evicts_least_recently_used_first(service: StreamlitService, clock):
+    async def scenario():
+        viz_ids = []
+        for n in range(3):
+            viz_ids.append(await create(service, n))
+            clock[0] += 1
+        used = service.access_index.bytes_used
+        sweeper = sweeper_for(service, max_bytes=used - 1)
+        await service.open_visualization_data(viz_ids[0])
+        assert await sweeper.sweep() == {"ttl": 0, "quota": 1, "store": 0}
+        assert [await exists(service, v) for v in viz_ids] == [True, False, True]
+        assert service.access_index.bytes_used <= sweeper.max_bytes
+        assert sweeper.snapshot()["bytes_evicted"] == used - service.access_index.bytes_used
+        assert await sweeper.sweep() == {"ttl": 0, "quota": 0, "store": 0}
+    asyncio.run(scenario())
+
+def test_shared_blobs_are_counted_once(service: StreamlitService):
+    data = {"x": list(range(200)), "y": list(range(200))}
+
+    async def scenario():
+        first = (await service.create_visualization("t", "line", data))["visualization_id"]
+        single = service.access_index.snapshot()
+        second = (await service.create_visualization("t", "line", data))["visualization_id"]
+        shared = service.access_index.snapshot()
+        assert (shared["blobs"], shared["bytes_used"]) == (1, single["bytes_used"])
+        await service.delete_visualization(first)
+        # Still referenced by the second visualization
+        assert service.access_index.bytes_used == single["bytes_used"]
+        await service.delete_visualization(second)
+        assert service.access_index.snapshot()["bytes_used"] == 0
+    asyncio.run(scenario())
+
+def test_visualizations_accessed_after_listing_are_kept(service: StreamlitService, clock):
+    sweeper = sweeper_for(service)
+
+    async def scenario():
+        viz_id = await create(service, 1)
+        listed = service.access_index.last_access(viz_id)
+        clock[0] += 1
+        await service.open_visualization_data(viz_id)
+        assert not await sweeper._evict(viz_id, 0, listed)
+        assert await exists(service, viz_id)
+    asyncio.run(scenario())
+
+def test_reconcile_picks_up_visualizations_missing_from_the_index(service: StreamlitService):
+    async def scenario():
+        return [await create(service, n) for n in range(2)]
+    viz_ids = asyncio.run(scenario())
+    expected = service.access_index.snapshot()
+
+    # A fresh service on the same directory, with no persisted index
+    restarted = StreamlitService()
+    restarted.writer = service.writer
+    try:
+        sweeper = sweeper_for(restarted)
+        state = sweeper._reconcile()
+        assert sorted(entry[0] for entry in state["entries"]) == sorted(viz_ids)
+        restarted.access_index.load(state)
+        assert restarted.access_index.snapshot() == expected
+    finally:
+        restarted.catalog.close()
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from app.services.k8s_service import K8sResourceManager
+
+INGRESS = "viz-ing-shared-jupyter-0"
+
+@pytest.fixture(autouse=True)
+def shared_mode(monkeypatch):
+    monkeypatch.setenv("K8S_INGRESS_MODE", "shared")
+    # One shard, so every visualization edits the same Ingress
+    monkeypatch.setenv("K8S_SHARED_INGRESS_SHARDS", "1")
+
+async def started(manager):
+    await manager.start()
+
+    async def synced():
+        while not (manager.service_informer.synced and manager.ingress_informer.synced):
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(synced(), 5)
+    return manager
+
+def create(manager, name):
+    return manager.create_resources(name, "viz", "", False, 8888, "jupyter")
+
+def routed(fake_api):
+    ingress = fake_api.objects["ingresses"].get(INGRESS)
+    if ingress is None:
+        return {}
+    return {p["path"].split("(")[0].strip("/"): p["backend"]["service"]["name"]
+            for p in ingress["spec"]["rules"][0]["http"]["paths"]}
+
+def test_concurrent_edits_are_batched(fake_api):
+    names = [f"wf-{i}" for i in range(20)]
+
+    async def scenario():
+        manager = await started(K8sResourceManager())
+        try:
+            await asyncio.gather(*[create(manager, name) for name in names])
+            assert routed(fake_api) == {name: f"viz-svc-{name}" for name in names}
+            assert fake_api.count("POST", "services") == 20
+            # One Ingress, written far fewer times than there were exposes
+            assert set(fake_api.objects["ingresses"]) == {INGRESS}
+            added = fake_api.count("POST", "ingresses") + fake_api.count("PATCH", "ingresses")
+            assert added <= 3
+            # Exposing again finds the paths in the cache and writes nothing
+            await asyncio.gather(*[create(manager, name) for name in names])
+            assert fake_api.count("POST", "ingresses") + fake_api.count("PATCH", "ingresses") == added
+
+            await asyncio.gather(*[manager.delete_resources(name, "viz") for name in names[:5]])
+            assert set(routed(fake_api)) == set(names[5:])
+            # The Ingress goes with its last path
+            await asyncio.gather(*[manager.delete_resources(name, "viz") for name in names[5:]])
+            snapshot = manager.shared_ingresses.snapshot()
+            assert snapshot["edits"] == 40 and snapshot["writes"] < 10 and snapshot["pending"] == 0
+        finally:
+            await manager.close()
+
+    asyncio.run(scenario())
+    assert fake_api.objects == {"services": {}, "ingresses": {}}
+
+def test_conflicting_write_is_retried(fake_api):
+    async def scenario():
+        manager = await started(K8sResourceManager())
+        try:
+            await create(manager, "wf-1")
+            # Another replica adds a path; this replica's cached copy is now stale
+            fake_api.edit("ingresses", INGRESS, lambda ingress: ingress["spec"]["rules"][0]["http"]["paths"].append(
+                {"path": "/other(/|$)(.*)", "pathType": "Prefix",
+                 "backend": {"service": {"name": "viz-svc-other", "port": {"number": 80}}}}))
+            await create(manager, "wf-2")
+            assert manager.shared_ingresses.conflicts == 1
+            assert routed(fake_api) == {"wf-1": "viz-svc-wf-1", "other": "viz-svc-other", "wf-2": "viz-svc-wf-2"}
+
+            # A delete precondition fails the same way, and the removal is recomputed
+            fake_api.edit("ingresses", INGRESS, lambda ingress: ingress["metadata"].setdefault("labels", {}))
+            await manager.delete_resources("wf-1", "viz")
+            assert manager.shared_ingresses.conflicts == 2
+            assert set(routed(fake_api)) == {"other", "wf-2"}
+        finally:
+            await manager.close()
+
+    asyncio.run(scenario())
+    assert fake_api.conflicts == 2
+
+def test_replicas_editing_one_ingress(fake_api):
+    names = [f"wf-{i}" for i in range(24)]
+
+    async def scenario():
+        replicas = [await started(K8sResourceManager()) for _ in range(2)]
+        try:
+            await asyncio.gather(*[create(replicas[i % 2], name) for i, name in enumerate(names)])
+            assert set(routed(fake_api)) == set(names)
+            await asyncio.gather(*[replicas[i % 2].delete_resources(name, "viz") for i, name in enumerate(names)])
+            # Each replica only sees its own writes, so the other's surface as 409s and are retried
+            assert sum(replica.shared_ingresses.conflicts for replica in replicas) > 0
+        finally:
+            for replica in replicas:
+                await replica.close()
+
+    asyncio.run(scenario())
+    assert fake_api.objects == {"services": {}, "ingresses": {}}
@@ -0,0 +1,144 @@
+import os
+import json
+import asyncio
+import threading
+
+import pytest
+
+from app.services.storage_writer import FileWrite, StorageWriter, _Transaction
+
+def run(coro):
+    return asyncio.run(coro)
+
+def listing(directory):
+    return sorted(os.path.relpath(os.path.join(root, name), directory)
+                  for root, _, names in os.walk(directory) for name in names)
+
+async def commit(writer, *transactions):
+    try:
+        return await asyncio.gather(*[writer.commit(files) for files in transactions], return_exceptions=True)
+    finally:
+        await writer.close()
+
+@pytest.mark.parametrize("fsync_mode", ["none", "always", "group"])
+def test_commit(tmp_path, fsync_mode):
+    source = tmp_path / "upload.part"
+    source.write_bytes(b"0123456789")
+    writer = StorageWriter(fsync_mode=fsync_mode)
+    [committed] = run(commit(writer, [
+        FileWrite(str(tmp_path / "blob" / "data.json"), obj={"x": [1, 2]}),
+        FileWrite(str(tmp_path / "blob" / "etag"), data=b"abc"),
+        FileWrite(str(tmp_path / "blob" / "col_0.npy"), source=str(source))
+    ]))
+    assert [(os.path.basename(c.path), c.size) for c in committed] == [
+        ("data.json", len(json.dumps({"x": [1, 2]}))), ("etag", 3), ("col_0.npy", 10)
+    ]
+    assert json.loads((tmp_path / "blob" / "data.json").read_text()) == {"x": [1, 2]}
+    assert (tmp_path / "blob" / "col_0.npy").read_bytes() == b"0123456789"
+    # The source was moved, and no temp file is left behind
+    assert listing(tmp_path) == ["blob/col_0.npy", "blob/data.json", "blob/etag"]
+    assert writer.snapshot()["transactions"] == 1
+
+def test_replace(tmp_path):
+    target = tmp_path / "meta.json"
+    target.write_text("old")
+    run(commit(StorageWriter(), [FileWrite(str(target), data=b"new")]))
+    assert target.read_text() == "new"
+    assert listing(tmp_path) == ["meta.json"]
+
+def test_concurrent_transactions_share_a_batch(tmp_path):
+    writer = StorageWriter()
+    results = run(commit(writer, *[[FileWrite(str(tmp_path / f"{i}.json"), obj=i)] for i in range(10)]))
+    assert all(not isinstance(r, BaseException) for r in results)
+    snapshot = writer.snapshot()
+    assert snapshot["transactions"] == 10
+    assert snapshot["batches"] < 10
+
+def test_failed_staging_fails_only_its_transaction(tmp_path):
+    writer = StorageWriter()
+    good, bad = run(commit(writer,
+        [FileWrite(str(tmp_path / "good.json"), obj=1)],
+        [FileWrite(str(tmp_path / "bad" / "a.json"), obj=1), FileWrite(str(tmp_path / "bad" / "b.json"), obj=object())]
+    ))
+    assert isinstance(bad, TypeError)
+    assert not isinstance(good, BaseException)
+    assert listing(tmp_path) == ["good.json"]
+    assert writer.snapshot()["failed_transactions"] == 1
+
+def test_failed_rename_rolls_back(tmp_path):
+    blob = tmp_path / "blob"
+    blob.mkdir()
+    (blob / "data.json").write_text("old")
+    source = tmp_path / "upload.part"
+    source.write_bytes(b"columns")
+    # A rename onto a non-empty directory fails after the first two files are in place
+    (blob / "meta.json").mkdir()
+    (blob / "meta.json" / "keep").write_text("")
+    [error] = run(commit(StorageWriter(), [
+        FileWrite(str(blob / "data.json"), data=b"new"),
+        FileWrite(str(blob / "col_0.npy"), source=str(source)),
+        FileWrite(str(blob / "new.json"), data=b"new"),
+        FileWrite(str(blob / "meta.json"), obj={})
+    ]))
+    assert isinstance(error, OSError)
+    # The replaced file is restored, the new one removed and the source handed back
+    assert (blob / "data.json").read_text() == "old"
+    assert source.read_bytes() == b"columns"
+    assert listing(tmp_path) == ["blob/data.json", "blob/meta.json/keep", "upload.part"]
+
+def test_queued_transactions_survive_a_stopped_consumer(tmp_path):
+    writer = StorageWriter(fsync_mode="none")
+    gate = threading.Event()
+    stage_file = writer._stage_file
+
+    def blocking_stage_file(fw):
+        if fw.path.endswith("slow"):
+            gate.wait(5)
+        return stage_file(fw)
+
+    writer._stage_file = blocking_stage_file
+
+    async def scenario():
+        try:
+            first = asyncio.ensure_future(writer.commit([FileWrite(str(tmp_path / "slow"), data=b"1")]))
+            await asyncio.sleep(0.05)
+            second = asyncio.ensure_future(writer.commit([FileWrite(str(tmp_path / "second"), data=b"2")]))
+            await asyncio.sleep(0)
+            writer._consumer.cancel()
+            # The batch being committed fails; the queued transaction waits for the next consumer
+            with pytest.raises(RuntimeError):
+                await asyncio.wait_for(first, 5)
+            gate.set()
+            third = writer.commit([FileWrite(str(tmp_path / "third"), data=b"3")])
+            await asyncio.wait_for(asyncio.gather(second, third), 5)
+        finally:
+            gate.set()
+            await writer.close()
+
+    run(scenario())
+    assert (tmp_path / "second").read_bytes() == b"2"
+    assert (tmp_path / "third").read_bytes() == b"3"
+
+def test_transactions_queued_on_a_closed_loop_fail(tmp_path):
+    writer = StorageWriter(fsync_mode="none")
+    futures = []
+
+    async def enqueue():
+        writer._ensure_started()
+        writer._consumer.cancel()
+        await asyncio.sleep(0)
+        loop = asyncio.get_running_loop()
+        for name in ("a", "b"):
+            futures.append(loop.create_future())
+            writer._queue.put_nowait(_Transaction(files=[FileWrite(str(tmp_path / name), data=b"")],
+                                                  future=futures[-1], enqueued_at=0.0))
+
+    run(enqueue())
+    # On a new loop the stranded transactions are failed rather than left pending forever
+    run(commit(writer, [FileWrite(str(tmp_path / "c"), data=b"c")]))
+    assert all(isinstance(f.exception(), RuntimeError) for f in futures)
+    assert listing(tmp_path) == ["c"]
+
+def test_rejects_unknown_fsync_mode():
+    with pytest.raises(ValueError):
+        StorageWriter(fsync_mode="sometimes")
@@ -0,0 +1,77 @@
+import os
+import json
+import asyncio
+
+import pytest
+
+from app.services.streamlit_service import StreamlitService
+from app.services.upload_service import UploadService, UploadTooLargeError
+
+def rows_of(n, labels=True):
+    rows = [{"x": i, "y": i * 0.25 - 3} for i in range(n)]
+    if labels:
+        for row in rows:
+            row["label"] = f"p{row['x']}"
+    return rows
+
+def columns_of(rows):
+    return {name: [row[name] for row in rows] for name in rows[0]}
+
+async def chunks(data, size):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+async def upload(uploads, body, format="ndjson", chunk_size=1000, dedupe=False):
+    session = await uploads.create_session("t", "line", format=format, layout={"title": "T"}, dedupe=dedupe)
+    # Chunk boundaries fall mid-row
+    for offset in range(0, len(body), chunk_size * 4):
+        part = body[offset:offset + chunk_size * 4]
+        await uploads.append_chunk(session["upload_id"], chunks(part, chunk_size), offset=offset)
+    return (await uploads.finalize(session["upload_id"]))["visualization_id"]
+
+def ndjson(rows):
+    return "".join(json.dumps(row) + "\n" for row in rows).encode("utf-8")
+
+@pytest.mark.parametrize("rows", [rows_of(300), rows_of(3000, labels=False)], ids=["json", "columnar"])
+def test_upload_matches_direct_post(service: StreamlitService, rows):
+    uploads = UploadService(service)
+
+    async def scenario():
+        uploaded = await upload(uploads, ndjson(rows), chunk_size=997)
+        direct = (await service.create_visualization("t", "line", columns_of(rows), layout={"title": "T"}))["visualization_id"]
+        uploaded_meta, direct_meta = await service._get_meta(uploaded), await service._get_meta(direct)
+        assert uploaded_meta["format"] == direct_meta["format"] == ("json" if len(rows) < 1000 else "columnar")
+        # The same content, so both reference one blob
+        stored = await service.get_visualization_data(uploaded)
+        assert stored["data"] == columns_of(rows)
+        assert uploaded_meta["blob"] == direct_meta["blob"] == service._encode_payload(stored).content_key
+        assert await service.get_visualization_data(direct) == stored
+        # The same content, so a deduplicating upload resolves to one of them
+        assert await upload(uploads, ndjson(rows), dedupe=True) in (uploaded, direct)
+        assert os.listdir(uploads.upload_dir) == []
+    asyncio.run(scenario())
+
+def test_csv_upload_dedupes_to_direct_post(service: StreamlitService):
+    uploads = UploadService(service)
+    rows = rows_of(50, labels=False)
+    body = ("x,y\n" + "".join(f"{row['x']},{row['y']}\n" for row in rows)).encode("utf-8")
+
+    async def scenario():
+        direct = (await service.create_visualization("t", "line", columns_of(rows), layout={"title": "T"}))["visualization_id"]
+        assert await upload(uploads, body, format="csv", chunk_size=7, dedupe=True) == direct
+    asyncio.run(scenario())
+
+def test_append_checks_offset_and_size(service: StreamlitService):
+    uploads = UploadService(service)
+    uploads.max_bytes = 10
+
+    async def scenario():
+        upload_id = (await uploads.create_session("t", "line"))["upload_id"]
+        await uploads.append_chunk(upload_id, chunks(b"12345", 5), offset=0)
+        with pytest.raises(ValueError):
+            await uploads.append_chunk(upload_id, chunks(b"678", 5), offset=0)
+        with pytest.raises(UploadTooLargeError):
+            await uploads.append_chunk(upload_id, chunks(b"6789012", 2), offset=5)
+        # The rejected chunk was rolled back entirely
+        assert (await uploads.get_session(upload_id))["received_bytes"] == 5
+    asyncio.run(scenario())
@@ -0,0 +1,59 @@
+from app.services import visualization_cache
+from app.services.visualization_cache import VisualizationCache
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = VisualizationCache(max_bytes=100, ttl_seconds=0)
+    cache.put("a", b"a" * 40)
+    cache.put("b", b"b" * 40)
+    assert cache.get("a").body == b"a" * 40
+    # "b" is now the least recently used entry
+    cache.put("c", b"c" * 40)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    snapshot = cache.snapshot()
+    assert (snapshot["entries"], snapshot["bytes"], snapshot["evictions"]) == (2, 80, 1)
+
+def test_large_entries_evict_several():
+    cache = VisualizationCache(max_bytes=100, ttl_seconds=0)
+    for key in "abcd":
+        cache.put(key, b"x" * 25)
+    cache.put("big", b"y" * 90)
+    assert [key for key in "abcd" if cache.get(key) is not None] == []
+    assert cache.snapshot()["bytes"] == 90
+
+def test_rejects_items_over_the_per_item_limit():
+    cache = VisualizationCache(max_bytes=100, ttl_seconds=0, max_item_bytes=30)
+    assert cache.put("a", b"a" * 20)
+    assert not cache.put("b", b"b" * 31)
+    assert cache.get("b") is None
+    assert cache.snapshot()["rejected"] == 1
+    assert cache.get("a") is not None
+
+def test_replacing_a_key_keeps_the_byte_count():
+    cache = VisualizationCache(max_bytes=100, ttl_seconds=0)
+    cache.put("a", b"a" * 60)
+    cache.put("a", b"a" * 30, etag="v2")
+    assert cache.snapshot()["bytes"] == 30
+    assert cache.get("a").etag == "v2"
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(visualization_cache.time, "monotonic", lambda: now[0])
+    cache = VisualizationCache(max_bytes=100, ttl_seconds=10)
+    cache.put("a", b"a")
+    now[0] += 5
+    assert cache.get("a") is not None
+    now[0] += 6
+    assert cache.get("a") is None
+    snapshot = cache.snapshot()
+    assert (snapshot["expirations"], snapshot["bytes"], snapshot["hits"], snapshot["misses"]) == (1, 0, 1, 1)
+
+def test_invalidate_visualization_drops_its_variants():
+    cache = VisualizationCache(max_bytes=1000, ttl_seconds=0)
+    cache.put("v1", b"body")
+    cache.put(("v1", "figure", 5000), b"figure")
+    cache.put(("v1", "query", None, None, 0, 10, None, False), b"page")
+    cache.put("v2", b"other")
+    cache.invalidate_visualization("v1")
+    assert cache.snapshot()["entries"] == 1
+    assert cache.get("v2") is not None